@@ -275,30 +275,22 @@
         const noVisitsMessage = document.getElementById('noVisitsMessage');
         const visitsTodayContainer = document.getElementById('visitsTodayContainer');
 
+        let todaysVisitors = []; // rows from /visits/today/grouped; live visit events keep them current
+
         /**
-         * Fetches and displays the list of visitors for the current day in a modal.
+         * Renders todaysVisitors into the modal's table.
          */
-        async function showTodaysVisitors() {
-            showLoadingIndicator();
-            try {
-                // Use the new API endpoint to get today's visits
-				const response = await apiFetch('/visits/today/grouped');
-				if (!response.ok) {
-					const errorData = await response.json();
-					throw new Error(`HTTP error! Status: ${response.status}. Details: ${errorData.error || 'Unknown error'}`);
-				}
-
-				const families = await response.json();
+        function renderTodaysVisitors() {
 				todaysVisitsTableBody.innerHTML = ''; // Clear previous data
 
-				if (families.length === 0) {
+				if (todaysVisitors.length === 0) {
 					noVisitsMessage.classList.remove('hidden');
 					todaysVisitsTableBody.parentElement.classList.add('hidden');
 				} else {
 				noVisitsMessage.classList.add('hidden');
 				todaysVisitsTableBody.parentElement.classList.remove('hidden');
 
-				families.forEach(fam => {
+				todaysVisitors.forEach(fam => {
 					const row = `
 						<tr>
 							<td class="px-6 py-4 whitespace-nowrap text-sm text-gray-900 text-left">
@@ -311,6 +303,23 @@
 					todaysVisitsTableBody.insertAdjacentHTML('beforeend', row);
 				});
 			}
+        }
+
+        /**
+         * Fetches and displays the list of visitors for the current day in a modal.
+         */
+        async function showTodaysVisitors() {
+            showLoadingIndicator();
+            try {
+                // Use the new API endpoint to get today's visits
+				const response = await apiFetch('/visits/today/grouped');
+				if (!response.ok) {
+					const errorData = await response.json();
+					throw new Error(`HTTP error! Status: ${response.status}. Details: ${errorData.error || 'Unknown error'}`);
+				}
+
+				todaysVisitors = await response.json();
+				renderTodaysVisitors();
 
 			todaysVisitsModal.classList.remove('hidden');
 			
@@ -644,6 +653,39 @@
             });
 
             renderHomeTable(filteredPrimaryMembersToRender);
+
+            if (filteredPrimaryMembersToRender.length === 0 && searchTerm.length >= 3) {
+                fuzzySearchFallback(searchTerm, showInactive);
+            }
+        }
+
+        let fuzzySearchTimer = null;
+        /**
+         * When the local substring filter finds nothing (e.g. a misspelling), asks the
+         * server's phonetic search for close matches and shows those families, best first.
+         */
+        function fuzzySearchFallback(searchTerm, showInactive) {
+            clearTimeout(fuzzySearchTimer);
+            fuzzySearchTimer = setTimeout(async () => {
+                try {
+                    const response = await apiFetch(`/search?q=${encodeURIComponent(searchTerm)}&limit=25`);
+                    if (!response.ok) return;
+                    const results = await response.json();
+                    // Ignore stale responses if the user kept typing.
+                    if (homeLastNameSearchInput.value.toLowerCase().trim() !== searchTerm) return;
+
+                    const rankedIds = [...new Set(results.map(r => r.member_id))];
+                    const primaries = rankedIds
+                        .map(id => allData.find(item => item.member_id === id && item.primary_member === true))
+                        .filter(item => item && (showInactive || item.active_flag === true));
+                    if (primaries.length > 0) {
+                        renderHomeTable(primaries);
+                        showMessage(`No exact match for "${searchTerm}". Showing closest matches.`, 'info');
+                    }
+                } catch (error) {
+                    console.error('Fuzzy search failed:', error);
+                }
+            }, 300);
         }
 
         /**
@@ -651,14 +693,18 @@
          */
         /**
          * Fetches all necessary data from the backend to initialize the application.
+         * @param {Object} [options]
+         * @param {boolean} [options.fresh] - Read from the primary, not the replica. Used when
+         *   the roster has to include everything before the live events token.
          */
-		async function fetchAllData() {
+		async function fetchAllData({ fresh = false } = {}) {
             globalLoadingIndicator.classList.remove('hidden');
             homeFetchDataBtn.disabled = true;
             homeRefreshSpinner.classList.remove('hidden');
+            liveReloadsInFlight++;
         
             try {
-                const response = await apiFetch('/data');
+                const response = await apiFetch(fresh ? '/data?fresh=1' : '/data');
         
                 if (!response.ok) {
                     let errorDetails = 'The server returned an error response.';
@@ -688,6 +734,12 @@
                 globalLoadingIndicator.classList.add('hidden');
                 homeFetchDataBtn.disabled = false;
                 homeRefreshSpinner.classList.add('hidden');
+                liveReloadsInFlight--;
+                if (liveReloadsInFlight === 0) {
+                    const held = heldLiveEvents;
+                    heldLiveEvents = [];
+                    held.forEach(([type, payload]) => applyLiveEvent(type, payload));
+                }
             }
         }
 
@@ -707,50 +759,33 @@
             globalLoadingIndicator.classList.remove('hidden');
 
             try {
-                const primaryMember = allData.find(m => m.member_id === familyId && m.primary_member === true);
-
-                if (!primaryMember) {
-                    showMessage(`Primary member not found for family ID: ${familyId}. Cannot record visits.`, "error");
-                    return;
-                }
-				let successfulVisits = 0;
-                let failedVisits = 0;
-
-                for (let i = 0; i < numPeople; i++) {
-                    const now = new Date();
-                    const formattedDateTime = `${now.getFullYear()}-${(now.getMonth() + 1).toString().padStart(2, '0')}-${now.getDate().toString().padStart(2, '0')} ${now.getHours().toString().padStart(2, '0')}:${now.getMinutes().toString().padStart(2, '0')}:${now.getSeconds().toString().padStart(2, '0')}`;
-
-                    const visitData = {
-                        member_id: primaryMember.member_id,
-                        name: primaryMember.name,
-                        last_name: primaryMember.last_name,
-                        visit_datetime: formattedDateTime
-                    };
+                const now = new Date();
+                const formattedDateTime = `${now.getFullYear()}-${(now.getMonth() + 1).toString().padStart(2, '0')}-${now.getDate().toString().padStart(2, '0')} ${now.getHours().toString().padStart(2, '0')}:${now.getMinutes().toString().padStart(2, '0')}:${now.getSeconds().toString().padStart(2, '0')}`;
 
-                    const response = await apiFetch('/add_visit', {
-                        method: 'POST',
-                        headers: { 'Content-Type': 'application/json' },
-                        body: JSON.stringify(visitData)
-                    });
+                // One round trip: looks the family up by member_id and records all visits.
+                const response = await apiFetch(`/checkin/${encodeURIComponent(familyId)}`, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ visitors: numPeople, visit_datetime: formattedDateTime })
+                });
+                const result = await response.json();
 
-                    if (response.ok) {
-                        successfulVisits++;
-                    } else {
-                        failedVisits++;
-                        const errorData = await response.json();
-                        console.error(`Error recording visit ${i + 1} for ${primaryMember.name} ${primaryMember.last_name}:`, errorData);
-                    }
+                if (!response.ok) {
+                    throw new Error(result.error || `HTTP error! Status: ${response.status}`);
                 }
 
-                if (successfulVisits === numPeople) {
-                    showMessage(`${successfulVisits} visits recorded successfully for ${primaryMember.name} ${primaryMember.last_name}!`, "success");
-                } else if (successfulVisits > 0) {
-                    showMessage(`${successfulVisits} out of ${numPeople} visits recorded for ${primaryMember.name} ${primaryMember.last_name}. ${failedVisits} failed.`, "warning");
+                const primaryMember = result.members.find(m => m.primary_member) || {};
+                const familyName = `${primaryMember.name || ''} ${primaryMember.last_name || ''}`.trim() || familyId;
+                if (result.visits_recorded === numPeople) {
+                    showMessage(`${result.visits_recorded} visits recorded successfully for ${familyName}!`, "success");
                 } else {
-                    showMessage(`Failed to record any visits for ${primaryMember.name} ${primaryMember.last_name}.`, "error");
+                    showMessage(`${result.visits_recorded} out of ${numPeople} visits recorded for ${familyName}.`, "warning");
+                }
+                if (!result.active) {
+                    showMessage(`${familyName}'s membership is not active.`, "warning");
                 }
 
-                await fetchAllData();
+                fetchVisitsTodayCount();
 				showView('homeView');
 
             } catch (error) {
@@ -1704,9 +1739,163 @@
 
         memberVisitsCloseBtn.addEventListener('click', () => showView('familyDetailsView'));
 
+        // --- Live Updates ---
+        // GET /api/events pushes check-ins, family changes and renewals as Server-Sent
+        // Events. Each event carries the new state (the family's rows, today's totals),
+        // so applying one twice is harmless. On reconnect the last event id goes back as
+        // ?since= and the server replays what was missed; 'reset' means the gap was too
+        // old and the screen reloads instead. Under Lambda each response ends after the
+        // catch-up and the server's `retry` says when to reconnect. The stream is read
+        // with fetch rather than EventSource so it goes through apiFetch like every call.
+        const LIVE_RETRY_MS = 3000;
+        const LIVE_RETRY_MAX_MS = 60000;
+        let liveEventToken = null;
+        let liveReloadsInFlight = 0; // while fetchAllData runs, events wait in heldLiveEvents
+        let heldLiveEvents = [];
+        let resolveLiveReady;
+        const liveReady = new Promise(resolve => { resolveLiveReady = resolve; });
+
+        /**
+         * Reads a text/event-stream response, calling onEvent(type, data, id) per event.
+         * @returns {Promise<number|null>} The server's retry delay in ms, or null if none was sent.
+         */
+        async function readEventStream(response, onEvent) {
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let retryMs = null;
+            let event = { id: null, type: 'message', data: [] };
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) {
+                    return retryMs;
+                }
+                buffer += decoder.decode(value, { stream: true });
+                let newline;
+                while ((newline = buffer.indexOf('\n')) >= 0) {
+                    const line = buffer.slice(0, newline).replace(/\r$/, '');
+                    buffer = buffer.slice(newline + 1);
+                    if (line === '') {
+                        if (event.data.length) {
+                            onEvent(event.type, event.data.join('\n'), event.id);
+                        }
+                        event = { id: null, type: 'message', data: [] };
+                    } else if (!line.startsWith(':')) { // ':' lines are keepalives
+                        const colon = line.indexOf(':');
+                        const field = colon < 0 ? line : line.slice(0, colon);
+                        const fieldValue = colon < 0 ? '' : line.slice(colon + 1).replace(/^ /, '');
+                        if (field === 'data') event.data.push(fieldValue);
+                        else if (field === 'event') event.type = fieldValue;
+                        else if (field === 'id') event.id = fieldValue;
+                        else if (field === 'retry' && /^\d+$/.test(fieldValue)) retryMs = parseInt(fieldValue, 10);
+                    }
+                }
+            }
+        }
+
+        /**
+         * Updates the visits-today count and, if it is open, the today's visitors table.
+         * @param {Object} visit - A 'visit' event: the family's visitors and today's total.
+         */
+        function applyVisitEvent(visit) {
+            homeVisitsTodayCountSpan.textContent = `Visits Today: ${visit.visits_today}`;
+            if (todaysVisitsModal.classList.contains('hidden')) {
+                return; // fetched afresh when next opened
+            }
+            const sameFamily = fam => fam.member_id === visit.member_id && fam.name === visit.name && fam.last_name === visit.last_name;
+            todaysVisitors = todaysVisitors.filter(fam => !sameFamily(fam));
+            if (visit.visitors > 0) {
+                todaysVisitors.push({
+                    member_id: visit.member_id, name: visit.name, last_name: visit.last_name,
+                    visitors: visit.visitors, last_visit: visit.last_visit
+                });
+            }
+            todaysVisitors.sort((a, b) => String(b.last_visit).localeCompare(String(a.last_visit)));
+            renderTodaysVisitors();
+        }
+
+        /**
+         * Replaces a family's rows in allData (none left means it was deleted) and redraws the home view.
+         * @param {Object} family - A 'family' or 'renewal' event: member_id and the family's /data rows.
+         */
+        function applyFamilyEvent(family) {
+            allData = allData.filter(record => record.member_id !== family.member_id).concat(family.members);
+            updateCounts(allData);
+            filterHomeData();
+        }
+
+        function applyLiveEvent(type, payload) {
+            if (type === 'visit') {
+                applyVisitEvent(payload);
+            } else if (type === 'family' || type === 'renewal') {
+                applyFamilyEvent(payload);
+            }
+        }
+
+        function handleLiveEvent(type, data, id) {
+            if (id !== null) {
+                liveEventToken = id;
+            }
+            if (type === 'ready') {
+                resolveLiveReady();
+                return;
+            }
+            if (type === 'reset') {
+                console.warn('Live updates missed events; reloading all data.');
+                fetchAllData({ fresh: true });
+                return;
+            }
+            let payload;
+            try {
+                payload = JSON.parse(data);
+            } catch (error) {
+                console.error(`Ignoring malformed live '${type}' event:`, error);
+                return;
+            }
+            if (liveReloadsInFlight > 0) {
+                heldLiveEvents.push([type, payload]);
+            } else {
+                applyLiveEvent(type, payload);
+            }
+        }
+
+        /**
+         * Keeps the event stream connected for the life of the page, resuming from liveEventToken.
+         */
+        async function runLiveUpdates() {
+            let delayMs = LIVE_RETRY_MS;
+            while (true) {
+                try {
+                    const query = liveEventToken === null ? '' : `?since=${encodeURIComponent(liveEventToken)}`;
+                    const response = await apiFetch(`/events${query}`, {
+                        headers: { 'Accept': 'text/event-stream' },
+                        cache: 'no-store'
+                    });
+                    if (!response.ok) {
+                        throw new Error(`HTTP error! Status: ${response.status}`);
+                    }
+                    const retryMs = await readEventStream(response, handleLiveEvent);
+                    delayMs = retryMs === null ? LIVE_RETRY_MS : retryMs;
+                } catch (error) {
+                    console.warn('Live updates disconnected:', error);
+                    resolveLiveReady(); // don't hold up the first load
+                    delayMs = Math.min(Math.max(delayMs * 2, LIVE_RETRY_MS), LIVE_RETRY_MAX_MS);
+                }
+                await new Promise(resolve => setTimeout(resolve, delayMs));
+            }
+        }
+
         // --- Initial Load ---
 		function startApp() {
-		  fetchAllData().then(() => showView('homeView'));
+		  // Deactivate anything that expired since the last sweep (a no-op if already swept
+		  // today), then load the roster. The live stream connects first, so anything committed
+		  // after its 'ready' arrives as an event. The roster is read from the primary so it
+		  // has everything committed before 'ready'; a lagging replica might not.
+		  runLiveUpdates();
+		  triggerMembershipExpiryUpdate()
+		    .then(() => liveReady)
+		    .then(() => fetchAllData({ fresh: true }))
+		    .then(() => showView('homeView'));
 		}
 
 		if (window.apiFetch) {
@@ -1,37 +1,78 @@
 # V3 - Adjust Dates for birthday
 import pyodbc
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, g, has_request_context
 from flask_cors import CORS
 import json
-from datetime import date, datetime, timedelta
+from datetime import date, datetime, timedelta, timezone
 import logging
 import calendar
+import csv
+from contextlib import contextmanager
+import difflib
+import hmac
+import io
+import math
 import os
-from decimal import Decimal
+import time
+import unicodedata
+import uuid
 
-import boto3
 from botocore.exceptions import ClientError
 from flask.json.provider import JSONProvider
 
+from expiry_sweeper import sweep_expired_memberships
+from survey_rollups import MAX_RESULT_DAYS, RESULT_INTERVALS, record_answers, survey_results
+from aws_clients import get_client
+from date_ranges import month_bounds
+from circuit_breaker import CircuitOpenError, call_with_retry, db_breaker
+from connection_pool import PoolTimeout
+import sql_stats
+import json_backend
+import live_events
+from row_mapping import map_row, map_rows
+
 from typing import List, Dict
 
+# --- Request Timing ---
+# Named spans for the phases of a request (secret fetch, ODBC connect, query, row
+# building, JSON encoding). after_request returns them as a Server-Timing header,
+# which browser devtools show under Network > Timing, and logs one JSON line per request.
+
+def record_span(name, duration_ms):
+    """Adds to the named span; repeated phases (e.g. a retried connect) accumulate."""
+    if not has_request_context():
+        return
+    spans = g.setdefault('spans', {})
+    spans[name] = spans.get(name, 0.0) + duration_ms
+
+@contextmanager
+def timed(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, (time.perf_counter() - started) * 1000)
+
 # --- Robust JSON Handling ---
 # This custom class teaches Flask how to handle special data types like dates
 # and decimals, preventing the app from crashing during JSON conversion.
+# Encoding goes through json_backend: orjson when installed, else the stdlib.
 class CustomJSONProvider(JSONProvider):
+    default = staticmethod(json_backend.default)
+
     def dumps(self, obj, **kwargs):
-        return json.dumps(obj, **kwargs, default=self.default)
+        with timed('json'):
+            return json_backend.dumps(obj, **kwargs)
 
     def loads(self, s, **kwargs):
-        return json.loads(s, **kwargs)
+        return json_backend.loads(s, **kwargs)
 
-    @staticmethod
-    def default(o):
-        if isinstance(o, (datetime, date)):
-            return o.isoformat()
-        if isinstance(o, Decimal):
-            return float(o)
-        raise TypeError(f"Object of type {o.__class__.__name__} is not JSON serializable")
+    def response(self, *args, **kwargs):
+        # Hands the encoded bytes straight to the response, skipping a decode/encode round trip.
+        obj = self._prepare_response_obj(args, kwargs)
+        with timed('json'):
+            body = json_backend.dumps_bytes(obj)
+        return self._app.response_class(body, mimetype="application/json")
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -43,20 +84,163 @@ app.json = CustomJSONProvider(app)
 CORS(app)
 
 # --- Database Configuration ---
-SQL_SERVER_INSTANCE = 'nelcm.cy1ogm8uwbvo.us-east-1.rds.amazonaws.com,1433'
-DATABASE_NAME = 'nelcm'
-DATABASE_UID = 'nelcm'
-ODBC_DRIVER = '/var/task/lib/libmsodbcsql-18.4.so.1.1'
-
+# Defaults are production; the DB_* environment variables let a local stand-in
+# (e.g. two SQL Server containers as primary and replica) be used instead.
+SQL_SERVER_INSTANCE = os.environ.get('DB_SERVER', 'nelcm.cy1ogm8uwbvo.us-east-1.rds.amazonaws.com,1433')
+DATABASE_NAME = os.environ.get('DB_NAME', 'nelcm')
+DATABASE_UID = os.environ.get('DB_UID', 'nelcm')
+ODBC_DRIVER = os.environ.get('DB_DRIVER', '/var/task/lib/libmsodbcsql-18.4.so.1.1')
+
+# --- Read Replica Routing ---
+# Read-only routes pass readonly=True to get_db_connection. They go to the replica
+# when one is configured: a separate server (DB_REPLICA_SERVER) and/or
+# ApplicationIntent=ReadOnly (DB_REPLICA_READ_INTENT=1, for an AG listener). A
+# replica that can't be reached or lags more than DB_REPLICA_MAX_LAG_SECONDS is
+# skipped for REPLICA_RETRY_SECONDS and reads fall back to the primary.
+DB_REPLICA_SERVER = os.environ.get('DB_REPLICA_SERVER')
+DB_REPLICA_READ_INTENT = os.environ.get('DB_REPLICA_READ_INTENT', '').lower() in ('1', 'true', 'yes')
+DB_REPLICA_MAX_LAG_SECONDS = int(os.environ.get('DB_REPLICA_MAX_LAG_SECONDS', '30'))
+REPLICA_RETRY_SECONDS = 30
+REPLICA_LOGIN_TIMEOUT = 2
+replica_state = {'skip_until': 0.0}
+
+# --- Connection Pool ---
+# server.py (standalone threaded mode) sets this to a connection_pool.ConnectionPool
+# for primary connections. Under Lambda it stays None and each request opens its own.
+db_pool = None
+
+# --- Live Events ---
+# server.py sets this to a live_events.EventHub so /api/events streams stay open.
+# Under Lambda it stays None and each /api/events response ends after the catch-up.
+event_hub = None
+
+def notify_live_events():
+    """Call after committing events: this process's open streams get them without waiting for a poll."""
+    if event_hub is not None:
+        event_hub.poke()
+
+# --- Request Deadlines ---
+# Each request gets a deadline from the Lambda context's remaining time (or
+# API_TIMEOUT_SECONDS when run outside Lambda). The secret fetch, the ODBC login and
+# every query are given only what is left, and once it is spent the request fails
+# fast with a 503 instead of being killed by Lambda with no response.
+API_TIMEOUT_SECONDS = float(os.environ.get('API_TIMEOUT_SECONDS', '5'))
+DEADLINE_SAFETY_SECONDS = 0.25  # kept back to build and return the error response
+
+class DeadlineExceeded(Exception):
+    """Raised when a request's time budget is spent before a stage can start."""
+
+@app.before_request
+def start_request_budget():
+    budget = API_TIMEOUT_SECONDS
+    context = request.environ.get('serverless.context')
+    if context is not None and hasattr(context, 'get_remaining_time_in_millis'):
+        budget = context.get_remaining_time_in_millis() / 1000.0
+    g.request_started = time.monotonic()
+    g.deadline = g.request_started + budget - DEADLINE_SAFETY_SECONDS
+
+def remaining_budget():
+    """Seconds left for the current request, or None outside a request (CLI, workers)."""
+    if not has_request_context() or getattr(g, 'deadline', None) is None:
+        return None
+    return g.deadline - time.monotonic()
 
-def get_database_password():
+def check_budget(stage):
+    """Logs the remaining budget at `stage` and raises DeadlineExceeded if it is spent."""
+    remaining = remaining_budget()
+    if remaining is None:
+        return None
+    elapsed_ms = (time.monotonic() - g.request_started) * 1000
+    logging.info(f"[budget] {request.method} {request.path} {stage}: {elapsed_ms:.0f}ms elapsed, {remaining * 1000:.0f}ms left")
+    if remaining <= 0:
+        raise DeadlineExceeded(stage)
+    return remaining
+
+def timeout_seconds(remaining, cap=None):
+    """ODBC timeouts are whole seconds and 0 means 'no limit', so never go below 1."""
+    if remaining is None:
+        return cap or 0
+    seconds = max(1, int(remaining))
+    return min(seconds, cap) if cap else seconds
+
+@app.errorhandler(DeadlineExceeded)
+def handle_deadline_exceeded(ex):
+    logging.error(f"Request budget exhausted before '{ex}' on {request.method} {request.path}.")
+    response = jsonify({"error": "The server ran out of time for this request. Please try again."})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+@app.errorhandler(PoolTimeout)
+def handle_pool_timeout(ex):
+    logging.warning(f"Rejected {request.method} {request.path}: {ex}")
+    response = jsonify({"error": "The server is busy. Please try again."})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+@app.errorhandler(CircuitOpenError)
+def handle_circuit_open(ex):
+    logging.warning(f"Rejected {request.method} {request.path}: {ex}")
+    response = jsonify({"error": "The database is temporarily unavailable. Please try again shortly."})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(int(db_breaker.reset_timeout))
+    return response
+
+# Registered before finish_request_budget so it runs after it (Flask runs
+# after_request hooks in reverse) and also times a budget-exhausted 503.
+@app.after_request
+def emit_server_timing(response):
+    if getattr(g, 'request_started', None) is None:
+        return response
+    total_ms = (time.monotonic() - g.request_started) * 1000
+    spans = g.get('spans', {})
+    entries = [f"{name};dur={ms:.1f}" for name, ms in spans.items()]
+    entries.append(f"total;dur={total_ms:.1f}")
+    response.headers['Server-Timing'] = ', '.join(entries)
+    # The front-desk app is served from another origin; this lets it read the timings too.
+    response.headers['Timing-Allow-Origin'] = '*'
+    logging.info("[timing] " + json.dumps({
+        "method": request.method,
+        "path": request.path,
+        "endpoint": request.endpoint,
+        "status": response.status_code,
+        "total_ms": round(total_ms, 1),
+        "spans_ms": {name: round(ms, 1) for name, ms in spans.items()}
+    }))
+    return response
+
+@app.after_request
+def finish_request_budget(response):
+    remaining = remaining_budget()
+    if remaining is None:
+        return response
+    # A query or login that hit its budget-derived timeout surfaces as a 500 from
+    # the endpoint's pyodbc handler; report it as the timeout it was.
+    if response.status_code == 500 and remaining <= 0:
+        response = handle_deadline_exceeded(DeadlineExceeded('response'))
+    elapsed_ms = (time.monotonic() - g.request_started) * 1000
+    logging.info(f"[budget] {request.method} {request.path} done {response.status_code}: {elapsed_ms:.0f}ms elapsed, {remaining * 1000:.0f}ms left")
+    return response
+
+
+def get_database_password(timeout=None):
     """Retrieves the database password from AWS Secrets Manager."""
+    if os.environ.get('DB_PASSWORD'):
+        return os.environ['DB_PASSWORD']
     secret_name = "nelcm-db"
     region_name = "us-east-1"
-    session = boto3.session.Session()
-    client = session.client(service_name='secretsmanager', region_name=region_name)
+    if timeout is None:
+        client = get_client('secretsmanager', region_name=region_name)
+    else:
+        # Clients are cached per config, so timeouts are rounded down to half seconds
+        # to keep the number of cached clients small.
+        timeout = max(0.25, math.floor(timeout * 2) / 2)
+        client = get_client('secretsmanager', region_name=region_name, connect_timeout=timeout,
+                            read_timeout=timeout, retries={'max_attempts': 1})
     try:
-        get_secret_value_response = client.get_secret_value(SecretId=secret_name)
+        with timed('secret'):
+            get_secret_value_response = client.get_secret_value(SecretId=secret_name)
     except ClientError as e:
         # Log the actual error from AWS
         logging.error(f"Failed to retrieve secret '{secret_name}': {e}")
@@ -66,27 +250,138 @@ def get_database_password():
     secret_data = json.loads(secret_string)
     return secret_data['password']
 
-def get_db_connection():
-    """Establishes a connection to the SQL Server database."""
+def replica_configured():
+    return bool(DB_REPLICA_SERVER or DB_REPLICA_READ_INTENT)
+
+def replica_lag_seconds(conn):
+    """
+    Seconds the replica's last commit trails now. Availability-group DMVs report
+    it on RDS replicas; a plain server (local stand-in) has no rows, so lag is 0.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT MAX(DATEDIFF(SECOND, last_commit_time, GETDATE()))
+            FROM sys.dm_hadr_database_replica_states
+            WHERE is_local = 1 AND database_id = DB_ID()
+        """)
+        row = cursor.fetchone()
+        return row[0] if row and row[0] is not None else 0
+    finally:
+        cursor.close()
+
+def connect_replica(db_password):
+    """Returns a healthy replica connection, or None to fall back to the primary."""
+    if time.monotonic() < replica_state['skip_until']:
+        return None
+    try:
+        with timed('replica_connect'):
+            conn = pyodbc.connect(
+                driver=ODBC_DRIVER,
+                server=DB_REPLICA_SERVER or SQL_SERVER_INSTANCE,
+                database=DATABASE_NAME,
+                uid=DATABASE_UID,
+                pwd=db_password,
+                Encrypt='yes',
+                TrustServerCertificate='yes',
+                ApplicationIntent='ReadOnly',
+                timeout=timeout_seconds(remaining_budget(), REPLICA_LOGIN_TIMEOUT)
+            )
+    except pyodbc.Error as ex:
+        logging.warning(f"Read replica unavailable, using primary: {ex}")
+        replica_state['skip_until'] = time.monotonic() + REPLICA_RETRY_SECONDS
+        return None
+
     try:
-        db_password = get_database_password()
+        with timed('replica_lag'):
+            lag = replica_lag_seconds(conn)
+    except pyodbc.Error as ex:
+        logging.warning(f"Could not check replica lag ({ex}); assuming it is current.")
+        lag = 0
+    if lag > DB_REPLICA_MAX_LAG_SECONDS:
+        logging.warning(f"Read replica is {lag}s behind (limit {DB_REPLICA_MAX_LAG_SECONDS}s), using primary.")
+        replica_state['skip_until'] = time.monotonic() + REPLICA_RETRY_SECONDS
+        conn.close()
+        return None
+    return conn
+
+def apply_query_timeout(conn):
+    """Sets conn's query timeout from the request's remaining budget; statement_timeout keeps it current."""
+    try:
+        remaining = check_budget('connected')
+    except DeadlineExceeded:
+        conn.close()
+        raise
+    if remaining is not None:
+        conn.timeout = timeout_seconds(remaining)
+
+def statement_timeout():
+    """
+    Query timeout for the next statement on a request's connection: what is left of
+    the budget, so a slow first statement doesn't leave later ones the full timeout
+    set at connect. sql_stats calls it before every execute.
+    """
+    remaining = remaining_budget()
+    if remaining is None:
+        return None
+    if remaining <= 0:
+        raise DeadlineExceeded('query')
+    return timeout_seconds(remaining)
+
+def open_primary_connection(db_password=None):
+    """One connect attempt to the primary; call_with_retry retries and feeds the breaker."""
+    if db_password is None:
+        db_password = get_database_password(timeout=remaining_budget())
         # If the password could not be retrieved, stop here.
         if db_password is None:
-            logging.error("Database password could not be retrieved. Aborting connection.")
-            return None
+            raise ConnectionError("Database password could not be retrieved.")
 
-        # This connection now uses the direct path to the driver library for consistency.
-        conn = pyodbc.connect(
+    # This connection now uses the direct path to the driver library for consistency.
+    with timed('connect'):
+        return pyodbc.connect(
             driver=ODBC_DRIVER,
             server=SQL_SERVER_INSTANCE,
             database=DATABASE_NAME,
             uid=DATABASE_UID,
             pwd=db_password,
             Encrypt='yes',
-            TrustServerCertificate='yes'
+            TrustServerCertificate='yes',
+            timeout=timeout_seconds(remaining_budget())
         )
-        logging.info("Database connection established successfully.")
-        return conn
+
+def get_db_connection(readonly=False):
+    """
+    Establishes a connection to the SQL Server database. readonly=True routes to
+    the read replica when one is configured and healthy; writes always use the primary.
+
+    Primary connects go through the database circuit breaker: transient failures are
+    retried with jittered backoff inside the request budget, and while the breaker
+    is open this raises CircuitOpenError at once (returned to the client as a 503).
+    """
+    try:
+        check_budget('db connect')
+        db_password = None
+        if readonly and replica_configured() and time.monotonic() >= replica_state['skip_until']:
+            db_password = get_database_password(timeout=remaining_budget())
+            if db_password is not None:
+                conn = connect_replica(db_password)
+                if conn is not None:
+                    logging.info("Read replica connection established successfully.")
+                    apply_query_timeout(conn)
+                    return sql_stats.track(conn, statement_timeout)
+
+        deadline = g.deadline if has_request_context() and getattr(g, 'deadline', None) else None
+        connect = lambda: call_with_retry(lambda: open_primary_connection(db_password), db_breaker, deadline=deadline)
+        if db_pool is not None:
+            with timed('pool'):
+                conn = db_pool.acquire(connect, timeout=remaining_budget())
+        else:
+            conn = connect()
+            logging.info("Database connection established successfully.")
+        apply_query_timeout(conn)
+        return sql_stats.track(conn, statement_timeout)
+    except (DeadlineExceeded, CircuitOpenError, PoolTimeout):
+        raise
     except pyodbc.Error as ex:
         logging.error(f"DATABASE CONNECTION FAILED: {ex}")
         return None
@@ -94,52 +389,183 @@ def get_db_connection():
         logging.error(f"An unexpected error occurred during DB connection: {e}")
         return None
 
-def queue_email_to_sqs(email_details):
-    """Helper function to send a message to the SQS queue."""
-    sqs_queue_url = os.environ.get('SQS_QUEUE_URL')
-    if not sqs_queue_url:
-        logging.error("SQS_QUEUE_URL environment variable not set. Cannot queue email.")
-        return False
-    
+def today_bounds():
+    """Half-open [midnight today, midnight tomorrow) range, as the today's-visits endpoints use."""
+    today_start = datetime.combine(date.today(), datetime.min.time())
+    return today_start, today_start + timedelta(days=1)
+
+def queue_email_to_outbox(cursor, email_details):
+    """
+    Writes an email to dbo.email_outbox on the caller's cursor, so it commits (or rolls
+    back) together with the caller's transaction. outbox_drainer.py pushes it to SQS.
+    """
     if not email_details.get('email'):
         logging.warning(f"Cannot queue email for member {email_details.get('name')}: No email address provided.")
         return False
 
-    try:
-        sqs = boto3.client('sqs')
-        sqs.send_message(
-            QueueUrl=sqs_queue_url,
-            MessageBody=json.dumps(email_details, default=str)
-        )
-        logging.info(f"Successfully queued '{email_details.get('email_type')}' email for {email_details.get('email')}")
-        return True
-    except ClientError as e:
-        logging.error(f"SQS error while queuing email: {e}")
-        return False
+    cursor.execute("""
+        INSERT INTO dbo.email_outbox (email_type, payload)
+        VALUES (?, ?)
+    """, email_details.get('email_type'), json.dumps(email_details, default=str))
+    return True
+
+# --- Record Field Parsing ---
+# Shared by add_record and bulk_import.py, so a form submit and a CSV row are read
+# the same way.
+TRUE_VALUES = ('true', '1', 'yes', 'y')
+
+def parse_birthday(value):
+    """'YYYY-MM-DD' -> (birth_month_day, birth_year); ('01-01', None) if missing or invalid."""
+    value = str(value or '').strip()
+    if value:
+        try:
+            y, m, d = map(int, value.split('-'))
+            if 1 <= m <= 12 and 1 <= d <= 31:
+                return f"{m:02d}-{d:02d}", y
+        except ValueError:
+            pass
+    return '01-01', None
+
+def parse_gender(value):
+    """Gender bit: 1 for male/true, 0 for female/false, None otherwise."""
+    if isinstance(value, bool):
+        return 1 if value else 0
+    if value in (0, 1):
+        return int(value)
+    s = str(value or '').strip().lower()
+    if s in ('true', '1', 'male', 'm'):
+        return 1
+    if s in ('false', '0', 'female', 'f'):
+        return 0
+    return None
+
+def parse_flag(value):
+    """1/0 for a yes/no field sent as a bool, a number or a string."""
+    if isinstance(value, str):
+        return 1 if value.strip().lower() in TRUE_VALUES else 0
+    return 1 if value in (True, 1) else 0
+
+def parse_iso_date(value):
+    """'YYYY-MM-DD' -> date, None if blank. Raises ValueError if it is not a valid date."""
+    value = str(value or '').strip()
+    if not value:
+        return None
+    y, m, d = map(int, value.split('-'))
+    return date(y, m, d)
+
+def membership_expiry(start):
+    """End of the same month one year after start."""
+    _, last_day = calendar.monthrange(start.year + 1, start.month)
+    return date(start.year + 1, start.month, last_day)
+
+# --- Member Id Allocation ---
+# SQL fragments for picking a free LllFf / LllFf-NN id, used by add_record and by
+# bulk_import.merge_staging. Callers read the taken suffixes under UPDLOCK, HOLDLOCK
+# so concurrent allocations for the same base wait for each other.
+
+def base_member_id(first, last):
+    """LllFf: three letters of the last name and two of the first, space-padded."""
+    last_part = (last + '   ')[:3]
+    first_part = (first + '  ')[:2]
+    return last_part[0].upper() + last_part[1:3].lower() + first_part[0].upper() + first_part[1:].lower()
+
+def taken_suffix_sql(base, member_id='member_id'):
+    """Highest number in use for `base`: base itself counts as 1, base-NN as NN."""
+    return (f"MAX(CASE WHEN {member_id} = {base} THEN 1 "
+            f"ELSE TRY_CAST(SUBSTRING({member_id}, DATALENGTH({base}) + 2, 10) AS INT) END)")
+
+def numbered_member_id_sql(base, n):
+    """The id numbered `n` for `base`: base for 1, else base-NN, padded to two digits and never cut."""
+    return (f"CASE WHEN {n} = 1 THEN {base} "
+            f"ELSE {base} + '-' + CASE WHEN {n} < 10 THEN '0' ELSE '' END + CAST({n} AS VARCHAR(10)) END")
 
 # --- API Endpoints ---
 
+@app.route('/api/health', methods=['GET'])
+def health():
+    """
+    Circuit breaker and replica routing state for this container. ?probe=1 also
+    opens a primary connection and runs SELECT 1 (which doubles as the half-open probe).
+    """
+    body = {
+        "database_breaker": db_breaker.snapshot(),
+        "replica": {
+            "configured": replica_configured(),
+            "skipped_for_seconds": round(max(0.0, replica_state['skip_until'] - time.monotonic()), 1)
+        }
+    }
+    if db_pool is not None:
+        body["pool"] = db_pool.snapshot()
+    if event_hub is not None:
+        body["live_events"] = event_hub.snapshot()
+    healthy = body["database_breaker"]["state"] == 'closed'
+    if request.args.get('probe') in ('1', 'true'):
+        try:
+            conn = get_db_connection()
+        except CircuitOpenError as ex:
+            conn = None
+            body["probe"] = f"skipped: {ex}"
+        if conn is not None:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+                body["probe"] = "ok"
+            except pyodbc.Error as ex:
+                body["probe"] = f"failed: {ex}"
+            finally:
+                conn.close()
+        elif "probe" not in body:
+            body["probe"] = "failed: could not connect"
+        healthy = body["probe"] == "ok"
+        body["database_breaker"] = db_breaker.snapshot()
+    body["status"] = "ok" if healthy else "degraded"
+    return jsonify(body), 200 if healthy else 503
+
+# Statement statistics are operational detail, so /api/_stats is off unless
+# STATS_TOKEN is set and the caller sends it in X-Stats-Token.
+STATS_TOKEN = os.environ.get('STATS_TOKEN')
+STATS_ORDERS = ('total_ms', 'p95_ms', 'max_ms', 'calls', 'rows', 'errors')
+
+@app.route('/api/_stats', methods=['GET', 'DELETE'])
+def sql_statement_stats():
+    """
+    Per-fingerprint SQL statistics for this container (see sql_stats.py).
+    GET ?order=p95_ms&limit=20 reads them; DELETE clears them.
+    """
+    if not STATS_TOKEN:
+        return jsonify({"error": "Not found"}), 404
+    if not hmac.compare_digest(request.headers.get('X-Stats-Token', ''), STATS_TOKEN):
+        return jsonify({"error": "Forbidden"}), 403
+
+    if request.method == 'DELETE':
+        sql_stats.reset()
+        return jsonify({"message": "Statement statistics cleared."}), 200
+
+    order = request.args.get('order', 'total_ms')
+    if order not in STATS_ORDERS:
+        return jsonify({"error": f"order must be one of {', '.join(STATS_ORDERS)}"}), 400
+    limit = request.args.get('limit', type=int)
+    return jsonify(sql_stats.snapshot(order_by=order, limit=limit)), 200
+
 @app.route('/api/data', methods=['GET'])
 def get_data():
     """
     Fetches all data by joining members and family tables.
+
+    Read-only (served from the replica when configured). ?fresh=1 reads the primary
+    instead: a screen loading the roster to go with a live events token needs every
+    change committed before that token, which a lagging replica may not have yet.
+    Expired memberships are deactivated by the scheduled expiry sweeper and
+    PUT /api/update_expired_memberships.
     """
-    conn = get_db_connection()
+    fresh = request.args.get('fresh', '').lower() in ('1', 'true', 'yes')
+    conn = get_db_connection(readonly=not fresh)
     if conn is None:
         return jsonify({"error": "Database connection failed"}), 500
 
     cursor = conn.cursor()
     try:
-        today_str = date.today().strftime('%Y-%m-%d')
-        cursor.execute("""
-            UPDATE family
-            SET active_flag = CASE
-                WHEN membership_expires < ? AND founding_family = 0 THEN 0
-                ELSE active_flag
-            END
-        """, today_str)
-        conn.commit()
-        
         query = """
             SELECT
                 m.member_id, m.name, m.last_name, m.phone, m.birthday, m.gender,
@@ -151,11 +577,14 @@ def get_data():
             JOIN
                 family AS f ON m.member_id = f.member_id
         """
-        cursor.execute(query)
-        
-        columns = [column[0] for column in cursor.description]
-        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
-        
+        with timed('query'):
+            cursor.execute(query)
+        with timed('fetch'):
+            raw_rows = cursor.fetchall()
+
+        with timed('rows'):
+            rows = map_rows(cursor, raw_rows)
+
         return jsonify(rows)
 
     except pyodbc.Error as ex:
@@ -182,16 +611,17 @@ def update_expired_memberships():
 
     cursor = conn.cursor()
     try:
-        today_str = date.today().strftime('%Y-%m-%d')
-        cursor.execute("""
-            UPDATE family
-            SET active_flag = 0
-            WHERE membership_expires < ? AND founding_family = 0
-        """, today_str)
-        conn.commit()
-        updated_rows = cursor.rowcount
+        with timed('sweep'):
+            sweep = sweep_expired_memberships(conn)
+        updated_rows = sweep['rows_changed']
         logging.info(f"Checked for expired memberships. Updated {updated_rows} records.")
-        return jsonify({"message": f"Expired memberships updated successfully. {updated_rows} records affected."}), 200
+        return jsonify({
+            "message": f"Expired memberships updated successfully. {updated_rows} records affected.",
+            "rows_changed": updated_rows,
+            "batches": sweep['batches'],
+            "swept_from": sweep['swept_from'],
+            "swept_through": sweep['swept_through']
+        }), 200
     except pyodbc.Error as ex:
         sqlstate = ex.args[0]
         logging.error(f"Database error during expiry update: {sqlstate} - {ex}")
@@ -211,6 +641,7 @@ def add_record():
     - Frontend supplies a single 'birthday' (YYYY-MM-DD). We store only birth_month_day (MM-DD) and birth_year.
     - If birthday is missing/invalid, default birth_month_day to '01-01' to satisfy NOT NULL constraint; birth_year stays NULL.
     - Provide defaults for mem_start_date (today) and membership_expires (EOM 12 months later) unless founding_family=1.
+    - member_id is LllFf; if that is taken the next free -NN suffix is allocated atomically and returned.
     """
     data = request.json or {}
 
@@ -219,74 +650,25 @@ def add_record():
     if not first or not last:
         return jsonify({"error": "First and last name are required."}), 400
 
-    # Build base member_id like LllFf, then uniquify with -NN
-    base_id = (last[:3].ljust(3))[:3].title() + (first[:2].ljust(2))[:2].title()
-    member_id = base_id
-
-    # -- Birthday normalization -> birth_month_day / birth_year
-    birthday_iso = (data.get('birthday') or '').strip() or None
-    birth_month_day = '01-01'   # NOT NULL column default
-    birth_year = None
-    if birthday_iso:
-        try:
-            y, m, d = map(int, birthday_iso.split('-'))
-            if 1 <= m <= 12 and 1 <= d <= 31:
-                birth_month_day = f"{m:02d}-{d:02d}"
-                birth_year = y
-        except Exception:
-            # keep defaults
-            pass
+    # -- Birthday normalization -> birth_month_day ('01-01' if missing, NOT NULL) / birth_year
+    birth_month_day, birth_year = parse_birthday(data.get('birthday'))
 
     # -- Gender normalization -> bit/NULL
-    g = data.get('gender')
-    if isinstance(g, str):
-        s = g.strip().lower()
-        if s in ('true','1','male','m'): g = 1
-        elif s in ('false','0','female','f'): g = 0
-        else: g = None
-    elif isinstance(g, bool):
-        g = 1 if g else 0
-    elif g in (0,1):
-        g = int(g)
-    else:
-        g = None
-
-    # -- Family defaults
-    from datetime import date
-    import calendar as _cal
-
-    def end_of_month(dt):
-        _, last_day = _cal.monthrange(dt.year, dt.month)
-        return dt.replace(day=last_day)
-
-    founding_family = data.get('founding_family')
-    if isinstance(founding_family, str):
-        founding_family = 1 if founding_family.strip().lower() in ('true','1','yes') else 0
-    elif isinstance(founding_family, bool):
-        founding_family = 1 if founding_family else 0
-    elif founding_family in (0,1):
-        founding_family = int(founding_family)
-    else:
-        founding_family = 0
+    g = parse_gender(data.get('gender'))
 
-    mem_start_date = (data.get('mem_start_date') or date.today().isoformat())
+    # -- Family defaults: founding families never expire; a membership expiring this
+    # month still has its renewal email to come.
+    founding_family = parse_flag(data.get('founding_family'))
+    today = date.today()
     try:
-        y, m, d = map(int, mem_start_date.split('-'))
-        from datetime import date as _date
-        mem_start_dt = _date(y, m, d)
-    except Exception:
-        mem_start_dt = date.today()
-        mem_start_date = mem_start_dt.isoformat()
-
-    if founding_family == 1:
-        membership_expires = None
+        mem_start_date = parse_iso_date(data.get('mem_start_date')) or today
+    except ValueError:
+        mem_start_date = today
+    membership_expires = None if founding_family else membership_expiry(mem_start_date)
+    if membership_expires and (membership_expires.year, membership_expires.month) == (today.year, today.month):
+        renewal_email_sent = 0
     else:
-        # Add 12 months, then set to EOM
-        new_year = mem_start_dt.year + (1 if mem_start_dt.month + 12 > 12 else 0)
-        new_month = ((mem_start_dt.month + 12 - 1) % 12) + 1
-        from datetime import date as _date
-        tmp = _date(new_year, new_month, 1)
-        membership_expires = end_of_month(tmp).isoformat()
+        renewal_email_sent = 1
 
     conn = get_db_connection()
     if conn is None:
@@ -294,68 +676,58 @@ def add_record():
     
     cursor = conn.cursor()
     try:
-        first_name = data.get('name', '')
-        last_name = data.get('last_name', '')
-        if not first_name or not last_name:
-            return jsonify({"error": "First name and last name are required."}), 400
-        
-        last_name_part = (last_name + '   ')[:3]
-        first_name_part = (first_name + '  ')[:2]
-        part1 = last_name_part[0].upper() + last_name_part[1:3].lower()
-        part2 = first_name_part[0].upper() + first_name_part[1:].lower()
-        member_id = part1 + part2
+        # One round trip: allocate the member_id, insert both rows, queue the welcome
+        # email and return the id. UPDLOCK/HOLDLOCK range-locks the base id's keys, so
+        # concurrent adds (and bulk imports) for the same base wait instead of colliding;
+        # a taken base gets the next -NN suffix.
+        sql = f"""
+            SET NOCOUNT ON;
+            DECLARE @base VARCHAR(10) = ?, @n INT, @member_id VARCHAR(20);
 
-        cursor.execute("SELECT COUNT(*) FROM members WHERE member_id = ?", member_id)
-        count = cursor.fetchone()[0]
-        if count > 0:
-            return jsonify({"error": f"Generated Member ID '{member_id}' already exists. Please modify the name slightly to create a unique ID."}), 409
+            SELECT @n = COALESCE({taken_suffix_sql('@base')}, 0) + 1
+            FROM members WITH (UPDLOCK, HOLDLOCK)
+            WHERE member_id = @base OR member_id LIKE @base + '-%';
 
-        cursor.execute("""
-            INSERT INTO members (member_id, name, last_name, phone, gender, primary_member, secondary_member, birth_month_day, birth_year)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, 
-        member_id,
-        data.get('name'),
-        data.get('last_name'),
-        data.get('phone'),
-        g,  # your normalized gender
-        True,
-        False,
-        birth_month_day,
-        birth_year
-        )
-
-        today = date.today()
-        if membership_expires and membership_expires[:7] == today.strftime("%Y-%m"):
-            renewal_email_sent = 0
-        else:
-            renewal_email_sent = 1
+            SET @member_id = {numbered_member_id_sql('@base', '@n')};
 
-        mem_start_date = date.today()
-        expiry_year = mem_start_date.year + 1
-        expiry_month = mem_start_date.month
-        _, last_day = calendar.monthrange(expiry_year, expiry_month)
-        membership_expires = date(expiry_year, expiry_month, last_day)
+            INSERT INTO members (member_id, name, last_name, phone, gender, primary_member, secondary_member, birth_month_day, birth_year)
+            VALUES (@member_id, ?, ?, ?, ?, ?, ?, ?, ?);
 
-        cursor.execute("""
             INSERT INTO family (
                 member_id, address, city, state, zip_code, email, founding_family,
                 mem_start_date, membership_expires, active_flag, renewal_email_sent
             )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        member_id, data.get('address'), data.get('city'), data.get('state'), data.get('zip_code'),
-        data.get('email'), founding_family, mem_start_date, membership_expires, True, renewal_email_sent
-        )
+            VALUES (@member_id, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+        """
+        params = [
+            base_member_id(first, last),
+            data.get('name'), data.get('last_name'), data.get('phone'),
+            g,  # your normalized gender
+            True, False, birth_month_day, birth_year,
+            data.get('address'), data.get('city'), data.get('state'), data.get('zip_code'),
+            data.get('email'), founding_family, mem_start_date, membership_expires, True, renewal_email_sent
+        ]
+
+        if data.get('email'):
+            email_details = {
+                "email_type": "welcome",
+                "email": data.get('email'),
+                "name": data.get('name'),
+                "last_name": data.get('last_name')
+            }
+            sql += """
+            INSERT INTO dbo.email_outbox (email_type, payload) VALUES ('welcome', ?);
+            """
+            params.append(json.dumps(email_details, default=str))
+        sql += live_events.family_event_sql('family', '@member_id')
+        sql += """
+            SELECT @member_id AS member_id;
+        """
 
+        cursor.execute(sql, params)
+        member_id = cursor.fetchone()[0]
         conn.commit()
-        email_details = {
-            "email_type": "welcome",
-            "email": data.get('email'),
-            "name": data.get('name'),
-            "last_name": data.get('last_name')
-        }
-        queue_email_to_sqs(email_details)
+        notify_live_events()
         return jsonify({"message": "Record added successfully!", "member_id": member_id}), 201
     except pyodbc.Error as ex:
         conn.rollback()
@@ -423,7 +795,6 @@ def update_record(member_id):
                 query_family = f"UPDATE family SET {', '.join(family_clauses)} WHERE member_id = ?"
                 cursor.execute(query_family, tuple(family_params))
 
-        conn.commit()
         if is_primary and is_renewal:
             email_details = {
                 "email_type": "renewal_thank_you",
@@ -431,7 +802,10 @@ def update_record(member_id):
                 "name": data.get('name'),
                 "last_name": data.get('last_name')
             }
-            queue_email_to_sqs(email_details)
+            queue_email_to_outbox(cursor, email_details)
+        live_events.record_family_event(cursor, 'renewal' if is_primary and is_renewal else 'family', member_id)
+        conn.commit()
+        notify_live_events()
 
         return jsonify({"message": "Record updated successfully!"}), 200
     except pyodbc.Error as ex:
@@ -445,6 +819,120 @@ def update_record(member_id):
         if conn:
             conn.close()
 
+@app.route('/api/bulk_renew', methods=['POST'])
+def bulk_renew():
+    """
+    Renews many families at once.
+
+    Body:
+    {
+      "renewals": [{"member_id": "SmiJo", "mem_start_date": "2025-03-01"}, ...],
+      "send_thank_you": true
+    }
+
+    Expiry is end of month 12 months after each start date (as in update_record),
+    computed in one UPDATE...FROM a temp parameter table. A renewal that has already
+    lapsed leaves the family inactive. renewal_email_sent is reset and thank-you
+    emails go to the outbox in one INSERT...SELECT.
+    """
+    payload = request.get_json(silent=True) or {}
+    renewals = payload.get('renewals') or []
+    if not isinstance(renewals, list) or not renewals:
+        return jsonify({"error": "Body must include a non-empty 'renewals' array."}), 400
+    send_thank_you = payload.get('send_thank_you', True)
+    if isinstance(send_thank_you, str):
+        send_thank_you = send_thank_you.strip().lower() in ('1', 'true', 'yes')
+    else:
+        send_thank_you = bool(send_thank_you)
+
+    params = {}
+    errors = []
+    for r in renewals:
+        member_id = str((r or {}).get('member_id') or '').strip()
+        start_str = str((r or {}).get('mem_start_date') or '').strip()
+        try:
+            start = datetime.strptime(start_str, '%Y-%m-%d').date()
+        except ValueError:
+            errors.append({"member_id": member_id or None, "error": f"Invalid mem_start_date '{start_str}'."})
+            continue
+        if not member_id:
+            errors.append({"member_id": None, "error": "member_id is required."})
+            continue
+        params[member_id] = start  # last entry for a member wins
+    if not params:
+        return jsonify({"error": "No valid renewals.", "errors": errors}), 400
+
+    conn = get_db_connection()
+    if conn is None:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            CREATE TABLE #renewals (
+                member_id VARCHAR(20) COLLATE DATABASE_DEFAULT NOT NULL PRIMARY KEY,
+                mem_start_date DATE NOT NULL
+            )
+        """)
+        cursor.fast_executemany = True
+        cursor.executemany("INSERT INTO #renewals (member_id, mem_start_date) VALUES (?, ?)",
+                           list(params.items()))
+
+        cursor.execute("""
+            UPDATE f
+            SET mem_start_date = r.mem_start_date,
+                membership_expires = EOMONTH(r.mem_start_date, 12),
+                renewal_email_sent = 0,
+                active_flag = CASE WHEN EOMONTH(r.mem_start_date, 12) >= CAST(GETDATE() AS DATE)
+                                   THEN 1 ELSE 0 END
+            OUTPUT INSERTED.member_id, INSERTED.membership_expires
+            FROM family AS f
+            JOIN #renewals AS r ON r.member_id = f.member_id
+        """)
+        renewed = {row[0]: row[1] for row in cursor.fetchall()}
+
+        queued = 0
+        if send_thank_you and renewed:
+            cursor.execute("""
+                INSERT INTO dbo.email_outbox (email_type, payload)
+                SELECT 'renewal_thank_you',
+                       (SELECT 'renewal_thank_you' AS email_type, f.email AS email,
+                               m.name AS name, m.last_name AS last_name
+                        FOR JSON PATH, WITHOUT_ARRAY_WRAPPER)
+                FROM #renewals AS r
+                JOIN family AS f ON f.member_id = r.member_id
+                JOIN members AS m ON m.member_id = f.member_id AND m.primary_member = 1
+                WHERE f.email IS NOT NULL AND f.email <> ''
+            """)
+            queued = cursor.rowcount
+        if renewed:
+            cursor.execute(live_events.family_event_sql(
+                'renewal', 'r.member_id',
+                "FROM #renewals AS r WHERE EXISTS (SELECT 1 FROM family AS fam WHERE fam.member_id = r.member_id)"))
+        cursor.execute("DROP TABLE #renewals")
+        conn.commit()
+        notify_live_events()
+
+        not_found = [m for m in params if m not in renewed]
+        errors.extend({"member_id": m, "error": "Family not found."} for m in not_found)
+        logging.info(f"Bulk renewal: {len(renewed)} renewed, {len(errors)} rejected, {queued} thank-you emails queued.")
+        return jsonify({
+            "message": f"{len(renewed)} memberships renewed.",
+            "renewed": [{"member_id": m, "membership_expires": exp} for m, exp in renewed.items()],
+            "errors": errors,
+            "queued_count": queued
+        }), 200
+    except pyodbc.Error as ex:
+        conn.rollback()
+        sqlstate = ex.args[0]
+        logging.error(f"Error during bulk renewal: {sqlstate} - {ex}")
+        return jsonify({"error": f"Database error: {ex}"}), 500
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
 @app.route('/api/send_renewal_emails', methods=['POST'])
 def send_renewal_emails():
     conn = get_db_connection()
@@ -452,13 +940,8 @@ def send_renewal_emails():
     cursor = conn.cursor()
     
     try:
-        cursor.execute("""
-            UPDATE family
-            SET active_flag = 0
-            WHERE membership_expires < ? AND founding_family = 0
-        """, date.today())
-        conn.commit()
-        
+        sweep_expired_memberships(conn)
+
         today = date.today()
         query = """
             SELECT f.member_id, f.email, m.name, m.last_name, f.membership_expires
@@ -466,10 +949,10 @@ def send_renewal_emails():
             LEFT JOIN members as m ON f.member_id = m.member_id AND m.primary_member = 1
             WHERE 
                 f.founding_family = 0 AND f.active_flag = 1
-                AND MONTH(f.membership_expires) = ? AND YEAR(f.membership_expires) = ?
+                AND f.membership_expires >= ? AND f.membership_expires < ?
                 AND f.renewal_email_sent = 0
         """
-        cursor.execute(query, today.month, today.year)
+        cursor.execute(query, *month_bounds(today))
         expiring_members = cursor.fetchall()
 
         if not expiring_members:
@@ -495,22 +978,58 @@ def send_renewal_emails():
                 'expires': member_dict['expires'].isoformat() if member_dict['expires'] else None
             }
             
-            if queue_email_to_sqs(email_details):
+            if queue_email_to_outbox(cursor, email_details):
                 messages_sent += 1
-        
+        conn.commit()
+
         message = f"Process started. Successfully queued {messages_sent} renewal emails for sending."
         return jsonify({"message": message, "queued_count": messages_sent}), 200
         
     except pyodbc.Error as ex:
+        conn.rollback()
         logging.error(f"Database error during queuing of renewal emails: {ex.args[0]} - {ex}")
         return jsonify({"error": f"Database error: {ex}"}), 500
-    except ClientError as e:
-        logging.error(f"SQS error during queuing of renewal emails: {e}")
-        return jsonify({"error": f"SQS error: {e}"}), 500
     finally:
         if cursor: cursor.close()
         if conn: conn.close()
 
+@app.route('/api/import_families', methods=['POST'])
+def import_families():
+    """
+    Bulk-imports families and members from a CSV upload (multipart 'file' field or a
+    text/csv body). See bulk_import.py for the column layout. Pass ?dry_run=1 to
+    validate and preview member_ids without saving. Returns a per-row report.
+    """
+    upload = request.files.get('file')
+    if upload is not None:
+        lines = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+    elif request.content_length:
+        lines = io.StringIO(request.get_data(as_text=True).lstrip('\ufeff'), newline='')
+    else:
+        return jsonify({"error": "Upload a CSV file or send a text/csv body."}), 400
+    dry_run = request.args.get('dry_run', '').lower() in ('1', 'true', 'yes')
+    # bulk_import imports its field parsers from this module, so it is imported here.
+    from bulk_import import import_csv
+
+    conn = get_db_connection()
+    if conn is None:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        result = import_csv(conn, lines, dry_run=dry_run)
+        if not dry_run:
+            notify_live_events()
+        status = 200 if dry_run else 201
+        return jsonify(result), status
+    except csv.Error as ex:
+        return jsonify({"error": f"Could not parse CSV: {ex}"}), 400
+    except pyodbc.Error as ex:
+        sqlstate = ex.args[0]
+        logging.error(f"Error importing families: {sqlstate} - {ex}")
+        return jsonify({"error": f"Database error: {ex}"}), 500
+    finally:
+        conn.close()
+
 @app.route('/api/delete_record/<member_id>', methods=['DELETE'])
 def delete_record(member_id):
     data = request.json
@@ -531,7 +1050,10 @@ def delete_record(member_id):
             rows_deleted += cursor.rowcount
             cursor.execute("DELETE FROM family WHERE member_id = ?", member_id)
             rows_deleted += cursor.rowcount
+        if rows_deleted:
+            live_events.record_family_event(cursor, 'family', member_id)
         conn.commit()
+        notify_live_events()
         if rows_deleted == 0:
             return jsonify({"error": "Record not found."}), 404
         return jsonify({"message": "Record deleted successfully!"}), 200
@@ -586,8 +1108,10 @@ def add_secondary_member():
         birth_month_day,
         birth_year
         )
+        live_events.record_family_event(cursor, 'family', primary_member_id)
 
         conn.commit()
+        notify_live_events()
         return jsonify({"message": "Secondary member added successfully!"}), 201
     except pyodbc.Error as ex:
         conn.rollback()
@@ -602,7 +1126,7 @@ def add_secondary_member():
 
 @app.route('/api/visits/today/count', methods=['GET'])
 def get_today_visit_count():
-    conn = get_db_connection()
+    conn = get_db_connection(readonly=True)
     if conn is None:
         return jsonify({"error": "Database connection failed"}), 500
 
@@ -630,11 +1154,18 @@ def add_visit():
     
     cursor = conn.cursor()
     try:
-        cursor.execute("""
+        # The visit and its live event commit together.
+        cursor.execute(f"""
+            SET NOCOUNT ON;
+            DECLARE @visit_member_id VARCHAR(20) = ?, @visit_name NVARCHAR(100) = ?, @visit_last_name NVARCHAR(100) = ?,
+                    @visit_datetime DATETIME = ?, @visits_added INT = 1, @day_start DATETIME = ?, @day_end DATETIME = ?;
+
             INSERT INTO Visits (member_id, name, last_name, visit_datetime)
-            VALUES (?, ?, ?, ?)
-        """, data['member_id'], data['name'], data['last_name'], data['visit_datetime'])
+            VALUES (@visit_member_id, @visit_name, @visit_last_name, @visit_datetime);
+            {live_events.VISIT_EVENT_SQL}
+        """, data['member_id'], data['name'], data['last_name'], data['visit_datetime'], *today_bounds())
         conn.commit()
+        notify_live_events()
         return jsonify({"message": "Visit recorded successfully!"}), 201
     except pyodbc.Error as ex:
         sqlstate = ex.args[0]
@@ -646,19 +1177,140 @@ def add_visit():
         if conn:
             conn.close()
 
+MAX_CHECKIN_VISITORS = 20
+
+@app.route('/api/checkin/<member_id>', methods=['GET', 'POST'])
+def checkin(member_id):
+    """
+    Kiosk/card lookup by member_id. GET returns the family, its active status and
+    its members. POST also records visits for the primary member in the same round trip.
+
+    POST body (optional): {"visitors": 3, "visit_datetime": "YYYY-MM-DD HH:MM:SS"}
+    visit_datetime should be the front desk's local time, as add_visit expects.
+    """
+    member_id = (member_id or '').strip()
+    if not member_id:
+        return jsonify({"error": "member_id is required."}), 400
+
+    visitors = 0
+    visit_datetime = None
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        try:
+            visitors = int(data.get('visitors', 1))
+        except (TypeError, ValueError):
+            return jsonify({"error": "visitors must be a number."}), 400
+        if not 1 <= visitors <= MAX_CHECKIN_VISITORS:
+            return jsonify({"error": f"visitors must be between 1 and {MAX_CHECKIN_VISITORS}."}), 400
+        visit_datetime = data.get('visit_datetime') or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    conn = get_db_connection(readonly=request.method == 'GET')
+    if conn is None:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    cursor = conn.cursor()
+    try:
+        # Point lookups on family.member_id and IX_members_member_primary; the visit
+        # insert (if any) and its live event ride in the same batch.
+        cursor.execute(f"""
+            SET NOCOUNT ON;
+            DECLARE @member_id VARCHAR(20) = ?, @visitors INT = ?, @visit_datetime DATETIME = ?;
+            DECLARE @day_start DATETIME = ?, @day_end DATETIME = ?;
+            DECLARE @recorded INT = 0;
+
+            IF @visitors > 0
+            BEGIN
+                INSERT INTO Visits (member_id, name, last_name, visit_datetime)
+                SELECT m.member_id, m.name, m.last_name, @visit_datetime
+                FROM members AS m
+                CROSS APPLY (SELECT TOP (@visitors) 1 AS n FROM sys.all_objects) AS v
+                WHERE m.member_id = @member_id AND m.primary_member = 1;
+                SET @recorded = @@ROWCOUNT;
+            END
+
+            IF @recorded > 0
+            BEGIN
+                DECLARE @visit_member_id VARCHAR(20) = @member_id, @visits_added INT = @recorded,
+                        @visit_name NVARCHAR(100), @visit_last_name NVARCHAR(100);
+                SELECT @visit_name = name, @visit_last_name = last_name
+                FROM members
+                WHERE member_id = @member_id AND primary_member = 1;
+                {live_events.VISIT_EVENT_SQL}
+            END
+
+            SELECT f.member_id, f.address, f.city, f.state, f.zip_code, f.email, f.founding_family,
+                   f.mem_start_date, f.membership_expires, f.active_flag,
+                   CAST(CASE WHEN f.active_flag = 1
+                              AND (f.founding_family = 1 OR f.membership_expires IS NULL
+                                   OR f.membership_expires >= CAST(GETDATE() AS DATE))
+                             THEN 1 ELSE 0 END AS BIT) AS is_active
+            FROM family AS f
+            WHERE f.member_id = @member_id;
+
+            SELECT name, last_name, phone, birthday, gender, primary_member, secondary_member
+            FROM members
+            WHERE member_id = @member_id
+            ORDER BY primary_member DESC, name;
+
+            SELECT @recorded AS visits_recorded;
+        """, member_id, visitors, visit_datetime, *today_bounds())
+
+        family = map_row(cursor, cursor.fetchone())
+        cursor.nextset()
+        members = map_rows(cursor)
+        cursor.nextset()
+        visits_recorded = cursor.fetchone()[0]
+
+        if family is None:
+            conn.rollback()
+            return jsonify({"error": f"No family found for member ID '{member_id}'."}), 404
+        conn.commit()
+        if visits_recorded:
+            notify_live_events()
+
+        return jsonify({
+            "family": family,
+            "active": bool(family.pop('is_active')),
+            "members": members,
+            "visits_recorded": visits_recorded
+        }), 201 if visits_recorded else 200
+    except pyodbc.Error as ex:
+        conn.rollback()
+        sqlstate = ex.args[0]
+        logging.error(f"Error during check-in for {member_id}: {sqlstate} - {ex}")
+        return jsonify({"error": f"Database error: {ex}"}), 500
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
 @app.route('/api/visits/<member_id>/<name>/<last_name>', methods=['GET'])
 def get_member_visits(member_id, name, last_name):
-    conn = get_db_connection()
+    """
+    Visit timestamps for one person, newest first. Only the hot tier (see
+    visit_archiver.py) by default; ?history=full also merges archived visits.
+    """
+    full_history = request.args.get('history') == 'full'
+    conn = get_db_connection(readonly=True)
     if conn is None:
         return jsonify({"error": "Database connection failed"}), 500
 
     cursor = conn.cursor()
     try:
-        cursor.execute("""
+        query = """
             SELECT visit_datetime FROM Visits
             WHERE member_id = ? AND name = ? AND last_name = ?
-            ORDER BY visit_datetime DESC
-        """, member_id, name, last_name)
+        """
+        params = [member_id, name, last_name]
+        if full_history:
+            query += """
+            UNION ALL
+            SELECT visit_datetime FROM dbo.Visits_archive
+            WHERE member_id = ? AND name = ? AND last_name = ?
+            """
+            params += [member_id, name, last_name]
+        cursor.execute(query + " ORDER BY visit_datetime DESC", params)
         visits = [row[0].isoformat() for row in cursor.fetchall()]
         return jsonify(visits), 200
     except pyodbc.Error as ex:
@@ -671,9 +1323,53 @@ def get_member_visits(member_id, name, last_name):
         if conn:
             conn.close()
 
+@app.route('/api/visits/<member_id>/<name>/<last_name>/summary', methods=['GET'])
+def get_member_visit_summary(member_id, name, last_name):
+    """Lifetime visit totals: archived summary plus the hot tier, without reading archived rows."""
+    conn = get_db_connection(readonly=True)
+    if conn is None:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT COUNT(*), MIN(visit_datetime), MAX(visit_datetime)
+            FROM Visits
+            WHERE member_id = ? AND name = ? AND last_name = ?
+        """, member_id, name, last_name)
+        recent_count, recent_first, recent_last = cursor.fetchone()
+
+        cursor.execute("""
+            SELECT archived_visits, first_visit, last_archived_visit
+            FROM dbo.member_visit_summary
+            WHERE member_id = ? AND name = ? AND last_name = ?
+        """, member_id, name, last_name)
+        archived = cursor.fetchone()
+        archived_count, archived_first, archived_last = archived if archived else (0, None, None)
+
+        return jsonify({
+            "member_id": member_id,
+            "name": name,
+            "last_name": last_name,
+            "total_visits": recent_count + archived_count,
+            "recent_visits": recent_count,
+            "archived_visits": archived_count,
+            "first_visit": archived_first or recent_first,
+            "last_visit": recent_last or archived_last
+        }), 200
+    except pyodbc.Error as ex:
+        sqlstate = ex.args[0]
+        logging.error(f"Error fetching visit summary for member {member_id}: {sqlstate} - {ex}")
+        return jsonify({"error": f"Database error: {ex}"}), 500
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
 @app.route('/api/visits/today', methods=['GET'])
 def get_today_visits():
-    conn = get_db_connection()
+    conn = get_db_connection(readonly=True)
     if conn is None:
         return jsonify({"error": "Database connection failed"}), 500
 
@@ -689,14 +1385,9 @@ def get_today_visits():
             ORDER BY visit_datetime DESC
         """
         cursor.execute(sql_query, today_start, tomorrow_start)
-        
-        columns = [column[0] for column in cursor.description]
-        visits = []
-        for row in cursor.fetchall():
-            visit_dict = dict(zip(columns, row))
-            visit_dict['visit_datetime'] = visit_dict['visit_datetime'].isoformat()
-            visits.append(visit_dict)
-        
+        # visit_datetime is left as a datetime; the JSON encoder writes it in isoformat.
+        visits = map_rows(cursor)
+
         return jsonify(visits), 200
     except pyodbc.Error as ex:
         logging.error(f"Failed to fetch today's visits list: {ex}")
@@ -709,7 +1400,7 @@ def get_today_visits():
   
 @app.route('/api/visits/today/grouped', methods=['GET'])
 def get_today_visits_grouped():
-    conn = get_db_connection()
+    conn = get_db_connection(readonly=True)
     if conn is None:
         return jsonify({"error": "Database connection failed"}), 500
 
@@ -732,12 +1423,7 @@ def get_today_visits_grouped():
         """
         cursor.execute(sql, today_start, tomorrow_start)
 
-        cols = [c[0] for c in cursor.description]
-        rows = []
-        for r in cursor.fetchall():
-            row = dict(zip(cols, r))
-            row['last_visit'] = row['last_visit'].isoformat() if row.get('last_visit') else None
-            rows.append(row)
+        rows = map_rows(cursor)
 
         return jsonify(rows), 200
     except pyodbc.Error as ex:
@@ -749,11 +1435,181 @@ def get_today_visits_grouped():
         if conn:
             conn.close()
   
+# --- Live Events ---
+STREAM_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+def poll_live_events(after):
+    """EventHub's read (server mode): one read of app_events on a pooled connection."""
+    conn = get_db_connection()
+    if conn is None:
+        raise ConnectionError("Database connection failed")
+    cursor = conn.cursor()
+    try:
+        return live_events.read_events(cursor, after)
+    finally:
+        cursor.close()
+        conn.close()
+
+@app.route('/api/events', methods=['GET'])
+def live_event_stream():
+    """
+    Server-Sent Events feed of check-ins, family changes and renewals for the
+    front-desk screens (see live_events.py). Resume with the last event id as ?since=
+    (or Last-Event-ID). Without one the stream opens with 'ready' and the current
+    token; 'reset' means events were missed and the screen should reload.
+
+    Under Lambda the response ends after the catch-up and `retry` tells the screen
+    when to reconnect. In server mode (event_hub set) the stream stays open.
+    """
+    since = request.args.get('since') or request.headers.get('Last-Event-ID')
+    try:
+        since = int(since) if since else None
+    except ValueError:
+        return jsonify({"error": "since must be an event id."}), 400
+
+    conn = get_db_connection()
+    if conn is None:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    cursor = conn.cursor()
+    try:
+        with timed('query'):
+            events, head, reset = live_events.read_events(cursor, since)
+    except pyodbc.Error as ex:
+        logging.error(f"Failed to read live events: {ex}")
+        return jsonify({"error": "Could not read live events"}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+    # A full page means more is waiting: end here and let the screen come straight back.
+    more = len(events) >= live_events.READ_LIMIT
+    retry_ms = live_events.RETRY_MS if event_hub is not None else live_events.LAMBDA_RETRY_MS
+    frames = [live_events.format_retry(0 if more else retry_ms)]
+    if since is None or reset:
+        frames.append(live_events.format_marker('reset' if reset else 'ready', head))
+    else:
+        frames.extend(live_events.format_event(*event) for event in events)
+    body = ''.join(frames)
+
+    if event_hub is None or more:
+        return Response(body, mimetype='text/event-stream', headers=STREAM_HEADERS)
+    # Everything up to head has been sent, so the stream carries on from there.
+    return Response(event_hub.stream(head, body), mimetype='text/event-stream', headers=STREAM_HEADERS)
+
+# --- Member Search ---
+SEARCH_CANDIDATES = 200
+SOUNDEX_CODES = {c: d for d, letters in {
+    '1': 'BFPV', '2': 'CGJKQSXZ', '3': 'DT', '4': 'L', '5': 'MN', '6': 'R'}.items() for c in letters}
+
+def normalize_name(value):
+    """Lowercased, accent-stripped, trimmed. Mirrors the *_key columns on members."""
+    decomposed = unicodedata.normalize('NFKD', value or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower().strip()
+
+def soundex(value):
+    """American Soundex, used to rank candidates the *_sx columns matched."""
+    letters = [c for c in normalize_name(value).upper() if c.isalpha()]
+    if not letters:
+        return ''
+    code = letters[0]
+    last = SOUNDEX_CODES.get(letters[0], '')
+    for c in letters[1:]:
+        digit = SOUNDEX_CODES.get(c, '')
+        if digit and digit != last:
+            code += digit
+        if c not in 'HW':
+            last = digit
+    return (code + '000')[:4]
+
+def score_name(token, value):
+    """1.0 exact, 0.9 prefix, 0.7 + similarity for a phonetic match, else plain similarity."""
+    value = normalize_name(value)
+    if not value:
+        return 0.0
+    if value == token:
+        return 1.0
+    if value.startswith(token):
+        return 0.9
+    similarity = difflib.SequenceMatcher(None, token, value).ratio()
+    if soundex(token) == soundex(value):
+        return 0.7 + 0.2 * similarity
+    return 0.6 * similarity
+
+@app.route('/api/search', methods=['GET'])
+def search_members():
+    """
+    Fuzzy member search: /api/search?q=jon smith&limit=25
+
+    Each query word is matched by prefix on the accent-insensitive name keys and by
+    SOUNDEX code, all index seeks (see migrations/0006). The candidates kept are the
+    ones the most words hit, best hit first (exact, then prefix, then SOUNDEX), so a
+    family matching every word is never cut off by TOP; they are then re-ranked by
+    how well every word matches a first or last name.
+    """
+    q = (request.args.get('q') or '').strip()
+    tokens = [normalize_name(t) for t in q.split() if normalize_name(t)][:4]
+    if not tokens:
+        return jsonify({"error": "Query parameter 'q' is required."}), 400
+    try:
+        limit = max(1, min(int(request.args.get('limit', 25)), 100))
+    except ValueError:
+        limit = 25
+
+    clauses, params = [], []
+    hits = []
+    ranks, rank_params = [], []
+    for token in tokens:
+        pattern = token.replace('[', '[[]').replace('%', '[%]').replace('_', '[_]') + '%'
+        clause = "m.last_name_key LIKE ? OR m.name_key LIKE ? OR m.last_name_sx = SOUNDEX(?) OR m.name_sx = SOUNDEX(?)"
+        clauses.append(clause)
+        params.extend([pattern, pattern, token, token])
+        hits.append(f"CASE WHEN {clause} THEN 1 ELSE 0 END")
+        ranks.append("CASE WHEN m.last_name_key = ? OR m.name_key = ? THEN 3"
+                     " WHEN m.last_name_key LIKE ? OR m.name_key LIKE ? THEN 2"
+                     " WHEN m.last_name_sx = SOUNDEX(?) OR m.name_sx = SOUNDEX(?) THEN 1 ELSE 0 END")
+        rank_params.extend([token, token, pattern, pattern, token, token])
+
+    conn = get_db_connection(readonly=True)
+    if conn is None:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"""
+            SELECT TOP ({SEARCH_CANDIDATES})
+                   m.member_id, m.name, m.last_name, m.primary_member,
+                   f.active_flag, f.membership_expires
+            FROM members AS m
+            JOIN family AS f ON f.member_id = m.member_id
+            WHERE {' OR '.join(f'({c})' for c in clauses)}
+            ORDER BY ({' + '.join(hits)}) DESC,
+                     ({' + '.join(ranks)}) DESC,
+                     m.last_name_key, m.name_key, m.member_id
+        """, params + params + rank_params)
+        results = map_rows(cursor)
+        for record in results:
+            # Every word must land on a first or last name; the record scores the average.
+            word_scores = [max(score_name(t, record['name']), score_name(t, record['last_name'])) for t in tokens]
+            record['score'] = round(sum(word_scores) / len(word_scores), 3)
+
+        results.sort(key=lambda r: (-r['score'], (r['last_name'] or '').lower(), (r['name'] or '').lower()))
+        return jsonify(results[:limit]), 200
+    except pyodbc.Error as ex:
+        sqlstate = ex.args[0]
+        logging.error(f"Error searching members for '{q}': {sqlstate} - {ex}")
+        return jsonify({"error": f"Database error: {ex}"}), 500
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
 # --- Exit Survey ---
 @app.route('/api/exit/questions', methods=['GET'])
 def exit_get_questions():
     """Return all exit survey questions."""
-    conn = get_db_connection()
+    conn = get_db_connection(readonly=True)
     if conn is None:
         return jsonify({"error": "Database connection failed"}), 500
 
@@ -775,28 +1631,138 @@ def exit_get_questions():
         try: conn.close()
         except: pass
 
+# --- Exit Survey Submissions ---
+# Kiosks buffer whole surveys and flush them in one request, each with its own
+# client-generated submission_id. Answers are staged with fast_executemany, then one
+# batch records the submissions not seen before and moves only their answers, so a
+# batch that is resent after a timeout is counted once.
+MAX_EXIT_SUBMISSIONS = 500
+SUBMISSION_ID_MAX_LEN = 64
+SUBMISSION_CLOCK_SKEW = timedelta(minutes=5)
+
+EXIT_STAGING_INSERT = """
+    INSERT INTO dbo.exit_answer_staging (batch_id, row_num, submission_id, submitted_at, [number], [answer])
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+EXIT_SUBMISSIONS_MERGE = """
+    SET NOCOUNT ON;
+    DECLARE @new TABLE (submission_id VARCHAR(64) PRIMARY KEY);
+
+    -- UPDLOCK/HOLDLOCK range-locks each id, so two requests carrying the same
+    -- submission can't both see it as new.
+    INSERT INTO dbo.exit_submissions (submission_id, submitted_at, answers)
+    OUTPUT INSERTED.submission_id INTO @new
+    SELECT s.submission_id, MIN(s.submitted_at), COUNT(*)
+    FROM dbo.exit_answer_staging s
+    WHERE s.batch_id = ?
+      AND NOT EXISTS (SELECT 1 FROM dbo.exit_submissions e WITH (UPDLOCK, HOLDLOCK)
+                      WHERE e.submission_id = s.submission_id)
+    GROUP BY s.submission_id;
+
+    INSERT INTO dbo.exit_answers ([number], [answer], [time], submission_id)
+    SELECT s.[number], s.[answer], s.submitted_at, s.submission_id
+    FROM dbo.exit_answer_staging s
+    JOIN @new n ON n.submission_id = s.submission_id
+    WHERE s.batch_id = ?;
+
+    DELETE FROM dbo.exit_answer_staging WHERE batch_id = ?;
+
+    SELECT submission_id FROM @new;
+"""
+
+def parse_submitted_at(value, now_utc):
+    """ISO 8601 timestamp -> naive UTC datetime, clamped to now for fast kiosk clocks."""
+    if not value:
+        return now_utc
+    submitted = datetime.fromisoformat(str(value).strip().replace('Z', '+00:00'))
+    if submitted.tzinfo is not None:
+        submitted = submitted.astimezone(timezone.utc).replace(tzinfo=None)
+    return now_utc if submitted > now_utc + SUBMISSION_CLOCK_SKEW else submitted
+
+def clean_exit_submission(raw, now_utc):
+    """Returns (submission_id, submitted_at, [(number, answer)]) or raises ValueError."""
+    def clean(v, max_len):
+        s = '' if v is None else str(v).strip()
+        return s[:max_len]
+
+    if not isinstance(raw, dict):
+        raise ValueError("Each submission must be an object.")
+    submission_id = clean(raw.get("submission_id"), SUBMISSION_ID_MAX_LEN + 1)
+    if not submission_id or len(submission_id) > SUBMISSION_ID_MAX_LEN:
+        raise ValueError(f"submission_id is required (at most {SUBMISSION_ID_MAX_LEN} characters).")
+    try:
+        submitted_at = parse_submitted_at(raw.get("submitted_at"), now_utc)
+    except ValueError:
+        raise ValueError("submitted_at must be an ISO 8601 timestamp.") from None
+    responses = raw.get("responses")
+    if not isinstance(responses, list):
+        raise ValueError("responses must be an array.")
+    answers = []
+    for r in responses:
+        if not isinstance(r, dict):
+            continue
+        num = clean(r.get("number"), 5)   # varchar(5)
+        ans = clean(r.get("answer"), 50)  # varchar(50)
+        if num and ans:
+            answers.append((num, ans))
+    if not answers:
+        raise ValueError("No valid responses.")
+    return submission_id, submitted_at, answers
+
 @app.route('/api/exit/answers', methods=['POST'])
 def exit_post_answers():
     """
     Body:
     {
-      "responses": [
-        {"number":"1","answer":"5"},
-        {"number":"2","answer":"First-time visit"},
+      "submissions": [
+        {
+          "submission_id": "7c9e6679-7425-40de-944b-e07fc1f90ae7",
+          "submitted_at": "2025-05-03T14:21:07-05:00",
+          "responses": [
+            {"number":"1","answer":"5"},
+            {"number":"2","answer":"First-time visit"},
+            ...
+          ]
+        },
         ...
       ]
     }
+
+    Submissions already recorded are reported as duplicates and skipped. The
+    older single-survey body {"responses": [...]} is still accepted and recorded
+    as one new submission.
     """
     payload = request.get_json(silent=True) or {}
-    responses = payload.get("responses") or []
-    if not isinstance(responses, list) or not responses:
-        return jsonify({"error": "Body must include a non-empty 'responses' array."}), 400
-
-    def clean(v, max_len):
-        s = '' if v is None else str(v).strip()
-        return s[:max_len]
-
-    now_utc = datetime.utcnow()  # or use GETDATE() below
+    now_utc = datetime.utcnow()
+
+    submissions = payload.get("submissions")
+    if submissions is None and payload.get("responses"):
+        submissions = [{"submission_id": str(uuid.uuid4()), "responses": payload.get("responses")}]
+    if not isinstance(submissions, list) or not submissions:
+        return jsonify({"error": "Body must include a non-empty 'submissions' array."}), 400
+    if len(submissions) > MAX_EXIT_SUBMISSIONS:
+        return jsonify({"error": f"At most {MAX_EXIT_SUBMISSIONS} submissions per request."}), 400
+
+    cleaned = {}
+    rejected = []
+    for raw in submissions:
+        try:
+            submission_id, submitted_at, answers = clean_exit_submission(raw, now_utc)
+        except ValueError as ex:
+            submission_id = raw.get("submission_id") if isinstance(raw, dict) else None
+            rejected.append({"submission_id": submission_id, "error": str(ex)})
+            continue
+        # A repeated id within one batch is the same survey sent twice; keep the first.
+        cleaned.setdefault(submission_id, (submitted_at, answers))
+    if not cleaned:
+        return jsonify({"error": "No valid submissions.", "rejected": rejected}), 400
+
+    batch_id = str(uuid.uuid4())
+    staged = []
+    for submission_id, (submitted_at, answers) in cleaned.items():
+        for num, ans in answers:
+            staged.append((batch_id, len(staged) + 1, submission_id, submitted_at, num, ans))
 
     conn = get_db_connection()
     if conn is None:
@@ -805,26 +1771,22 @@ def exit_post_answers():
     cur = conn.cursor()
     try:
         cur.fast_executemany = True
-        rows = []
-        for r in responses:
-            num = clean(r.get("number"), 5)   # varchar(5)
-            ans = clean(r.get("answer"), 50)  # varchar(50)
-            if num and ans:
-                rows.append((num, ans, now_utc))
-        if not rows:
-            return jsonify({"error": "No valid responses to insert."}), 400
-
-        cur.executemany("""
-            INSERT INTO dbo.exit_answers ([number],[answer],[time])
-            VALUES (?, ?, ?)
-        """, rows)
-
-        # If you prefer SQL Server's clock, use this instead:
-        # cur.executemany("INSERT INTO dbo.exit_answers ([number],[answer],[time]) VALUES (?, ?, GETDATE())",
-        #                 [(n, a) for (n, a, _) in rows])
-
+        with timed('stage'):
+            cur.executemany(EXIT_STAGING_INSERT, staged)
+        with timed('query'):
+            cur.execute(EXIT_SUBMISSIONS_MERGE, batch_id, batch_id, batch_id)
+            accepted = {row[0] for row in cur.fetchall()}
+            rows = [(num, ans, submitted_at)
+                    for submission_id, (submitted_at, answers) in cleaned.items() if submission_id in accepted
+                    for num, ans in answers]
+            record_answers(cur, rows)
         conn.commit()
-        return jsonify({"inserted": len(rows)}), 201
+        return jsonify({
+            "inserted": len(rows),
+            "accepted": [submission_id for submission_id in cleaned if submission_id in accepted],
+            "duplicates": [submission_id for submission_id in cleaned if submission_id not in accepted],
+            "rejected": rejected,
+        }), 201 if rows else 200
     except pyodbc.Error as ex:
         conn.rollback()
         app.logger.error(f"Error inserting exit answers: {ex}")
@@ -835,5 +1797,46 @@ def exit_post_answers():
         try: conn.close()
         except: pass
 
+@app.route('/api/exit/results', methods=['GET'])
+def exit_get_results():
+    """
+    Exit survey results from the daily rollup (UTC days).
+
+    Query: from, to (YYYY-MM-DD, inclusive; default the last 30 days) and
+    interval=day|week for the trend. Each question gets its answer counts and
+    shares, the average of its numeric answers, and responses/average per period.
+    """
+    today = datetime.utcnow().date()
+    try:
+        end = date.fromisoformat(request.args['to']) if request.args.get('to') else today
+        start = date.fromisoformat(request.args['from']) if request.args.get('from') else end - timedelta(days=29)
+    except ValueError:
+        return jsonify({"error": "from and to must be dates (YYYY-MM-DD)."}), 400
+    if start > end:
+        return jsonify({"error": "from must not be after to."}), 400
+    if (end - start).days >= MAX_RESULT_DAYS:
+        return jsonify({"error": f"The date range can cover at most {MAX_RESULT_DAYS} days."}), 400
+    interval = request.args.get('interval', 'day')
+    if interval not in RESULT_INTERVALS:
+        return jsonify({"error": f"interval must be one of {', '.join(RESULT_INTERVALS)}"}), 400
+
+    conn = get_db_connection(readonly=True)
+    if conn is None:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    cur = conn.cursor()
+    try:
+        with timed('query'):
+            results = survey_results(cur, start, end, interval)
+        return jsonify(results), 200
+    except pyodbc.Error as ex:
+        app.logger.error(f"Error fetching exit survey results: {ex}")
+        return jsonify({"error": "Database error fetching exit survey results"}), 500
+    finally:
+        try: cur.close()
+        except: pass
+        try: conn.close()
+        except: pass
+
 if __name__ == '__main__':
     app.run(host = '0.0.0.0', port = 5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,37 @@
+# aws_clients.py
+"""
+Lazily created, reused boto3 clients.
+
+Importing boto3 (and botocore.config) is one of the larger costs of a cold start,
+and building a session and client on every call repeats endpoint and credential
+resolution. get_client imports boto3 on first use and keeps one client per
+(service, region, config) for the life of the container. boto3 clients are safe
+to share between threads.
+"""
+import threading
+
+AWS_REGION = "us-east-1"
+
+_clients = {}
+_lock = threading.Lock()
+
+def get_client(service_name, region_name=AWS_REGION, **config):
+    """
+    Returns the shared client for service_name. Keyword arguments are botocore
+    Config options (connect_timeout, read_timeout, retries); each distinct set
+    gets its own client, so callers should keep the number of variants small.
+    """
+    key = (service_name, region_name, repr(sorted(config.items())))
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            import boto3
+            from botocore.config import Config
+            session = boto3.session.Session()
+            client = session.client(service_name=service_name, region_name=region_name,
+                                    config=Config(**config) if config else None)
+            _clients[key] = client
+    return client
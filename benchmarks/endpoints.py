@@ -0,0 +1,284 @@
+# benchmarks/endpoints.py
+"""
+Endpoint micro-benchmarks for app.py, run in-process with Flask's test client.
+
+get_db_connection is pointed at a local stand-in database that is seeded with a
+synthetic roster at each size (families, their members and a year of visits),
+then every endpoint in ENDPOINTS is timed over --runs requests. Peak Python memory
+per request is measured in a separate pass under tracemalloc, and SQL time and
+statement counts come from sql_stats.
+
+Backends:
+  sqlite     (default) a temporary SQLite file behind benchmarks.sqlite_shim
+  sqlserver  the real get_db_connection; set DB_SERVER, DB_PASSWORD (and DB_DRIVER,
+             DB_NAME, DB_UID as needed) for a local SQL Server container that already
+             has the museum schema and migrations. Refuses to run without DB_SERVER.
+
+  python -m benchmarks.endpoints --sizes 1000,10000 --runs 20 --out bench.json
+  python -m benchmarks.endpoints --compare before.json --out after.json
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+# Requests are timed end to end; the production 5s budget would cut the big sizes short.
+os.environ.setdefault('API_TIMEOUT_SECONDS', '600')
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import app as app_module  # noqa: E402
+import sql_stats  # noqa: E402
+from benchmarks import sqlite_shim  # noqa: E402
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+FIRST_NAMES = ['Ava', 'Liam', 'Mia', 'Noah', 'Emma', 'Eli', 'Zoe', 'Owen', 'Lily', 'Jack', 'Ruby', 'Levi']
+LAST_NAMES = ['Smith', 'Johnson', 'Brown', 'Davis', 'Miller', 'Wilson', 'Moore', 'Taylor', 'Thomas',
+              'Martin', 'Thibodeaux', 'Landry', 'Guidry', 'Broussard', 'Hebert', 'Fontenot']
+EXIT_QUESTIONS = [(str(n), f"Question {n}") for n in range(1, 11)]
+
+# name -> (method, path or callable(sample) -> path, json body or callable(sample) -> body)
+ENDPOINTS = {
+    'data': ('GET', '/api/data', None),
+    'visits_today': ('GET', '/api/visits/today', None),
+    'visits_today_count': ('GET', '/api/visits/today/count', None),
+    'visits_today_grouped': ('GET', '/api/visits/today/grouped', None),
+    'member_visits': ('GET', lambda s: f"/api/visits/{s['member_id']}/{s['name']}/{s['last_name']}", None),
+    'member_visit_summary': ('GET', lambda s: f"/api/visits/{s['member_id']}/{s['name']}/{s['last_name']}/summary", None),
+    'add_record': ('POST', '/api/add_record', lambda s: {
+        'name': 'Bench', 'last_name': 'Marker', 'phone': '318-555-0100', 'birthday': '2015-06-01',
+        'address': '1 Main St', 'city': 'Monroe', 'state': 'LA', 'zip_code': '71201', 'email': ''}),
+    'exit_questions': ('GET', '/api/exit/questions', None),
+    'exit_answers': ('POST', '/api/exit/answers', lambda s: {
+        'responses': [{'number': number, 'answer': '5'} for number, _ in EXIT_QUESTIONS]}),
+    'exit_results': ('GET', '/api/exit/results?interval=week', None),
+    'events': ('GET', '/api/events?since=0', None),
+    'search': ('GET', lambda s: f"/api/search?q={s['name']}+{s['last_name']}", None),
+}
+
+def member_id_for(last, first, n):
+    base = (last + '   ')[:3].title() + (first + '  ')[:2].title()
+    return base if n == 0 else f"{base}-{n:02d}"
+
+def generate_roster(families, seed=7):
+    """Returns (members, family rows, visits, sample member) for `families` families."""
+    rng = random.Random(seed)
+    today = date.today()
+    now = datetime.now().replace(microsecond=0)
+    taken = {}
+    members, family, visits = [], [], []
+    for _ in range(families):
+        last, first = rng.choice(LAST_NAMES), rng.choice(FIRST_NAMES)
+        base = member_id_for(last, first, 0)
+        n = taken.get(base, -1) + 1
+        taken[base] = n
+        member_id = member_id_for(last, first, n + 1 if n else 0)
+
+        start = today - timedelta(days=rng.randint(0, 700))
+        expires = start + timedelta(days=365)
+        family.append((member_id, f"{rng.randint(1, 9999)} Main St", 'Monroe', 'LA', '71201',
+                       f"{member_id.lower()}@example.com" if rng.random() < 0.8 else None,
+                       int(rng.random() < 0.02), start, expires, int(expires >= today), 0))
+
+        people = [(first, True)] + [(rng.choice(FIRST_NAMES) + str(i), False) for i in range(rng.randint(0, 3))]
+        for name, primary in people:
+            members.append((member_id, name, last, '318-555-0100', rng.randint(0, 1), int(primary), int(not primary),
+                            f"{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}", rng.randint(2008, 2022)))
+
+        for _ in range(rng.randint(0, 5)):
+            visits.append((member_id, first, last, now - timedelta(days=rng.randint(1, 365), minutes=rng.randint(0, 600))))
+        if rng.random() < 0.03:
+            for name, _ in people:
+                visits.append((member_id, name, last, now - timedelta(minutes=rng.randint(0, 480))))
+
+    visited = visits[0] if visits else members[0]
+    sample = {'member_id': visited[0], 'name': visited[1], 'last_name': visited[2]}
+    return members, family, visits, sample
+
+def seed(cursor, families):
+    members, family, visits, sample = generate_roster(families)
+    cursor.fast_executemany = True
+    cursor.executemany("""
+        INSERT INTO members (member_id, name, last_name, phone, gender, primary_member, secondary_member, birth_month_day, birth_year)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, members)
+    cursor.executemany("""
+        INSERT INTO family (member_id, address, city, state, zip_code, email, founding_family,
+                            mem_start_date, membership_expires, active_flag, renewal_email_sent)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, family)
+    cursor.executemany("INSERT INTO Visits (member_id, name, last_name, visit_datetime) VALUES (?, ?, ?, ?)", visits)
+    cursor.executemany("INSERT INTO exit_questions ([number], [question]) VALUES (?, ?)", EXIT_QUESTIONS)
+    return {'families': len(family), 'members': len(members), 'visits': len(visits)}, sample
+
+class SqliteBackend:
+    name = 'sqlite'
+
+    def __init__(self):
+        self.dir = tempfile.TemporaryDirectory(prefix='nelcm-bench-')
+        self.path = None
+
+    def prepare(self, families):
+        self.path = os.path.join(self.dir.name, f"roster_{families}.db")
+        sqlite_shim.create_schema(self.path)
+        conn = sqlite_shim.SqliteConnection(self.path)
+        cursor = conn.cursor()
+        counts, sample = seed(cursor, families)
+        conn.commit()
+        conn.close()
+        app_module.get_db_connection = self.connect
+        return counts, sample
+
+    def connect(self, readonly=False):
+        return sql_stats.track(sqlite_shim.SqliteConnection(self.path))
+
+    def close(self):
+        self.dir.cleanup()
+
+class SqlServerBackend:
+    name = 'sqlserver'
+
+    def __init__(self):
+        # prepare() empties the roster tables, so never let this reach a real database.
+        server = os.environ.get('DB_SERVER', '')
+        if not server or 'rds.amazonaws.com' in server:
+            sys.exit("--backend sqlserver needs DB_SERVER (and DB_PASSWORD) pointing at a local container.")
+        self.connect = app_module.get_db_connection
+
+    def prepare(self, families):
+        conn = self.connect()
+        if conn is None:
+            sys.exit("Could not connect to the SQL Server stand-in.")
+        cursor = conn.cursor()
+        for table in ('dbo.exit_answers', 'dbo.exit_questions', 'dbo.email_outbox', 'dbo.Visits', 'dbo.family', 'dbo.members'):
+            cursor.execute(f"DELETE FROM {table}")
+        counts, sample = seed(cursor, families)
+        conn.commit()
+        conn.close()
+        return counts, sample
+
+    def close(self):
+        pass
+
+def resolve(spec, sample):
+    return spec(sample) if callable(spec) else spec
+
+def request_once(client, method, path, body):
+    response = client.open(path, method=method, json=body)
+    return response.status_code, len(response.get_data())
+
+def bench_endpoint(client, name, sample, runs, warmup):
+    method, path_spec, body_spec = ENDPOINTS[name]
+    path, body = resolve(path_spec, sample), resolve(body_spec, sample)
+    for _ in range(warmup):
+        request_once(client, method, path, body)
+
+    timings, sql_ms, statements = [], [], []
+    status = size = None
+    for _ in range(runs):
+        sql_before, calls_before = sql_stats.total_ms(), sql_stats.snapshot()['total_calls']
+        started = time.perf_counter()
+        status, size = request_once(client, method, path, body)
+        timings.append((time.perf_counter() - started) * 1000)
+        sql_ms.append(sql_stats.total_ms() - sql_before)
+        statements.append(sql_stats.snapshot()['total_calls'] - calls_before)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    request_once(client, method, path, body)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    ordered = sorted(timings)
+    return {
+        'status': status,
+        'response_bytes': size,
+        'runs': runs,
+        'mean_ms': round(statistics.mean(timings), 2),
+        'p50_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+        'min_ms': round(ordered[0], 2),
+        'max_ms': round(ordered[-1], 2),
+        'sql_ms_mean': round(statistics.mean(sql_ms), 2),
+        'statements_per_request': round(statistics.mean(statements), 1),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_size(families, counts, seed_seconds, results, previous=None):
+    print(f"\n{families} families ({counts['members']} members, {counts['visits']} visits; seeded in {seed_seconds:.1f}s)")
+    print(f"  {'endpoint':<22}{'status':>7}{'p50':>10}{'p95':>10}{'sql':>10}{'stmts':>7}{'peak':>11}{'bytes':>11}")
+    for name, result in results.items():
+        line = (f"  {name:<22}{result['status']:>7}{result['p50_ms']:>8.1f}ms{result['p95_ms']:>8.1f}ms"
+                f"{result['sql_ms_mean']:>8.1f}ms{result['statements_per_request']:>7}"
+                f"{result['peak_kib']:>8.0f}KiB{result['response_bytes']:>11}")
+        before = (previous or {}).get(name)
+        if before and before.get('p50_ms'):
+            line += f"  p50 {100.0 * (result['p50_ms'] - before['p50_ms']) / before['p50_ms']:+.0f}%"
+        print(line)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('endpoints', nargs='*', help=f"subset of: {', '.join(ENDPOINTS)}")
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help='comma-separated roster sizes (families)')
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--backend', choices=('sqlite', 'sqlserver'), default='sqlite')
+    parser.add_argument('--out', help='write results as JSON')
+    parser.add_argument('--compare', help='JSON from an earlier --out; prints p50 change per endpoint')
+    args = parser.parse_args(argv)
+
+    names = args.endpoints or list(ENDPOINTS)
+    unknown = [name for name in names if name not in ENDPOINTS]
+    if unknown:
+        parser.error(f"unknown endpoint(s): {', '.join(unknown)}")
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+
+    logging.getLogger().setLevel(logging.WARNING)
+    previous = {}
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f).get('sizes', {})
+
+    backend = SqliteBackend() if args.backend == 'sqlite' else SqlServerBackend()
+    client = app_module.app.test_client()
+    report = {'created': datetime.now().isoformat(timespec='seconds'), 'commit': git_commit(),
+              'python': sys.version.split()[0], 'backend': backend.name, 'sizes': {}}
+    try:
+        for families in sizes:
+            started = time.perf_counter()
+            counts, sample = backend.prepare(families)
+            seed_seconds = time.perf_counter() - started
+            sql_stats.reset()
+            results = {name: bench_endpoint(client, name, sample, args.runs, args.warmup) for name in names}
+            report['sizes'][str(families)] = {'counts': counts, 'seed_seconds': round(seed_seconds, 2),
+                                              'endpoints': results}
+            print_size(families, counts, seed_seconds,
+                       results, previous.get(str(families), {}).get('endpoints'))
+    finally:
+        backend.close()
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.out}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
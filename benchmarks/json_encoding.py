@@ -0,0 +1,96 @@
+# benchmarks/json_encoding.py
+"""
+Encoding cost of the /api/data payload under each json_backend.
+
+Builds the rows get_data returns (one dict per member with its family's columns,
+dates as date objects) for a synthetic roster at each size, then times:
+
+  legacy   json.dumps with the old isinstance-chain default callback
+  stdlib   json_backend on the stdlib json module
+  orjson   json_backend on orjson (skipped when orjson is not installed)
+
+Every backend's output is decoded and checked against the legacy output first.
+
+  python -m benchmarks.json_encoding --sizes 1000,10000 --runs 10
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+import json_backend
+from benchmarks.endpoints import generate_roster
+
+COLUMNS = ['member_id', 'name', 'last_name', 'phone', 'birthday', 'gender', 'primary_member', 'secondary_member',
+           'address', 'city', 'state', 'zip_code', 'email', 'founding_family',
+           'mem_start_date', 'membership_expires', 'active_flag', 'renewal_email_sent']
+
+def legacy_default(o):
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    if isinstance(o, Decimal):
+        return float(o)
+    raise TypeError(f"Object of type {o.__class__.__name__} is not JSON serializable")
+
+def data_rows(families):
+    members, family, _, _ = generate_roster(families)
+    by_id = {row[0]: row[1:] for row in family}
+    rows = []
+    for member_id, name, last, phone, gender, primary, secondary, month_day, year in members:
+        birthday = date.fromisoformat(f"{year}-{month_day}")
+        rows.append(dict(zip(COLUMNS, (member_id, name, last, phone, birthday, gender, primary, secondary)
+                             + tuple(by_id[member_id]))))
+    return rows
+
+def encoders():
+    def with_backend(backend):
+        def encode(rows):
+            previous, json_backend.BACKEND = json_backend.BACKEND, backend
+            try:
+                return json_backend.dumps_bytes(rows)
+            finally:
+                json_backend.BACKEND = previous
+        return encode
+
+    found = {'legacy': lambda rows: json.dumps(rows, default=legacy_default).encode('utf-8'),
+             'stdlib': with_backend('stdlib')}
+    if json_backend.orjson is not None:
+        found['orjson'] = with_backend('orjson')
+    return found
+
+def time_encoder(encode, rows, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        body = encode(rows)
+        timings.append((time.perf_counter() - started) * 1000)
+    return {'p50_ms': round(statistics.median(timings), 2), 'min_ms': round(min(timings), 2), 'bytes': len(body)}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,10000', help='comma-separated family counts')
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    found = encoders()
+    for families in [int(size) for size in args.sizes.split(',')]:
+        rows = data_rows(families)
+        expected = json.loads(found['legacy'](rows))
+        for name, encode in found.items():
+            if json.loads(encode(rows)) != expected:
+                raise AssertionError(f"{name} output differs from legacy at {families} families")
+
+        results = {name: time_encoder(encode, rows, args.runs) for name, encode in found.items()}
+        baseline = results['legacy']['p50_ms']
+        print(f"{families} families, {len(rows)} rows")
+        for name, result in results.items():
+            speedup = baseline / result['p50_ms'] if result['p50_ms'] else float('inf')
+            print(f"  {name:<8}{result['p50_ms']:>10.2f}ms p50{result['min_ms']:>10.2f}ms min"
+                  f"{result['bytes']:>12,} bytes{speedup:>8.1f}x")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
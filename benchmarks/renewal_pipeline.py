@@ -0,0 +1,240 @@
+# benchmarks/renewal_pipeline.py
+"""
+End-to-end benchmark of the monthly renewal pipeline:
+
+  renewal_trigger -> SQS -> email_sender -> SMTP (SES) -> SNS -> ses_handler
+
+The real handler functions run in-process against local stand-ins: Secrets Manager
+and SQS answer from memory (benchmarks.stubs), smtplib.SMTP_SSL is an SMTP sink,
+and pyodbc.connect opens a SQLite file behind benchmarks.sqlite_shim, so each
+handler's own get_db_connection, circuit breaker and sql_stats tracking run
+unchanged. The database is seeded with --families families expiring later this
+month plus some that lapsed last month (swept by the deactivate stage) and some
+expiring next month (not selected).
+
+Stages:
+  trigger  renewal_trigger.handler: sweep, select, render the mailer PDF, mail it, enqueue
+  send     drain the queue into email_sender.handler in --sqs-batch-size batches
+  bounce   feed SES bounce/complaint notifications for --bounce-rate of the delivered
+           addresses through ses_handler.handler, one SNS record per invocation
+
+For each stage: wall time, items handled, items/sec, DB round trips (connections
+and statements), SQL time and peak Python memory (tracemalloc; --no-memory skips it
+for undistorted timings). EMF metric lines the handlers print are captured, not shown.
+
+  python -m benchmarks.renewal_pipeline --families 500
+  python -m benchmarks.renewal_pipeline --families 2000 --smtp-latency-ms 40 --out renewal.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+os.environ.setdefault('SQS_QUEUE_URL', 'https://sqs.us-east-1.amazonaws.com/000000000000/benchmark-renewals')
+
+from benchmarks import sqlite_shim, stubs  # noqa: E402
+
+stubs.install_fake_secrets()
+queue = stubs.install_fake_sqs()
+
+import pyodbc  # noqa: E402
+import sql_stats  # noqa: E402
+from date_ranges import month_bounds  # noqa: E402
+import renewal_trigger  # noqa: E402
+import email_sender  # noqa: E402
+import ses_handler  # noqa: E402
+
+LAST_NAMES = ['Smith', 'Johnson', 'Brown', 'Davis', 'Miller', 'Wilson', 'Moore', 'Taylor',
+              'Thibodeaux', 'Landry', 'Guidry', 'Broussard', 'Hebert', 'Fontenot']
+FIRST_NAMES = ['Ava', 'Liam', 'Mia', 'Noah', 'Emma', 'Eli', 'Zoe', 'Owen']
+
+def month_end(day):
+    return month_bounds(day)[1] - timedelta(days=1)
+
+def seed(path, families, today, noise=0.2, seed=11):
+    """families expiring in [today, end of month], plus noise * families on either side."""
+    rng = random.Random(seed)
+    last_of_month = month_end(today)
+    last_month = today.replace(day=1) - timedelta(days=1)
+    next_month = last_of_month + timedelta(days=1)
+    extra = int(families * noise)
+    expiries = ([today + timedelta(days=rng.randint(0, (last_of_month - today).days)) for _ in range(families)]
+                + [last_month - timedelta(days=rng.randint(0, 27)) for _ in range(extra)]
+                + [next_month + timedelta(days=rng.randint(0, 27)) for _ in range(extra)])
+
+    members, family = [], []
+    for n, expires in enumerate(expiries):
+        last = LAST_NAMES[n % len(LAST_NAMES)]
+        member_id = f"{last[:3].upper()}{n:06d}"
+        family.append((member_id, f"{n} Main St", 'Monroe', 'LA', '71201',
+                       f"family{n}@example.org", 0, expires - timedelta(days=365), expires, 1, 0))
+        members.append((member_id, rng.choice(FIRST_NAMES[:4]), last, '318-555-0100', 1, 1, 0, '06-01', 1985))
+        members.append((member_id, rng.choice(FIRST_NAMES[4:]), last, None, 0, 0, 1, '03-15', 2016))
+
+    sqlite_shim.create_schema(path)
+    conn = sqlite_shim.SqliteConnection(path)
+    cursor = conn.cursor()
+    cursor.executemany("""
+        INSERT INTO members (member_id, name, last_name, phone, gender, primary_member, secondary_member,
+                             birth_month_day, birth_year)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, members)
+    cursor.executemany("""
+        INSERT INTO family (member_id, address, city, state, zip_code, email, founding_family,
+                            mem_start_date, membership_expires, active_flag, renewal_email_sent)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, family)
+    conn.commit()
+    conn.close()
+    return {'expiring': families, 'lapsed': extra, 'next_month': extra}
+
+class Connections:
+    """pyodbc.connect replacement that opens the benchmark database and counts connections."""
+
+    def __init__(self, path):
+        self.path = path
+        self.opened = 0
+
+    def __call__(self, *args, **kwargs):
+        self.opened += 1
+        return sqlite_shim.SqliteConnection(self.path)
+
+def run_stage(name, connections, body, trace_memory=True):
+    """
+    Runs body() -> items handled, measuring wall time, DB work and peak memory.
+    tracemalloc slows allocation-heavy code noticeably; pass trace_memory=False for
+    timings that compare with production.
+    """
+    opened = connections.opened
+    calls = sql_stats.snapshot()['total_calls']
+    sql_ms = sql_stats.total_ms()
+    emf = io.StringIO()
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(emf):
+        items = body()
+    seconds = time.perf_counter() - started
+    peak = None
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {
+        'stage': name,
+        'seconds': round(seconds, 3),
+        'items': items,
+        'items_per_second': round(items / seconds, 1) if seconds > 0 else None,
+        'connections': connections.opened - opened,
+        'statements': sql_stats.snapshot()['total_calls'] - calls,
+        'sql_ms': round(sql_stats.total_ms() - sql_ms, 1),
+        'peak_kb': round(peak / 1024, 1) if peak is not None else None,
+        'emf_lines': sum(1 for line in emf.getvalue().splitlines() if line.startswith('{')),
+    }
+
+def trigger_stage(context_timeout_ms):
+    def body():
+        result = renewal_trigger.handler({}, stubs.FakeLambdaContext('renewal_trigger', context_timeout_ms))
+        if result['statusCode'] != 200:
+            raise RuntimeError(f"renewal_trigger failed: {result['body']}")
+        return len(queue.messages)
+    return body
+
+def send_stage(batch_size):
+    def body():
+        sent = 0
+        while queue.messages:
+            records = queue.receive(batch_size)
+            email_sender.handler({'Records': records}, stubs.FakeLambdaContext('email_sender', 15000))
+            sent += len(records)
+        return sent
+    return body
+
+def bounce_stage(addresses, rate, seed=5):
+    rng = random.Random(seed)
+    picked = rng.sample(addresses, int(len(addresses) * rate)) if addresses else []
+    kinds = ['permanent', 'permanent', 'transient', 'complaint']
+    notifications = [stubs.ses_notification(kinds[i % len(kinds)], email) for i, email in enumerate(picked)]
+
+    def body():
+        for notification in notifications:
+            ses_handler.handler(stubs.sns_event([notification]), stubs.FakeLambdaContext('ses_handler', 6000))
+        return len(notifications)
+    return body
+
+def database_counts(path):
+    conn = sqlite_shim.SqliteConnection(path)
+    cursor = conn.cursor()
+    counts = {}
+    for name, sql in [
+        ('renewal_flagged', "SELECT COUNT(*) FROM family WHERE renewal_email_sent = 1"),
+        ('emails_removed', "SELECT COUNT(*) FROM family WHERE email IS NULL"),
+        ('deactivated', "SELECT COUNT(*) FROM family WHERE active_flag = 0"),
+        ('job_status', "SELECT status FROM renewal_jobs ORDER BY job_id DESC LIMIT 1"),
+    ]:
+        counts[name] = cursor.execute(sql).fetchone()[0]
+    conn.close()
+    return counts
+
+def print_report(args, seeded, stages, total_seconds, emails, counts):
+    print(f"{args.families} expiring families (+{seeded['lapsed']} lapsed, +{seeded['next_month']} next month), "
+          f"smtp latency {args.smtp_latency_ms:g}ms, SQS batch {args.sqs_batch_size}, bounce rate {args.bounce_rate:g}")
+    print(f"{'stage':<10}{'wall':>10}{'items':>8}{'items/s':>10}{'conns':>7}{'stmts':>8}{'sql':>10}{'peak':>11}")
+    for s in stages:
+        rate = f"{s['items_per_second']:.1f}" if s['items_per_second'] is not None else '-'
+        peak = f"{s['peak_kb']:.0f}KB" if s['peak_kb'] is not None else '-'
+        print(f"{s['stage']:<10}{s['seconds']:>9.2f}s{s['items']:>8}{rate:>10}{s['connections']:>7}"
+              f"{s['statements']:>8}{s['sql_ms']:>8.0f}ms{peak:>11}")
+    print(f"end to end {total_seconds:.2f}s, {emails} emails delivered, {emails / total_seconds:.1f} emails/s")
+    print(f"database: {counts}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--families', type=int, default=500, help='families expiring this month')
+    parser.add_argument('--sqs-batch-size', type=int, default=5, help='records per email_sender invocation')
+    parser.add_argument('--bounce-rate', type=float, default=0.03, help='share of delivered addresses that bounce or complain')
+    parser.add_argument('--smtp-latency-ms', type=float, default=0.0, help='simulated SES latency per connect, login and send')
+    parser.add_argument('--no-memory', action='store_true', help='skip tracemalloc, for undistorted timings')
+    parser.add_argument('--out', help='write results as JSON')
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(logging.WARNING)
+    today = date.today()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'renewal.sqlite')
+        seeded = seed(path, args.families, today)
+        connections = Connections(path)
+        pyodbc.connect = connections
+        sink = stubs.install_smtp_sink(args.smtp_latency_ms)
+        sql_stats.reset()
+
+        started = time.perf_counter()
+        trace = not args.no_memory
+        stages = [run_stage('trigger', connections, trigger_stage(900000), trace)]
+        stages.append(run_stage('send', connections, send_stage(args.sqs_batch_size), trace))
+        # The mailer PDF goes to staff, not to members; only member addresses can bounce.
+        delivered = [address for address in sink.delivered if address.startswith('family')]
+        stages.append(run_stage('bounce', connections, bounce_stage(delivered, args.bounce_rate), trace))
+        total_seconds = time.perf_counter() - started
+        counts = database_counts(path)
+
+    print_report(args, seeded, stages, total_seconds, len(delivered), counts)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'args': vars(args), 'seeded': seeded,
+                       'stages': stages, 'total_seconds': round(total_seconds, 3), 'emails': len(delivered),
+                       'database': counts, 'slowest_sql': sql_stats.snapshot(limit=5)['statements']}, f,
+                      indent=2, default=str)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
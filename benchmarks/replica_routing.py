@@ -0,0 +1,142 @@
+# benchmarks/replica_routing.py
+"""
+Read replica routing in get_db_connection, against a two-instance stand-in.
+
+pyodbc.connect is replaced by Instances, which opens one SQLite file for the primary
+and another for the replica, chosen by the server= argument app.py connects with.
+The real get_db_connection, connect_replica, lag check and circuit breaker run
+unchanged. Each step makes one request and records which instances it tried to
+connect to, in order:
+
+  healthy    reads go to the replica, writes to the primary
+  lagging    the replica reports more lag than DB_REPLICA_MAX_LAG_SECONDS: the read
+             falls back to the primary, and the next read skips the replica
+  down       the replica refuses connections: the read falls back to the primary,
+             and the next read skips the replica
+  recovered  once REPLICA_RETRY_SECONDS has passed, reads use the replica again
+  fresh      GET /api/data?fresh=1 reads the primary even with a healthy replica
+
+Exits non-zero if any request fails or connects somewhere unexpected.
+
+  python -m benchmarks.replica_routing
+"""
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+
+PRIMARY_SERVER = 'primary.bench.local,1433'
+REPLICA_SERVER = 'replica.bench.local,1433'
+
+# app.py reads these at import time.
+os.environ['DB_SERVER'] = PRIMARY_SERVER
+os.environ['DB_REPLICA_SERVER'] = REPLICA_SERVER
+os.environ.setdefault('DB_PASSWORD', 'benchmark')
+os.environ.setdefault('API_TIMEOUT_SECONDS', '600')
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import pyodbc  # noqa: E402
+import app as app_module  # noqa: E402
+from benchmarks import sqlite_shim  # noqa: E402
+from benchmarks.endpoints import ENDPOINTS, resolve, seed  # noqa: E402
+
+class Instances:
+    """pyodbc.connect replacement: a primary and a replica, each its own SQLite file."""
+
+    def __init__(self, paths):
+        self.paths = paths
+        self.replica_down = False
+        self.attempts = []
+
+    def __call__(self, *args, **kwargs):
+        name = 'replica' if kwargs.get('server') == REPLICA_SERVER else 'primary'
+        self.attempts.append(name)
+        if name == 'replica' and self.replica_down:
+            raise pyodbc.OperationalError('08001', '[stand-in] replica refused the connection')
+        return sqlite_shim.SqliteConnection(self.paths[name])
+
+def set_replica_lag(path, seconds):
+    conn = sqlite3.connect(path)
+    conn.execute("DELETE FROM hadr_replica_lag")
+    if seconds is not None:
+        conn.execute("INSERT INTO hadr_replica_lag (lag_seconds) VALUES (?)", (seconds,))
+    conn.commit()
+    conn.close()
+
+def reset_replica(instances, lag=None, down=False):
+    """Puts the replica in the given state, as if REPLICA_RETRY_SECONDS had passed."""
+    set_replica_lag(instances.paths['replica'], lag)
+    instances.replica_down = down
+    app_module.replica_state['skip_until'] = 0.0
+
+READ = ('GET', '/api/data', None)
+FRESH_READ = ('GET', '/api/data?fresh=1', None)
+WRITE = ENDPOINTS['add_record']
+
+def scenarios(instances):
+    """(name, setup, [(label, request, expected connect attempts)])"""
+    over_limit = app_module.DB_REPLICA_MAX_LAG_SECONDS + 90
+    return [
+        ('healthy', lambda: reset_replica(instances), [
+            ('read', READ, ['replica']),
+            ('write', WRITE, ['primary']),
+        ]),
+        ('lagging', lambda: reset_replica(instances, lag=over_limit), [
+            ('read', READ, ['replica', 'primary']),
+            ('next read', READ, ['primary']),
+        ]),
+        ('down', lambda: reset_replica(instances, down=True), [
+            ('read', READ, ['replica', 'primary']),
+            ('next read', READ, ['primary']),
+            ('write', WRITE, ['primary']),
+        ]),
+        ('recovered', lambda: reset_replica(instances), [
+            ('read', READ, ['replica']),
+        ]),
+        ('fresh', lambda: reset_replica(instances), [
+            ('read', FRESH_READ, ['primary']),
+        ]),
+    ]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--families', type=int, default=200, help='roster size seeded on both instances')
+    args = parser.parse_args(argv)
+
+    # The fallback warnings stay visible next to the steps that cause them.
+    logging.getLogger().setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory(prefix='nelcm-replica-') as tmp:
+        paths = {name: os.path.join(tmp, f"{name}.db") for name in ('primary', 'replica')}
+        for path in paths.values():
+            sqlite_shim.create_schema(path)
+            conn = sqlite_shim.SqliteConnection(path)
+            seed(conn.cursor(), args.families)
+            conn.commit()
+            conn.close()
+
+        instances = Instances(paths)
+        pyodbc.connect = instances
+        client = app_module.app.test_client()
+
+        failures = 0
+        print(f"{'scenario':<11}{'request':<11}{'status':>6}  connects")
+        for name, setup, steps in scenarios(instances):
+            setup()
+            for label, spec, expected in steps:
+                method, path_spec, body_spec = spec
+                instances.attempts = []
+                response = client.open(resolve(path_spec, {}), method=method, json=resolve(body_spec, {}))
+                ok = response.status_code < 400 and instances.attempts == expected
+                failures += not ok
+                note = '' if ok else f"   expected {' -> '.join(expected)}"
+                print(f"{name:<11}{label:<11}{response.status_code:>6}  {' -> '.join(instances.attempts) or '-'}{note}")
+
+    print('ok' if not failures else f"{failures} step(s) routed unexpectedly")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
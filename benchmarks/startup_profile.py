@@ -0,0 +1,194 @@
+# benchmarks/startup_profile.py
+"""
+Cold-start profiler and regression check for every Lambda handler in the image.
+
+Each handler is started in a fresh interpreter under `python -X importtime`,
+imported, and invoked once with a harmless event against a null database and
+locally answered Secrets Manager calls. For each handler it reports:
+
+  import_ms         time to import the handler module
+  first_call_ms     the first invocation, including anything imported lazily
+  ready_ms          import_ms + first_call_ms, i.e. time to first response
+  second_call_ms    a warm invocation, for comparison
+  top_imports       the handler module's most expensive direct imports and
+                    anything imported lazily during the first call (cumulative ms)
+
+Run from the repository root:
+
+  python -m benchmarks.startup_profile                      # print a report
+  python -m benchmarks.startup_profile --save startup.json  # keep a baseline
+  python -m benchmarks.startup_profile --baseline startup.json --tolerance 0.25
+
+With --baseline the exit status is 1 when any handler's median ready_ms grew by
+more than the tolerance (and at least --min-delta-ms), so it can gate a build.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# handler name -> (module, function, event factory)
+HANDLERS = {
+    'api': ('lambda', 'handler', lambda stubs: stubs.http_api_event('GET', '/api/health', 'probe=1')),
+    'email_sender': ('email_sender', 'handler', lambda stubs: {'Records': []}),
+    'ses_handler': ('ses_handler', 'handler', lambda stubs: {'Records': []}),
+    'renewal_trigger': ('renewal_trigger', 'handler', lambda stubs: {}),
+    'expiry_sweeper': ('expiry_sweeper', 'handler', lambda stubs: {}),
+    'outbox_drainer': ('outbox_drainer', 'handler', lambda stubs: {}),
+    'visit_archiver': ('visit_archiver', 'handler', lambda stubs: {}),
+    'survey_rollups': ('survey_rollups', 'handler', lambda stubs: {}),
+    'migrate': ('migrate', 'handler', lambda stubs: {'dry_run': True}),
+}
+
+IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$')
+
+def run_child(name):
+    """Runs inside the profiled interpreter: import, invoke twice, print timings as JSON."""
+    started = time.perf_counter()
+    sys.path.insert(0, REPO_ROOT)
+    from benchmarks import stubs
+    stubs.install_fake_secrets()
+    os.environ.setdefault('SQS_QUEUE_URL', 'https://sqs.us-east-1.amazonaws.com/000000000000/benchmark')
+
+    module_name, function_name, make_event = HANDLERS[name]
+    imported_at = time.perf_counter()
+    module = __import__(module_name)
+    handler = getattr(module, function_name)
+    ready_at = time.perf_counter()
+    # After the import, so the handler's own `import pyodbc` is what gets timed.
+    stubs.install_null_database()
+
+    timeout_ms = 5000 if name == 'api' else 30000
+    result = handler(make_event(stubs), stubs.FakeLambdaContext(name, timeout_ms))
+    first_done = time.perf_counter()
+    handler(make_event(stubs), stubs.FakeLambdaContext(name, timeout_ms))
+    second_done = time.perf_counter()
+
+    status = result.get('statusCode') if isinstance(result, dict) else None
+    print(json.dumps({
+        'setup_ms': (imported_at - started) * 1000,
+        'import_ms': (ready_at - imported_at) * 1000,
+        'first_call_ms': (first_done - ready_at) * 1000,
+        'second_call_ms': (second_done - first_done) * 1000,
+        'status': status,
+    }))
+
+def parse_importtime(stderr, module_name, limit):
+    """
+    Direct imports of module_name plus top-level imports made after it (i.e. lazily,
+    during the first call), most expensive first. -X importtime prints a module's
+    imports before the module itself, indented two spaces per nesting level.
+    """
+    entries = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match:
+            depth = (len(match.group(3)) + 1) // 2
+            entries.append((depth, match.group(4), int(match.group(2)) / 1000.0))
+
+    handler_at = next((i for i, (depth, module, _) in enumerate(entries)
+                       if depth == 1 and module == module_name), None)
+    if handler_at is None:
+        return []
+    start = handler_at
+    while start > 0 and entries[start - 1][0] > 1:
+        start -= 1
+
+    found = [{'module': module, 'cumulative_ms': round(ms, 1), 'lazy': False}
+             for depth, module, ms in entries[start:handler_at] if depth == 2]
+    found += [{'module': module, 'cumulative_ms': round(ms, 1), 'lazy': True}
+              for depth, module, ms in entries[handler_at + 1:] if depth == 1]
+    found.sort(key=lambda entry: entry['cumulative_ms'], reverse=True)
+    return found[:limit]
+
+def profile_handler(name, runs, top):
+    samples = []
+    top_imports = []
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-m', 'benchmarks.startup_profile', '--child', name],
+            cwd=REPO_ROOT, capture_output=True, text=True, env=dict(os.environ, PYTHONDONTWRITEBYTECODE='1'))
+        lines = [line for line in proc.stdout.splitlines() if line.startswith('{"setup_ms"')]
+        if proc.returncode != 0 or not lines:
+            tail = '\n'.join(line for line in proc.stderr.splitlines() if not line.startswith('import time:'))[-2000:]
+            raise RuntimeError(f"{name} failed to start:\n{tail}")
+        samples.append(json.loads(lines[-1]))
+        top_imports = parse_importtime(proc.stderr, HANDLERS[name][0], top)
+
+    def median(key):
+        return round(statistics.median(sample[key] for sample in samples), 1)
+
+    return {
+        'import_ms': median('import_ms'),
+        'first_call_ms': median('first_call_ms'),
+        'ready_ms': round(statistics.median(s['import_ms'] + s['first_call_ms'] for s in samples), 1),
+        'second_call_ms': median('second_call_ms'),
+        'status': samples[-1]['status'],
+        'runs': runs,
+        'top_imports': top_imports,
+    }
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get('handlers', {}).get(name)
+        if not before:
+            continue
+        delta = result['ready_ms'] - before['ready_ms']
+        if delta > before['ready_ms'] * tolerance and delta > min_delta_ms:
+            regressions.append(f"{name}: ready {before['ready_ms']:.0f}ms -> {result['ready_ms']:.0f}ms (+{delta:.0f}ms)")
+    return regressions
+
+def print_report(results):
+    print(f"{'handler':<16}{'import':>10}{'1st call':>10}{'ready':>10}{'warm':>10}  status")
+    for name, result in results.items():
+        print(f"{name:<16}{result['import_ms']:>8.0f}ms{result['first_call_ms']:>8.0f}ms"
+              f"{result['ready_ms']:>8.0f}ms{result['second_call_ms']:>8.1f}ms  {result['status']}")
+        imports = ', '.join(f"{entry['module']}{' (lazy)' if entry['lazy'] else ''} {entry['cumulative_ms']:.0f}ms"
+                            for entry in result['top_imports'])
+        print(f"{'':<16}{imports}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('handlers', nargs='*', help=f"subset of: {', '.join(HANDLERS)}")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=8, help='top-level imports to list per handler')
+    parser.add_argument('--save', help='write results as JSON')
+    parser.add_argument('--baseline', help='JSON from an earlier --save to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--min-delta-ms', type=float, default=20.0)
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        run_child(args.child)
+        return 0
+
+    names = args.handlers or list(HANDLERS)
+    unknown = [name for name in names if name not in HANDLERS]
+    if unknown:
+        parser.error(f"unknown handler(s): {', '.join(unknown)}")
+
+    results = {name: profile_handler(name, args.runs, args.top) for name in names}
+    print_report(results)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': sys.version.split()[0],
+                       'handlers': results}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.min_delta_ms)
+        for regression in regressions:
+            print(f"STARTUP REGRESSION: {regression}")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
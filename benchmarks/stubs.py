@@ -0,0 +1,217 @@
+# benchmarks/stubs.py
+"""
+Local stand-ins for the services the handlers talk to, for benchmarks only.
+
+install_fake_secrets() and install_fake_sqs() must run before the handler modules
+are imported: they bind aws_clients.get_client at import time. Real boto3 clients
+are still built (that cost is part of what the benchmarks measure); only the
+network calls are faked.
+"""
+import json
+import time
+import uuid
+
+import aws_clients
+
+FAKE_SECRET = {'password': 'benchmark', 'smtp_user': 'benchmark', 'smtp_password': 'benchmark'}
+
+class FakeSecretsClient:
+    """Wraps a real secretsmanager client and answers get_secret_value locally."""
+
+    def __init__(self, client, secret=None):
+        self._client = client
+        self.secret = secret or FAKE_SECRET
+        self.calls = 0
+
+    def get_secret_value(self, SecretId):
+        self.calls += 1
+        return {'Name': SecretId, 'SecretString': json.dumps(self.secret)}
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+def install_fake_secrets(secret=None):
+    real_get_client = aws_clients.get_client
+    wrapped = {}
+
+    def get_client(service_name, *args, **kwargs):
+        client = real_get_client(service_name, *args, **kwargs)
+        if service_name != 'secretsmanager':
+            return client
+        if id(client) not in wrapped:
+            wrapped[id(client)] = FakeSecretsClient(client, secret)
+        return wrapped[id(client)]
+
+    aws_clients.get_client = get_client
+    return get_client
+
+class FakeSQSClient:
+    """Wraps a real sqs client and keeps sent messages in memory instead."""
+
+    def __init__(self, client):
+        self._client = client
+        self.messages = []
+        self.calls = 0
+
+    def send_message_batch(self, QueueUrl, Entries):
+        self.calls += 1
+        successful = []
+        for entry in Entries:
+            message_id = str(uuid.uuid4())
+            self.messages.append({'messageId': message_id, 'body': entry['MessageBody'], 'queueUrl': QueueUrl})
+            successful.append({'Id': entry['Id'], 'MessageId': message_id})
+        return {'Successful': successful, 'Failed': []}
+
+    def receive(self, max_messages):
+        """Pops up to max_messages as SQS event records, oldest first."""
+        batch, self.messages = self.messages[:max_messages], self.messages[max_messages:]
+        return [{'messageId': m['messageId'], 'body': m['body'], 'eventSource': 'aws:sqs'} for m in batch]
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+def install_fake_sqs():
+    """Returns the FakeSQSClient every get_client('sqs', ...) call will now share."""
+    real_get_client = aws_clients.get_client
+    fake = None
+
+    def get_client(service_name, *args, **kwargs):
+        nonlocal fake
+        client = real_get_client(service_name, *args, **kwargs)
+        if service_name != 'sqs':
+            return client
+        if fake is None:
+            fake = FakeSQSClient(client)
+        return fake
+
+    aws_clients.get_client = get_client
+    # Built now so the caller can hold on to it before any handler runs.
+    return get_client('sqs')
+
+class SmtpSink:
+    """Stands in for smtplib.SMTP_SSL: accepts every message and keeps the recipients."""
+    delivered = []
+    connections = 0
+    latency_ms = 0.0
+
+    def __init__(self, host, port, context=None, **kwargs):
+        type(self).connections += 1
+        self._pause()
+
+    def _pause(self):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def login(self, user, password):
+        self._pause()
+
+    def sendmail(self, sender, recipients, message):
+        self._pause()
+        if isinstance(recipients, str):
+            recipients = [r.strip() for r in recipients.split(',')]
+        type(self).delivered.extend(recipients)
+        return {}
+
+    def quit(self):
+        pass
+
+def install_smtp_sink(latency_ms=0.0):
+    """Points smtplib.SMTP_SSL at SmtpSink; latency_ms is added per connect, login and send."""
+    import smtplib
+    SmtpSink.delivered = []
+    SmtpSink.connections = 0
+    SmtpSink.latency_ms = latency_ms
+    smtplib.SMTP_SSL = SmtpSink
+    return SmtpSink
+
+class NullCursor:
+    """Accepts every statement and returns no rows."""
+    description = []
+    rowcount = 0
+
+    def execute(self, sql, *args):
+        return self
+
+    def executemany(self, sql, *args):
+        return self
+
+    def fetchone(self):
+        return None
+
+    def fetchall(self):
+        return []
+
+    def fetchmany(self, size=1):
+        return []
+
+    def nextset(self):
+        return False
+
+    def close(self):
+        pass
+
+class NullConnection:
+    timeout = 0
+    autocommit = False
+
+    def cursor(self):
+        return NullCursor()
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+def install_null_database():
+    """Points pyodbc.connect at NullConnection."""
+    import pyodbc
+    pyodbc.connect = lambda *args, **kwargs: NullConnection()
+
+def sns_event(messages):
+    """An SNS-triggered Lambda event carrying each message as JSON."""
+    return {'Records': [{'EventSource': 'aws:sns', 'Sns': {'Message': json.dumps(message)}}
+                        for message in messages]}
+
+def ses_notification(kind, email):
+    """An SES notification for one recipient; kind is 'permanent', 'transient' or 'complaint'."""
+    if kind == 'complaint':
+        return {'notificationType': 'Complaint',
+                'complaint': {'complainedRecipients': [{'emailAddress': email}]}}
+    return {'notificationType': 'Bounce',
+            'bounce': {'bounceType': 'Permanent' if kind == 'permanent' else 'Transient',
+                       'bouncedRecipients': [{'emailAddress': email}]}}
+
+class FakeLambdaContext:
+    def __init__(self, function_name='benchmark', timeout_ms=30000):
+        self.function_name = function_name
+        self._deadline = time.monotonic() + timeout_ms / 1000.0
+
+    def get_remaining_time_in_millis(self):
+        return max(0, int((self._deadline - time.monotonic()) * 1000))
+
+def http_api_event(method, path, query='', body=None, headers=None):
+    """An API Gateway HTTP API (payload 2.0) event, as serverless_wsgi receives it."""
+    headers = dict({'host': 'localhost', 'content-type': 'application/json'}, **(headers or {}))
+    return {
+        'version': '2.0',
+        'routeKey': 'ANY /api/{proxy+}',
+        'rawPath': path,
+        'rawQueryString': query,
+        'headers': headers,
+        'requestContext': {
+            'http': {'method': method, 'path': path, 'protocol': 'HTTP/1.1', 'sourceIp': '127.0.0.1'},
+            'stage': '$default',
+        },
+        'body': json.dumps(body) if body is not None else None,
+        'isBase64Encoded': False,
+    }
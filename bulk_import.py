@@ -0,0 +1,286 @@
+# bulk_import.py
+"""
+Bulk import of families and members from CSV.
+
+One CSV row per person. Rows sharing a `family_key` belong to the same family; the
+row with primary=1 becomes the primary member and supplies the family columns (if no
+row in the family is marked primary, the family's first valid row is used, wherever
+the family's rows appear in the file). Expected headers:
+
+    family_key, primary, name, last_name, phone, birthday, gender,
+    address, city, state, zip_code, email, founding_family, mem_start_date
+
+Rows are streamed into dbo.import_staging with fast_executemany; primaries are then
+chosen and member_ids allocated set-based (with -NN suffixes on collision), and the
+batch is merged into members and family in a single transaction. Field parsing is
+shared with add_record (app.py).
+"""
+import csv
+import logging
+import sys
+import uuid
+from datetime import date
+
+from app import (base_member_id, membership_expiry, numbered_member_id_sql, parse_birthday,
+                 parse_flag, parse_gender, parse_iso_date, taken_suffix_sql)
+from live_events import family_event_sql
+
+STAGING_CHUNK_SIZE = 1000
+
+def stage_row(batch_id, row_num, raw, today):
+    """
+    Validates one CSV row and returns the staging tuple. is_primary is 1 only if the
+    row is marked primary; merge_staging picks each family's primary once every row
+    is staged, so the family columns are computed for every row.
+    """
+    first = (raw.get('name') or '').strip()
+    last = (raw.get('last_name') or '').strip()
+    family_key = (raw.get('family_key') or '').strip() or None
+    status, message = 'valid', None
+
+    if not first or not last:
+        status, message = 'error', 'First and last name are required.'
+    elif family_key is None:
+        status, message = 'error', 'family_key is required.'
+
+    birth_month_day, birth_year = parse_birthday(raw.get('birthday'))
+    founding_family = parse_flag(raw.get('founding_family'))
+    mem_start_date = membership_expires = None
+    renewal_email_sent = 1
+    try:
+        mem_start_date = parse_iso_date(raw.get('mem_start_date')) or today
+    except ValueError:
+        if status == 'valid':
+            status, message = 'error', f"Invalid mem_start_date '{raw.get('mem_start_date')}'."
+    else:
+        if not founding_family:
+            membership_expires = membership_expiry(mem_start_date)
+            if membership_expires.year == today.year and membership_expires.month == today.month:
+                renewal_email_sent = 0
+
+    return (
+        batch_id, row_num, family_key, parse_flag(raw.get('primary')),
+        first[:100] or None, last[:100] or None, (raw.get('phone') or '').strip() or None,
+        parse_gender(raw.get('gender')), birth_month_day, birth_year,
+        (raw.get('address') or '').strip() or None, (raw.get('city') or '').strip() or None,
+        (raw.get('state') or '').strip() or None, (raw.get('zip_code') or '').strip() or None,
+        (raw.get('email') or '').strip() or None, founding_family,
+        mem_start_date, membership_expires, renewal_email_sent,
+        base_member_id(first, last) if first and last else None,
+        status, message,
+    )
+
+STAGING_INSERT = """
+    INSERT INTO dbo.import_staging (
+        batch_id, row_num, family_key, is_primary, name, last_name, phone, gender,
+        birth_month_day, birth_year, address, city, state, zip_code, email,
+        founding_family, mem_start_date, membership_expires, renewal_email_sent,
+        base_id, status, message
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+def stream_to_staging(conn, batch_id, lines, today=None):
+    """Streams CSV lines into dbo.import_staging in chunks. Returns the number of rows staged."""
+    today = today or date.today()
+    reader = csv.DictReader(lines)
+    if reader.fieldnames:
+        reader.fieldnames = [f.strip().lower() for f in reader.fieldnames]
+
+    cursor = conn.cursor()
+    cursor.fast_executemany = True
+    chunk = []
+    staged = 0
+    try:
+        for row_num, raw in enumerate(reader, start=1):
+            chunk.append(stage_row(batch_id, row_num, raw, today))
+            if len(chunk) >= STAGING_CHUNK_SIZE:
+                cursor.executemany(STAGING_INSERT, chunk)
+                staged += len(chunk)
+                chunk = []
+        if chunk:
+            cursor.executemany(STAGING_INSERT, chunk)
+            staged += len(chunk)
+        conn.commit()
+        return staged
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+def merge_staging(conn, batch_id, commit=True):
+    """
+    Allocates member_ids and merges the batch's valid rows into members and family,
+    all in one transaction. With commit=False the merge is rolled back (dry run).
+    """
+    cursor = conn.cursor()
+    try:
+        # Only the first row marked primary in a family can be its primary.
+        cursor.execute("""
+            ;WITH marked AS (
+                SELECT is_primary, status, message, family_key,
+                       ROW_NUMBER() OVER (PARTITION BY family_key ORDER BY row_num) AS rn
+                FROM dbo.import_staging
+                WHERE batch_id = ? AND is_primary = 1 AND family_key IS NOT NULL
+            )
+            UPDATE marked
+            SET is_primary = 0, status = 'error',
+                message = 'Family ''' + family_key + ''' already has a primary member.'
+            WHERE rn > 1 AND status = 'valid'
+        """, batch_id)
+
+        # A family with no row marked primary gets its first valid row. A family whose
+        # marked primary is invalid gets none, and its other rows are reported below.
+        cursor.execute("""
+            ;WITH firsts AS (
+                SELECT s.is_primary,
+                       ROW_NUMBER() OVER (PARTITION BY s.family_key ORDER BY s.row_num) AS rn
+                FROM dbo.import_staging s
+                WHERE s.batch_id = ? AND s.status = 'valid'
+                  AND NOT EXISTS (
+                      SELECT 1 FROM dbo.import_staging p
+                      WHERE p.batch_id = s.batch_id AND p.family_key = s.family_key AND p.is_primary = 1)
+            )
+            UPDATE firsts SET is_primary = 1
+            WHERE rn = 1
+        """, batch_id)
+
+        # Secondary rows whose family has no valid primary can't be placed.
+        cursor.execute("""
+            UPDATE s SET status = 'error', message = 'No valid primary member for this family_key.'
+            FROM dbo.import_staging s
+            WHERE s.batch_id = ? AND s.is_primary = 0 AND s.status = 'valid'
+              AND NOT EXISTS (
+                  SELECT 1 FROM dbo.import_staging p
+                  WHERE p.batch_id = s.batch_id AND p.family_key = s.family_key
+                    AND p.is_primary = 1 AND p.status = 'valid')
+        """, batch_id)
+
+        # Number each primary after the highest id already taken for its base, with
+        # the same SQL add_record uses. UPDLOCK/HOLDLOCK range-locks each base's keys,
+        # the same lock add_record takes, so the two never collide.
+        cursor.execute(f"""
+            ;WITH bases AS (
+                SELECT DISTINCT base_id FROM dbo.import_staging
+                WHERE batch_id = ? AND is_primary = 1 AND status = 'valid'
+            ), taken AS (
+                SELECT b.base_id, {taken_suffix_sql('b.base_id', 'm.member_id')} AS max_suffix
+                FROM bases b
+                JOIN members m WITH (UPDLOCK, HOLDLOCK) ON m.member_id = b.base_id OR m.member_id LIKE b.base_id + '-%'
+                GROUP BY b.base_id
+            ), numbered AS (
+                SELECT s.row_num, s.base_id,
+                       ROW_NUMBER() OVER (PARTITION BY s.base_id ORDER BY s.row_num) + COALESCE(t.max_suffix, 0) AS n
+                FROM dbo.import_staging s
+                LEFT JOIN taken t ON t.base_id = s.base_id
+                WHERE s.batch_id = ? AND s.is_primary = 1 AND s.status = 'valid'
+            )
+            UPDATE s
+            SET member_id = {numbered_member_id_sql('n.base_id', 'n.n')}
+            FROM dbo.import_staging s
+            JOIN numbered n ON n.row_num = s.row_num
+            WHERE s.batch_id = ?
+        """, batch_id, batch_id, batch_id)
+
+        cursor.execute("""
+            UPDATE s SET member_id = p.member_id
+            FROM dbo.import_staging s
+            JOIN dbo.import_staging p
+              ON p.batch_id = s.batch_id AND p.family_key = s.family_key
+             AND p.is_primary = 1 AND p.status = 'valid'
+            WHERE s.batch_id = ? AND s.is_primary = 0 AND s.status = 'valid'
+        """, batch_id)
+
+        cursor.execute("""
+            INSERT INTO members (member_id, name, last_name, phone, gender, primary_member, secondary_member, birth_month_day, birth_year)
+            SELECT member_id, name, last_name, phone, gender, is_primary, 1 - is_primary, birth_month_day, birth_year
+            FROM dbo.import_staging
+            WHERE batch_id = ? AND status = 'valid'
+        """, batch_id)
+
+        cursor.execute("""
+            INSERT INTO family (
+                member_id, address, city, state, zip_code, email, founding_family,
+                mem_start_date, membership_expires, active_flag, renewal_email_sent
+            )
+            SELECT member_id, address, city, state, zip_code, email, founding_family,
+                   mem_start_date, membership_expires, 1, renewal_email_sent
+            FROM dbo.import_staging
+            WHERE batch_id = ? AND is_primary = 1 AND status = 'valid'
+        """, batch_id)
+
+        # One live 'family' event per imported family, committed with the import.
+        cursor.execute(family_event_sql(
+            'family', 's.member_id',
+            "FROM dbo.import_staging AS s WHERE s.batch_id = ? AND s.is_primary = 1 AND s.status = 'valid'"
+        ), batch_id)
+
+        cursor.execute("""
+            UPDATE dbo.import_staging SET status = 'imported'
+            WHERE batch_id = ? AND status = 'valid'
+        """, batch_id)
+
+        cursor.execute("""
+            SELECT row_num, family_key, name, last_name, is_primary, member_id, status, message
+            FROM dbo.import_staging
+            WHERE batch_id = ?
+            ORDER BY row_num
+        """, batch_id)
+        report = [{
+            'row': r[0], 'family_key': r[1], 'name': r[2], 'last_name': r[3],
+            'primary': bool(r[4]), 'member_id': r[5], 'status': r[6], 'message': r[7]
+        } for r in cursor.fetchall()]
+
+        if commit:
+            conn.commit()
+        else:
+            conn.rollback()
+            for row in report:
+                if row['status'] == 'imported':
+                    row['status'] = 'valid'
+        return report
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+def discard_staging(conn, batch_id):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM dbo.import_staging WHERE batch_id = ?", batch_id)
+        conn.commit()
+    finally:
+        cursor.close()
+
+def import_csv(conn, lines, dry_run=False):
+    """Runs a full import and returns {'batch_id', 'summary', 'rows'}."""
+    batch_id = str(uuid.uuid4())
+    try:
+        stream_to_staging(conn, batch_id, lines)
+        report = merge_staging(conn, batch_id, commit=not dry_run)
+    finally:
+        discard_staging(conn, batch_id)
+
+    summary = {}
+    for row in report:
+        summary[row['status']] = summary.get(row['status'], 0) + 1
+    logging.info(f"Bulk import {batch_id}{' (dry run)' if dry_run else ''}: {summary}")
+    return {'batch_id': batch_id, 'dry_run': dry_run, 'summary': summary, 'rows': report}
+
+if __name__ == '__main__':
+    import json
+    from app import get_db_connection
+
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python bulk_import.py families.csv [--dry-run]")
+    conn = get_db_connection()
+    if conn is None:
+        sys.exit("Database connection failed.")
+    try:
+        with open(sys.argv[1], newline='', encoding='utf-8-sig') as f:
+            result = import_csv(conn, f, dry_run='--dry-run' in sys.argv[2:])
+        print(json.dumps(result, indent=2, default=str))
+    finally:
+        conn.close()
@@ -0,0 +1,128 @@
+# circuit_breaker.py
+"""
+Circuit breaker and jittered retry for database connects.
+
+Every handler wraps its pyodbc.connect in call_with_retry(..., db_breaker). Transient
+errors are retried with full-jitter backoff; after FAILURE_THRESHOLD failed connects
+in a row the breaker opens and later calls fail immediately with CircuitOpenError
+instead of waiting on a dead server. After RESET_TIMEOUT seconds one half-open probe
+is let through: success closes the breaker, failure re-opens it.
+
+State is per process, i.e. per Lambda container (or per server process).
+"""
+import logging
+import random
+import threading
+import time
+
+import pyodbc
+
+FAILURE_THRESHOLD = 3
+RESET_TIMEOUT = 15.0
+
+RETRY_ATTEMPTS = 3
+RETRY_BASE_DELAY = 0.2
+RETRY_MAX_DELAY = 2.0
+
+# Connection failures, link failures and timeouts; worth another try.
+TRANSIENT_SQLSTATES = {'08001', '08S01', '08004', 'HYT00', 'HYT01', '40001'}
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitOpenError(Exception):
+    """Raised instead of attempting a call while the breaker is open."""
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+        self.last_error = None
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raises CircuitOpenError unless a call may go ahead now."""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self.probe_in_flight = False
+            if self.state == HALF_OPEN and not self.probe_in_flight:
+                self.probe_in_flight = True
+                logging.info(f"Circuit '{self.name}' half-open: sending probe.")
+                return
+            retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+            raise CircuitOpenError(f"Circuit '{self.name}' is open; retry in {retry_in:.1f}s. Last error: {self.last_error}")
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                logging.info(f"Circuit '{self.name}' closed after successful call.")
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self.probe_in_flight = False
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self.consecutive_failures += 1
+            self.last_error = str(error)[:300] if error is not None else None
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logging.error(f"Circuit '{self.name}' opened after {self.consecutive_failures} failure(s): {self.last_error}")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self.probe_in_flight = False
+
+    def snapshot(self):
+        """State for health checks."""
+        with self._lock:
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = round(max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at)), 1)
+            return {
+                'name': self.name,
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'retry_in_seconds': retry_in,
+                'last_error': self.last_error,
+            }
+
+def is_transient_db_error(error):
+    if isinstance(error, (pyodbc.OperationalError, pyodbc.InterfaceError)):
+        return True
+    if isinstance(error, pyodbc.Error) and error.args:
+        return str(error.args[0]) in TRANSIENT_SQLSTATES
+    return False
+
+def call_with_retry(fn, breaker, attempts=RETRY_ATTEMPTS, base_delay=RETRY_BASE_DELAY,
+                    max_delay=RETRY_MAX_DELAY, deadline=None, is_transient=is_transient_db_error):
+    """
+    Calls fn() through the breaker, retrying transient errors with full-jitter
+    exponential backoff. A retry that would sleep past `deadline` (a time.monotonic()
+    value) is not attempted. The breaker counts one failure per exhausted call.
+    """
+    breaker.before_call()
+    for attempt in range(attempts):
+        try:
+            result = fn()
+        except Exception as e:
+            delay = random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+            out_of_time = deadline is not None and time.monotonic() + delay >= deadline
+            if attempt == attempts - 1 or not is_transient(e) or out_of_time:
+                breaker.record_failure(e)
+                raise
+            logging.warning(f"Transient error on attempt {attempt + 1}/{attempts}, retrying in {delay:.2f}s: {e}")
+            time.sleep(delay)
+        else:
+            breaker.record_success()
+            return result
+
+db_breaker = CircuitBreaker('database')
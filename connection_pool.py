@@ -0,0 +1,166 @@
+# connection_pool.py
+"""
+A bounded, thread-safe pool of pyodbc connections for the standalone server.
+
+Under Lambda each container serves one request at a time and opens its own
+connection. A long-running threaded server instead keeps up to `max_size`
+connections: acquire() hands out an idle one (or opens a new one while under
+the limit, or waits for one to be returned), and close() on the handed-out
+connection returns it to the pool instead of closing it, so the endpoints'
+existing `finally: conn.close()` is all the release they need.
+
+Returned connections are rolled back and have their query timeout and autocommit
+reset; one that fails that, or has outlived max_lifetime, is closed instead. A
+connection idle longer than ping_after seconds is checked with SELECT 1 before
+reuse.
+"""
+import logging
+import threading
+import time
+
+import pyodbc
+
+class PoolTimeout(Exception):
+    """Raised when no connection became free within the caller's timeout."""
+
+class PooledConnection:
+    """Delegates to a pyodbc connection; close() gives it back to the pool."""
+
+    def __init__(self, pool, conn, created_at):
+        object.__setattr__(self, '_pool', pool)
+        object.__setattr__(self, '_conn', conn)
+        object.__setattr__(self, '_created_at', created_at)
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise pyodbc.ProgrammingError('Attempt to use a connection returned to the pool')
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        # e.g. conn.timeout = 3
+        if self._conn is None:
+            raise pyodbc.ProgrammingError('Attempt to use a connection returned to the pool')
+        setattr(self._conn, name, value)
+
+    def close(self):
+        conn = self._conn
+        if conn is not None:
+            object.__setattr__(self, '_conn', None)
+            self._pool._release(conn, self._created_at)
+
+    def discard(self):
+        """Closes the underlying connection instead of returning it (e.g. after a broken link)."""
+        conn = self._conn
+        if conn is not None:
+            object.__setattr__(self, '_conn', None)
+            self._pool._discard(conn)
+
+class ConnectionPool:
+    def __init__(self, max_size=8, max_lifetime=1800.0, ping_after=30.0, name='database'):
+        self.name = name
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.ping_after = ping_after
+        self._idle = []  # (conn, created_at, returned_at), most recently returned last
+        self._open = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+        self.stats = {'acquired': 0, 'opened': 0, 'reused': 0, 'discarded': 0, 'timeouts': 0}
+
+    def acquire(self, connect, timeout=None):
+        """
+        Returns a PooledConnection. connect() is called (outside the pool lock) to
+        open a new connection when none is idle and the pool is under max_size; its
+        exceptions propagate. Waits up to `timeout` seconds (None: indefinitely)
+        for a connection to be returned, then raises PoolTimeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + max(0.0, timeout)
+        while True:
+            with self._cond:
+                while not self._idle and self._open >= self.max_size:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self.stats['timeouts'] += 1
+                        raise PoolTimeout(f"No {self.name} connection free within {timeout:.1f}s "
+                                          f"({self._open} open, {self._waiting} waiting).")
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+                self.stats['acquired'] += 1
+                if self._idle:
+                    conn, created_at, returned_at = self._idle.pop()
+                else:
+                    conn = None
+                    self._open += 1
+
+            if conn is None:
+                try:
+                    conn = connect()
+                except BaseException:
+                    with self._cond:
+                        self._open -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self.stats['opened'] += 1
+                return PooledConnection(self, conn, time.monotonic())
+
+            if time.monotonic() - returned_at < self.ping_after or self._ping(conn):
+                with self._cond:
+                    self.stats['reused'] += 1
+                return PooledConnection(self, conn, created_at)
+            # The server dropped it while idle; close it and try again.
+            self._discard(conn)
+
+    def _ping(self, conn):
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            finally:
+                cursor.close()
+            return True
+        except pyodbc.Error as ex:
+            logging.warning(f"Pooled {self.name} connection failed its check, discarding: {ex}")
+            return False
+
+    def _release(self, conn, created_at):
+        if time.monotonic() - created_at > self.max_lifetime:
+            self._discard(conn)
+            return
+        try:
+            conn.rollback()
+            conn.timeout = 0
+            conn.autocommit = False
+        except pyodbc.Error as ex:
+            logging.warning(f"Pooled {self.name} connection could not be reset, discarding: {ex}")
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, created_at, time.monotonic()))
+            self._cond.notify()
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except pyodbc.Error:
+            pass
+        with self._cond:
+            self._open -= 1
+            self.stats['discarded'] += 1
+            self._cond.notify()
+
+    def close_idle(self):
+        """Closes every idle connection (e.g. at shutdown). In-use ones close when returned."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for conn, _, _ in idle:
+            self._discard(conn)
+
+    def snapshot(self):
+        with self._cond:
+            return dict(self.stats, name=self.name, max_size=self.max_size, open=self._open,
+                        idle=len(self._idle), waiting=self._waiting)
@@ -0,0 +1,15 @@
+# date_ranges.py
+"""
+Half-open date ranges for sargable filters.
+
+`col >= start AND col < end` lets SQL Server seek an index on col, where
+MONTH(col) = ... or DATEDIFF(...) forces a scan. app.py, renewal_trigger.py and
+migrate.check_plans all filter by month, so the range is computed here once.
+"""
+from datetime import date
+
+def month_bounds(day):
+    """Half-open [first of month, first of next month) range for the month containing day."""
+    month_start = day.replace(day=1)
+    next_month = date(day.year + (day.month == 12), day.month % 12 + 1, 1)
+    return month_start, next_month
@@ -2,14 +2,19 @@
 import json
 import logging
 import pyodbc
-import boto3
 from botocore.exceptions import ClientError
 from datetime import datetime
 import smtplib
 import ssl
+import time
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 
+from aws_clients import get_client
+from circuit_breaker import CircuitOpenError, call_with_retry, db_breaker
+import sql_stats
+from metrics import InvocationMetrics
+
 # --- Configuration & Logging ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger()
@@ -22,8 +27,7 @@ SES_SMTP_PORT = 465 # Port for SMTPS (SSL/TLS)
 
 def get_secret(secret_name):
     """Generic function to retrieve a secret from AWS Secrets Manager."""
-    session = boto3.session.Session()
-    client = session.client(service_name='secretsmanager', region_name=AWS_REGION)
+    client = get_client('secretsmanager', region_name=AWS_REGION)
     try:
         get_secret_value_response = client.get_secret_value(SecretId=secret_name)
         secret_string = get_secret_value_response['SecretString']
@@ -36,7 +40,7 @@ def get_db_connection():
     """Establishes a connection to the SQL Server database."""
     try:
         db_secret = get_secret("nelcm-db")
-        conn = pyodbc.connect(
+        conn = call_with_retry(lambda: pyodbc.connect(
             driver='/var/task/lib/libmsodbcsql-18.4.so.1.1',
             server='nelcm.cy1ogm8uwbvo.us-east-1.rds.amazonaws.com,1433',
             database='nelcm',
@@ -44,15 +48,16 @@ def get_db_connection():
             pwd=db_secret['password'],
             Encrypt='yes',
             TrustServerCertificate='yes'
-        )
-        return conn
-    except pyodbc.Error as ex:
+        ), db_breaker)
+        return sql_stats.track(conn)
+    except (pyodbc.Error, CircuitOpenError) as ex:
         logger.error(f"DATABASE CONNECTION FAILED: {ex}")
         return None
 
-def send_email_smtp(recipient_email, member_name, email_type, data={}):
+def send_email_smtp(recipient_email, member_name, email_type, data={}, metrics=None):
     """
-    Sends an email using the SMTP protocol over port 465.
+    Sends an email using the SMTP protocol over port 465. When `metrics` is given,
+    records the connect (TLS + login) and send latency.
     """
     SENDER_EMAIL = "Northeast Louisiana Childrens Museum <nelcm98@gmail.com>"
     SUBJECT = ""
@@ -128,12 +133,18 @@ def send_email_smtp(recipient_email, member_name, email_type, data={}):
     try:
         context = ssl.create_default_context()
         logger.info(f"Connecting to SMTP server {SES_SMTP_HOST} on port {SES_SMTP_PORT}...")
+        connect_started = time.perf_counter()
         with smtplib.SMTP_SSL(SES_SMTP_HOST, SES_SMTP_PORT, context=context) as server:
             logger.info("Connection successful. Logging in...")
             server.login(SMTP_USERNAME, SMTP_PASSWORD)
+            send_started = time.perf_counter()
             logger.info("Login successful. Sending email...")
             server.sendmail(SENDER_EMAIL, recipient_email, msg.as_string())
+            sent_at = time.perf_counter()
             logger.info(f"Email ('{email_type}') sent successfully to {recipient_email} via SMTP.")
+        if metrics is not None:
+            metrics.put('SmtpConnectLatency', (send_started - connect_started) * 1000, 'Milliseconds')
+            metrics.put('SmtpSendLatency', (sent_at - send_started) * 1000, 'Milliseconds')
         return True
     except Exception as e:
         logger.error(f"SMTP email failed to send to {recipient_email}: {e}")
@@ -144,59 +155,74 @@ def handler(event, context):
     This handler is triggered by messages from the SQS queue.
     It processes each message to send an email based on its type and updates the database if necessary.
     """
-    conn = get_db_connection()
-    if conn is None:
-        logger.error("Could not connect to the database. Aborting.")
-        raise ConnectionError("Database connection failed.")
-
-    cursor = conn.cursor()
-
-    for record in event['Records']:
-        try:
-            message_body = json.loads(record['body'])
-            
-            email_type = message_body.get('email_type', 'unknown')
-            member_id = message_body.get('member_id')
-            email = message_body.get('email')
-            name = message_body.get('name')
-            last_name = message_body.get('last_name')
-
-            if not all([email, name, last_name]):
-                logger.error(f"Message is missing required fields (email, name, last_name). Skipping. Body: {message_body}")
-                continue
+    metrics = InvocationMetrics('email_sender')
+    metrics.put('SqsBatchSize', len(event['Records']))
+    for name in ('EmailsSent', 'EmailsFailed', 'EmailsSkipped'):
+        metrics.count(name, 0)
 
-            logger.info(f"Processing '{email_type}' email for {name} {last_name}")
-
-            email_data = {}
-            if email_type == 'renewal_reminder':
-                expires_str = message_body.get('expires')
-                if not expires_str:
-                    logger.error("Renewal reminder is missing 'expires' date. Skipping.")
+    try:
+        conn = get_db_connection()
+        if conn is None:
+            logger.error("Could not connect to the database. Aborting.")
+            raise ConnectionError("Database connection failed.")
+
+        cursor = conn.cursor()
+
+        for record in event['Records']:
+            try:
+                message_body = json.loads(record['body'])
+
+                email_type = message_body.get('email_type', 'unknown')
+                member_id = message_body.get('member_id')
+                email = message_body.get('email')
+                name = message_body.get('name')
+                last_name = message_body.get('last_name')
+
+                if not all([email, name, last_name]):
+                    logger.error(f"Message is missing required fields (email, name, last_name). Skipping. Body: {message_body}")
+                    metrics.count('EmailsSkipped')
                     continue
-                email_data['expiration_date'] = datetime.strptime(expires_str, '%Y-%m-%d').date()
-
-            # Call the SMTP email function
-            email_sent = send_email_smtp(
-                recipient_email=email,
-                member_name=f"{last_name} Family",
-                email_type=email_type,
-                data=email_data
-            )
-
-            if email_sent and email_type == 'renewal_reminder':
-                update_query = "UPDATE family SET renewal_email_sent = 1 WHERE member_id = ?"
-                cursor.execute(update_query, member_id)
-                conn.commit()
-                logger.info(f"Successfully updated renewal_email_sent flag for member ID {member_id}.")
-            
-        except Exception as e:
-            logger.error(f"An error occurred processing a message: {e}")
-            if conn:
-                conn.rollback()
-            continue 
-            
-    cursor.close()
-    conn.close()
+
+                logger.info(f"Processing '{email_type}' email for {name} {last_name}")
+
+                email_data = {}
+                if email_type == 'renewal_reminder':
+                    expires_str = message_body.get('expires')
+                    if not expires_str:
+                        logger.error("Renewal reminder is missing 'expires' date. Skipping.")
+                        metrics.count('EmailsSkipped')
+                        continue
+                    email_data['expiration_date'] = datetime.strptime(expires_str, '%Y-%m-%d').date()
+
+                # Call the SMTP email function
+                email_sent = send_email_smtp(
+                    recipient_email=email,
+                    member_name=f"{last_name} Family",
+                    email_type=email_type,
+                    data=email_data,
+                    metrics=metrics
+                )
+                metrics.count('EmailsSent' if email_sent else 'EmailsFailed')
+
+                if email_sent and email_type == 'renewal_reminder':
+                    update_query = "UPDATE family SET renewal_email_sent = 1 WHERE member_id = ?"
+                    cursor.execute(update_query, member_id)
+                    conn.commit()
+                    logger.info(f"Successfully updated renewal_email_sent flag for member ID {member_id}.")
+
+            except Exception as e:
+                logger.error(f"An error occurred processing a message: {e}")
+                metrics.count('EmailsFailed')
+                if conn:
+                    conn.rollback()
+                continue
+
+        cursor.close()
+        conn.close()
+    finally:
+        metrics.rate('EmailsSentPerSecond', 'EmailsSent')
+        metrics.rate('EmailsFailedPerSecond', 'EmailsFailed')
+        metrics.flush()
 
     return {
         'statusCode': 200,
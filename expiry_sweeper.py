@@ -0,0 +1,122 @@
+# expiry_sweeper.py
+import json
+import logging
+from datetime import date
+
+import pyodbc
+from botocore.exceptions import ClientError
+
+from aws_clients import get_client
+from circuit_breaker import call_with_retry, db_breaker
+import sql_stats
+
+# --- Logging ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+AWS_REGION = "us-east-1"
+
+# Rows per UPDATE. Kept well under SQL Server's ~5000-lock escalation threshold so
+# a sweep never takes a table lock that blocks front-desk writes.
+SWEEP_BATCH_SIZE = 500
+
+def get_secret(secret_name):
+    client = get_client('secretsmanager', region_name=AWS_REGION)
+    try:
+        response = client.get_secret_value(SecretId=secret_name)
+        return json.loads(response['SecretString'])
+    except ClientError as e:
+        logger.error(f"Failed to retrieve secret '{secret_name}': {e}")
+        raise e
+
+def get_db_connection():
+    try:
+        secrets = get_secret("nelcm-db")
+        conn = call_with_retry(lambda: pyodbc.connect(
+            driver='/var/task/lib/libmsodbcsql-18.4.so.1.1',
+            server='nelcm.cy1ogm8uwbvo.us-east-1.rds.amazonaws.com,1433',
+            database='nelcm',
+            uid='nelcm',
+            pwd=secrets.get('password'),
+            Encrypt='yes',
+            TrustServerCertificate='yes'
+        ), db_breaker)
+        return sql_stats.track(conn)
+    except Exception as e:
+        logger.error(f"DATABASE CONNECTION FAILED: {e}")
+        return None
+
+def last_swept_through(cursor):
+    """Returns the date of the last completed sweep, or None if never swept."""
+    cursor.execute("SELECT MAX(swept_through) FROM dbo.expiry_sweeps")
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+def sweep_expired_memberships(conn, today=None, batch_size=SWEEP_BATCH_SIZE):
+    """
+    Deactivates every active non-founding family whose membership expired before today.
+
+    There is no lower bound: a family can become active with an old expiry (an
+    old-dated renewal or import, or active_flag set by hand), and it must still be
+    caught. The seek on IX_family_expiry only reaches active rows, so a sweep stays
+    incremental. Batches of `batch_size` rows are each committed on their own so locks
+    are held briefly. Returns a summary dict with rows_changed for the run; a run on a
+    day that has already been swept costs a single indexed lookup.
+    """
+    today = today or date.today()
+    cursor = conn.cursor()
+    try:
+        swept_from = last_swept_through(cursor)
+        if swept_from is not None and swept_from >= today:
+            return {'swept_from': swept_from, 'swept_through': today, 'rows_changed': 0, 'batches': 0}
+
+        rows_changed = 0
+        batches = 0
+        while True:
+            # Seeks IX_family_expiry (founding_family, active_flag, membership_expires);
+            # rows leave the active_flag = 1 range as they are updated.
+            cursor.execute("""
+                ;WITH batch AS (
+                    SELECT TOP (?) active_flag
+                    FROM family WITH (ROWLOCK)
+                    WHERE founding_family = 0 AND active_flag = 1
+                      AND membership_expires < ?
+                    ORDER BY membership_expires, member_id
+                )
+                UPDATE batch SET active_flag = 0
+            """, batch_size, today)
+            changed = cursor.rowcount
+            conn.commit()
+            batches += 1
+            rows_changed += max(changed, 0)
+            if changed < batch_size:
+                break
+
+        cursor.execute("""
+            INSERT INTO dbo.expiry_sweeps (swept_from, swept_through, rows_changed, batches)
+            VALUES (?, ?, ?, ?)
+        """, swept_from, today, rows_changed, batches)
+        conn.commit()
+
+        logger.info(f"Expiry sweep {swept_from or 'start'} -> {today}: {rows_changed} families deactivated in {batches} batch(es).")
+        return {'swept_from': swept_from, 'swept_through': today, 'rows_changed': rows_changed, 'batches': batches}
+    except pyodbc.Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+def handler(event, context):
+    """Scheduled daily sweep."""
+    conn = get_db_connection()
+    if conn is None:
+        return {'statusCode': 500, 'body': json.dumps({'error': 'Database connection failed'})}
+    try:
+        result = sweep_expired_memberships(conn)
+        return {'statusCode': 200, 'body': json.dumps(result, default=str)}
+    except Exception as e:
+        logger.error(f"Expiry sweep failed: {e}")
+        return {'statusCode': 500, 'body': json.dumps({'error': str(e)})}
+    finally:
+        conn.close()
@@ -0,0 +1,83 @@
+# json_backend.py
+"""
+JSON encoding for API responses, on orjson when it is installed.
+
+orjson encodes dicts, lists, strings, numbers, date and datetime in C; only values
+it does not know (Decimal) reach the Python `default` callback. Without orjson, or
+with JSON_BACKEND=stdlib, json.dumps is used with the same callback, which looks
+converters up by exact type before falling back to isinstance checks.
+
+Both backends give the same values: dates and datetimes as isoformat strings,
+Decimal as float. orjson output is compact (no spaces after , and :) and leaves
+non-ASCII characters unescaped; both are equivalent JSON.
+"""
+import json
+import logging
+import os
+from datetime import date, datetime
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib path is always available
+    orjson = None
+
+_requested = os.environ.get('JSON_BACKEND', 'auto').lower()
+if _requested == 'orjson' and orjson is None:
+    logging.warning("JSON_BACKEND=orjson but orjson is not installed; using the stdlib json module.")
+BACKEND = 'orjson' if orjson is not None and _requested in ('auto', 'orjson') else 'stdlib'
+
+_CONVERTERS = {
+    datetime: datetime.isoformat,
+    date: date.isoformat,
+    Decimal: float,
+}
+
+def default(o):
+    """Converts the non-JSON types the API returns; raises TypeError for anything else."""
+    convert = _CONVERTERS.get(type(o))
+    if convert is not None:
+        return convert(o)
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    if isinstance(o, Decimal):
+        return float(o)
+    raise TypeError(f"Object of type {o.__class__.__name__} is not JSON serializable")
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+def _orjson_options(kwargs):
+    """orjson options for the json.dumps keyword arguments Flask may pass, or None if unsupported."""
+    options = _ORJSON_OPTIONS
+    for key, value in kwargs.items():
+        if key == 'sort_keys':
+            options |= orjson.OPT_SORT_KEYS if value else 0
+        elif key == 'indent':
+            options |= orjson.OPT_INDENT_2 if value else 0
+        elif key not in ('ensure_ascii', 'separators'):
+            return None
+    return options
+
+def dumps_bytes(obj, **kwargs):
+    """Encodes obj as UTF-8 JSON bytes."""
+    if BACKEND == 'orjson':
+        options = _orjson_options(kwargs)
+        if options is not None:
+            try:
+                return orjson.dumps(obj, default=default, option=options)
+            except orjson.JSONEncodeError:
+                # e.g. integers beyond 64 bits; the stdlib handles those or raises the usual TypeError.
+                pass
+    return json.dumps(obj, default=default, **kwargs).encode('utf-8')
+
+def dumps(obj, **kwargs):
+    """Encodes obj as a JSON string."""
+    if BACKEND == 'orjson':
+        return dumps_bytes(obj, **kwargs).decode('utf-8')
+    return json.dumps(obj, default=default, **kwargs)
+
+def loads(s, **kwargs):
+    if BACKEND == 'orjson' and not kwargs:
+        return orjson.loads(s)
+    return json.loads(s, **kwargs)
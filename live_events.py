@@ -0,0 +1,321 @@
+# live_events.py
+"""
+Change feed for the front-desk screens (migration 0010).
+
+Write endpoints insert a row into dbo.app_events in the same transaction as the
+change, using the SQL below, so an event exists exactly when its change is committed:
+
+  visit    a check-in or added visit. It carries the family's visitors today and
+           the day's total, not just the increment.
+  family   a new or changed family. It carries every /api/data row for the family;
+           an empty list means the family was deleted.
+  renewal  the same as family, for a renewed membership.
+
+Events carry the new state rather than a delta, so applying one twice is harmless.
+
+GET /api/events serves them as Server-Sent Events. A token is CAST(row_version AS
+BIGINT) and is sent as the SSE id. A screen that reconnects with its last token
+(?since= or Last-Event-ID) gets everything committed after it. A token older than
+the pruning horizon gets 'reset' instead, and the screen reloads.
+
+Under Lambda the response ends after the catch-up and the screen reconnects after
+`retry` (LAMBDA_RETRY_MS, so changes reach other screens within that interval). In server mode an EventHub keeps the stream open: one poller thread per
+process reads new events for every open stream.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import pyodbc
+
+import json_backend
+
+EVENT_TYPES = ('visit', 'family', 'renewal')
+READ_LIMIT = 500
+RETENTION_HOURS = int(os.environ.get('EVENT_RETENTION_HOURS', '36'))
+PRUNE_BATCH_SIZE = 5000
+MAX_PRUNE_BATCHES = 100
+
+# Reconnect delay sent to screens when a stream ends in server mode.
+RETRY_MS = int(os.environ.get('LIVE_EVENTS_RETRY_MS', '3000'))
+# Under Lambda every response ends after the catch-up, so this is how often each open
+# screen polls: one API Gateway request, one Lambda invocation and one app_events read
+# (plus a connect on a cold container) per screen every interval. At 30 s that is 120
+# an hour per screen, about 1,000 per screen over an 8-hour day; at 3 s it would be ten
+# times that. Set per stage with LIVE_EVENTS_LAMBDA_RETRY_MS in serverless.yml.
+LAMBDA_RETRY_MS = int(os.environ.get('LIVE_EVENTS_LAMBDA_RETRY_MS', '30000'))
+STREAM_SECONDS = 300     # server mode: a stream ends after this long and the screen resumes
+KEEPALIVE_SECONDS = 15
+POLL_SECONDS = 1.0
+POLL_ERROR_SECONDS = 5.0
+
+# --- Writing Events ---
+
+# One family's /api/data rows as JSON; {member_id} is a T-SQL expression.
+FAMILY_STATE_JSON = """
+    (SELECT {member_id} AS member_id,
+            JSON_QUERY(ISNULL((
+                SELECT m.member_id, m.name, m.last_name, m.phone, m.birthday, m.gender,
+                       m.primary_member, m.secondary_member,
+                       f.address, f.city, f.state, f.zip_code, f.email, f.founding_family,
+                       f.mem_start_date, f.membership_expires, f.active_flag, f.renewal_email_sent
+                FROM members AS m
+                JOIN family AS f ON m.member_id = f.member_id
+                WHERE m.member_id = {member_id}
+                FOR JSON PATH, INCLUDE_NULL_VALUES), '[]')) AS members
+     FOR JSON PATH, WITHOUT_ARRAY_WRAPPER)
+"""
+
+def family_event_sql(event_type, member_id, source=''):
+    """
+    An INSERT of a family or renewal event, to run in the writer's batch after the
+    change. `member_id` is a T-SQL expression; `source` is an optional FROM ... clause
+    that it refers to, for one event per affected family.
+    """
+    if event_type not in EVENT_TYPES:
+        raise ValueError(f"Unknown event type '{event_type}'.")
+    return f"""
+        INSERT INTO dbo.app_events (event_type, member_id, payload)
+        SELECT '{event_type}', {member_id}, {FAMILY_STATE_JSON.format(member_id=member_id)}
+        {source};
+    """
+
+def record_family_event(cursor, event_type, member_id):
+    """Adds a family event on the caller's cursor; it commits with the caller's transaction."""
+    cursor.execute("DECLARE @event_member_id VARCHAR(20) = ?;" + family_event_sql(event_type, '@event_member_id'),
+                   member_id)
+
+# A visit event, to run in the writer's batch after the Visits insert. The batch declares
+# @visit_member_id, @visit_name, @visit_last_name, @visit_datetime, @visits_added and
+# @day_start/@day_end (today). READPAST leaves out other check-ins still in flight rather
+# than waiting on them (two check-ins counting each other's rows would deadlock); their
+# own events carry the later totals.
+VISIT_EVENT_SQL = """
+    INSERT INTO dbo.app_events (event_type, member_id, payload)
+    SELECT 'visit', @visit_member_id, (
+        SELECT @visit_member_id AS member_id, @visit_name AS name, @visit_last_name AS last_name,
+               @visits_added AS added, @visit_datetime AS visit_datetime,
+               family_today.visitors, family_today.last_visit,
+               (SELECT COUNT(*) FROM Visits WITH (READPAST)
+                WHERE visit_datetime >= @day_start AND visit_datetime < @day_end) AS visits_today
+        FROM (SELECT COUNT(*) AS visitors, MAX(visit_datetime) AS last_visit
+              FROM Visits WITH (READPAST)
+              WHERE member_id = @visit_member_id AND name = @visit_name AND last_name = @visit_last_name
+                AND visit_datetime >= @day_start AND visit_datetime < @day_end) AS family_today
+        FOR JSON PATH, WITHOUT_ARRAY_WRAPPER, INCLUDE_NULL_VALUES);
+"""
+
+# --- Reading Events ---
+
+# Everything committed after a token, oldest first. head is the last row_version
+# below MIN_ACTIVE_ROWVERSION(): every event up to it is committed, so nothing can
+# later appear behind a token handed out from here. READPAST skips the uncommitted
+# rows at the end of the range instead of waiting on them; they are above head anyway.
+# The single-row `v` keeps the head and pruning watermark when there are no events.
+READ_EVENTS_SQL = """
+    SELECT TOP (?) CAST(e.row_version AS BIGINT) AS token, e.event_type, e.payload, v.head, v.pruned_through
+    FROM (SELECT CAST(MIN_ACTIVE_ROWVERSION() AS BIGINT) - 1 AS head,
+                 (SELECT CAST(pruned_through AS BIGINT) FROM dbo.app_event_state WHERE id = 1) AS pruned_through) AS v
+    LEFT JOIN dbo.app_events AS e WITH (READPAST)
+      ON e.row_version > CAST(? AS BINARY(8)) AND e.row_version <= CAST(v.head AS BINARY(8))
+    ORDER BY e.row_version
+"""
+
+def read_events(cursor, after, limit=READ_LIMIT):
+    """
+    Returns (events, head, reset). `events` is a list of (token, event_type,
+    payload JSON) committed after `after`, and `head` is the token to continue from.
+    `reset` is True when `after` is older than the pruned events or ahead of the
+    database (e.g. after a restore): the caller has missed events and must reload.
+    With `after` None, no events are read and `head` is the current position.
+    """
+    cursor.execute(READ_EVENTS_SQL, limit, after)
+    rows = cursor.fetchall()
+    head, pruned_through = rows[0][3], rows[0][4]
+    if after is not None and (after < (pruned_through or 0) or after > head):
+        return [], head, True
+    events = [(token, event_type, payload) for token, event_type, payload, _, _ in rows if token is not None]
+    if len(events) >= limit:
+        head = events[-1][0]  # a full page; the next read continues from here
+    return events, head, False
+
+# --- Pruning ---
+
+PRUNE_SQL = """
+    SET NOCOUNT ON;
+    DECLARE @pruned TABLE (row_version BINARY(8) NOT NULL);
+
+    DELETE TOP (?) FROM dbo.app_events
+    OUTPUT DELETED.row_version INTO @pruned
+    WHERE created_at < ?;
+
+    -- Screens resuming from below this get 'reset'; it only moves forward.
+    DECLARE @through BINARY(8) = (SELECT MAX(row_version) FROM @pruned);
+    IF @through IS NOT NULL
+        MERGE dbo.app_event_state AS s
+        USING (SELECT 1 AS id) AS k ON s.id = k.id
+        WHEN MATCHED AND s.pruned_through < @through THEN
+            UPDATE SET pruned_through = @through, updated_at = SYSUTCDATETIME()
+        WHEN NOT MATCHED THEN INSERT (id, pruned_through) VALUES (1, @through);
+
+    SELECT COUNT(*) FROM @pruned;
+"""
+
+def prune_events(conn, cutoff, batch_size=PRUNE_BATCH_SIZE, max_batches=MAX_PRUNE_BATCHES):
+    """Deletes events created before `cutoff` (UTC) in short transactions. Returns (deleted, batches)."""
+    cursor = conn.cursor()
+    deleted = 0
+    batches = 0
+    try:
+        while batches < max_batches:
+            cursor.execute(PRUNE_SQL, batch_size, cutoff)
+            count = cursor.fetchone()[0]
+            conn.commit()
+            batches += 1
+            deleted += count
+            if count < batch_size:
+                break
+        return deleted, batches
+    except pyodbc.Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+# --- Server-Sent Events ---
+
+def format_event(token, event_type, data):
+    """One SSE frame. `data` is a JSON string; multi-line data gets a data: line each."""
+    lines = [f"id: {token}", f"event: {event_type}"]
+    lines.extend(f"data: {line}" for line in data.split('\n'))
+    return '\n'.join(lines) + '\n\n'
+
+def format_retry(milliseconds):
+    return f"retry: {milliseconds}\n\n"
+
+def format_marker(event_type, head):
+    """'ready' (first connect) or 'reset' (missed events): start from `head`."""
+    return format_event(head, event_type, json_backend.dumps({'token': head}))
+
+class EventHub:
+    """
+    Server mode only. One poller thread per process reads new events into a buffer
+    that every open stream waits on, so ten screens cost one indexed read per poll
+    rather than ten. It polls only while a stream is open. poke() after a local commit
+    polls at once. Each open stream holds a server thread, so at most max_streams are
+    kept open; past that, screens fall back to reconnecting after `retry`.
+    """
+
+    def __init__(self, read, max_streams=4, poll_interval=POLL_SECONDS, buffer_size=1000):
+        self._read = read  # read(after) -> (events, head, reset), as read_events
+        self.max_streams = max_streams
+        self.poll_interval = poll_interval
+        self._buffer = deque()
+        self._buffer_size = buffer_size
+        self._floor = None  # the buffer holds every event after this token (set by the first stream)
+        self._head = None
+        self._streams = 0
+        self._thread = None
+        self._cond = threading.Condition()
+        self._wake = threading.Event()
+        self.stats = {'polls': 0, 'events': 0, 'errors': 0, 'rejected': 0}
+
+    def poke(self):
+        self._wake.set()
+
+    def _open_stream(self, token):
+        with self._cond:
+            if self._streams >= self.max_streams:
+                self.stats['rejected'] += 1
+                return False
+            self._streams += 1
+            if self._floor is None:
+                # The first stream's token (read from the database just now) seeds the position.
+                self._floor = self._head = token
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='live-events', daemon=True)
+                self._thread.start()
+            return True
+
+    def _close_stream(self):
+        with self._cond:
+            self._streams -= 1
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._streams <= 0:
+                    self._thread = None
+                    return
+                after = self._head
+            self._wake.clear()
+            try:
+                events, head, reset = self._read(after)
+            except Exception as e:
+                logging.warning(f"Live event poll failed: {e}")
+                with self._cond:
+                    self.stats['errors'] += 1
+                self._wake.wait(POLL_ERROR_SECONDS)
+                continue
+
+            with self._cond:
+                self.stats['polls'] += 1
+                self.stats['events'] += len(events)
+                if reset:
+                    # The hub fell behind the pruning; streams older than this are told
+                    # to reconnect and catch up from the database.
+                    self._buffer.clear()
+                    self._floor = head
+                for event in events:
+                    if len(self._buffer) >= self._buffer_size:
+                        self._floor = self._buffer.popleft()[0]
+                    self._buffer.append(event)
+                self._head = head
+                self._cond.notify_all()
+            if not events:
+                self._wake.wait(self.poll_interval)
+
+    def _events_after(self, token, timeout):
+        """Events after `token`, waiting up to `timeout`; None if the buffer no longer reaches back to it."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if token < self._floor:
+                    return None
+                if self._buffer and self._buffer[-1][0] > token:
+                    return [event for event in self._buffer if event[0] > token]
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                self._cond.wait(remaining)
+
+    def stream(self, token, preamble):
+        """
+        The body of a streamed /api/events response: `preamble` (the catch-up), then
+        events after `token` as they arrive. Ends after STREAM_SECONDS, or at once
+        when the hub is full, and the screen resumes from its last token.
+        """
+        yield preamble
+        if not self._open_stream(token):
+            return
+        try:
+            ends_at = time.monotonic() + STREAM_SECONDS
+            while time.monotonic() < ends_at:
+                events = self._events_after(token, KEEPALIVE_SECONDS)
+                if events is None:
+                    yield format_retry(0)
+                    return
+                if not events:
+                    yield ': keepalive\n\n'
+                    continue
+                yield ''.join(format_event(*event) for event in events)
+                token = events[-1][0]
+        finally:
+            self._close_stream()
+
+    def snapshot(self):
+        with self._cond:
+            return dict(self.stats, streams=self._streams, max_streams=self.max_streams,
+                        buffered=len(self._buffer), head=self._head)
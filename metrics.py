@@ -0,0 +1,81 @@
+# metrics.py
+"""
+CloudWatch Embedded Metric Format (EMF) for the worker Lambdas.
+
+A handler creates one InvocationMetrics, records counts and latencies while it
+works and calls flush() once at the end. flush() prints a single EMF JSON document
+to stdout; CloudWatch Logs turns it into metrics in METRICS_NAMESPACE with a
+Function dimension, so dashboards and alarms need no log parsing.
+"""
+import json
+import os
+import time
+from contextlib import contextmanager
+
+import sql_stats
+
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'NELCM/Workers')
+MAX_VALUES_PER_METRIC = 100  # EMF limit on values in one metric array
+
+class InvocationMetrics:
+    def __init__(self, function_name):
+        self.function_name = function_name
+        self.started = time.perf_counter()
+        self.db_started_ms = sql_stats.total_ms()
+        self.values = {}
+        self.units = {}
+        self.properties = {}
+
+    def put(self, name, value, unit='Count'):
+        """Adds a value; a metric put several times is emitted as a value array."""
+        values = self.values.setdefault(name, [])
+        if len(values) < MAX_VALUES_PER_METRIC:
+            values.append(value)
+        self.units[name] = unit
+
+    def count(self, name, amount=1):
+        """Adds to a single running total instead of appending a value."""
+        values = self.values.setdefault(name, [0])
+        values[0] += amount
+        self.units[name] = 'Count'
+
+    @contextmanager
+    def timer(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.put(name, (time.perf_counter() - started) * 1000, 'Milliseconds')
+
+    def rate(self, name, count_name):
+        """Emits count_name per second of invocation time as `name`."""
+        elapsed = time.perf_counter() - self.started
+        total = sum(self.values.get(count_name, [0]))
+        if elapsed > 0:
+            self.put(name, total / elapsed, 'Count/Second')
+
+    def set_property(self, key, value):
+        """Searchable context on the log line; not a metric."""
+        self.properties[key] = value
+
+    def flush(self):
+        self.put('DbTime', sql_stats.total_ms() - self.db_started_ms, 'Milliseconds')
+        self.put('Duration', (time.perf_counter() - self.started) * 1000, 'Milliseconds')
+        document = {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': METRICS_NAMESPACE,
+                    'Dimensions': [['Function']],
+                    'Metrics': [{'Name': name, 'Unit': self.units[name]} for name in self.values],
+                }],
+            },
+            'Function': self.function_name,
+        }
+        document.update(self.properties)
+        for name, values in self.values.items():
+            document[name] = values[0] if len(values) == 1 else values
+        # Printed, not logged: the line must be bare JSON for CloudWatch to extract it.
+        print(json.dumps(document, default=str), flush=True)
+        self.values = {}
+        self.units = {}
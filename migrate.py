@@ -0,0 +1,203 @@
+# migrate.py
+import json
+import logging
+import os
+import re
+import sys
+from datetime import date
+
+import pyodbc
+from botocore.exceptions import ClientError
+
+from aws_clients import get_client
+from date_ranges import month_bounds
+from circuit_breaker import call_with_retry, db_breaker
+import sql_stats
+
+# --- Logging ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# --- Configuration ---
+AWS_REGION = "us-east-1"
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+MIGRATION_FILE_RE = re.compile(r'^(\d{4})_[\w-]+\.sql$')
+GO_RE = re.compile(r'^\s*GO\s*;?\s*$', re.IGNORECASE | re.MULTILINE)
+
+def get_secret(secret_name):
+    client = get_client('secretsmanager', region_name=AWS_REGION)
+    try:
+        response = client.get_secret_value(SecretId=secret_name)
+        return json.loads(response['SecretString'])
+    except ClientError as e:
+        logger.error(f"Failed to retrieve secret '{secret_name}': {e}")
+        raise e
+
+def get_db_connection():
+    try:
+        secrets = get_secret("nelcm-db")
+        conn = call_with_retry(lambda: pyodbc.connect(
+            driver='/var/task/lib/libmsodbcsql-18.4.so.1.1',
+            server='nelcm.cy1ogm8uwbvo.us-east-1.rds.amazonaws.com,1433',
+            database='nelcm',
+            uid='nelcm',
+            pwd=secrets.get('password'),
+            Encrypt='yes',
+            TrustServerCertificate='yes'
+        ), db_breaker)
+        return sql_stats.track(conn)
+    except Exception as e:
+        logger.error(f"DATABASE CONNECTION FAILED: {e}")
+        return None
+
+# --- Migrations ---
+
+def list_migrations():
+    """Returns [(version, filename)] for every migration file, in version order."""
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = MIGRATION_FILE_RE.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), filename))
+    return migrations
+
+def split_batches(sql):
+    """Splits a script on GO separators, like sqlcmd does."""
+    return [batch.strip() for batch in GO_RE.split(sql) if batch.strip()]
+
+def ensure_migrations_table(cursor):
+    cursor.execute("""
+        IF OBJECT_ID('dbo.schema_migrations', 'U') IS NULL
+        CREATE TABLE dbo.schema_migrations (
+            version INT NOT NULL PRIMARY KEY,
+            filename VARCHAR(255) NOT NULL,
+            applied_at DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME()
+        )
+    """)
+
+def applied_versions(cursor):
+    cursor.execute("SELECT version FROM dbo.schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+def apply_migrations(conn, dry_run=False):
+    """Applies every pending migration, each in its own transaction. Returns the filenames applied."""
+    cursor = conn.cursor()
+    try:
+        ensure_migrations_table(cursor)
+        conn.commit()
+        done = applied_versions(cursor)
+
+        applied = []
+        for version, filename in list_migrations():
+            if version in done:
+                continue
+            if dry_run:
+                logger.info(f"Pending migration: {filename}")
+                applied.append(filename)
+                continue
+
+            logger.info(f"Applying migration {filename}...")
+            with open(os.path.join(MIGRATIONS_DIR, filename)) as f:
+                batches = split_batches(f.read())
+            try:
+                for batch in batches:
+                    cursor.execute(batch)
+                cursor.execute("INSERT INTO dbo.schema_migrations (version, filename) VALUES (?, ?)",
+                               version, filename)
+                conn.commit()
+            except pyodbc.Error as ex:
+                conn.rollback()
+                logger.error(f"Migration {filename} failed: {ex}")
+                raise
+            applied.append(filename)
+        return applied
+    finally:
+        cursor.close()
+
+# --- Query Plan Checks ---
+# Each hot query paired with the index it is expected to seek on. Parameters are
+# declared as local variables so the estimated plan matches the parameterized query.
+PLAN_CHECKS = [
+    ('renewal expiry window', 'IX_family_expiry', """
+        DECLARE @month_start DATE = ?, @next_month DATE = ?;
+        SELECT f.member_id, f.email, m.name, m.last_name, f.membership_expires
+        FROM family as f
+        JOIN members as m ON f.member_id = m.member_id AND m.primary_member = 1
+        WHERE f.founding_family = 0 AND f.active_flag = 1
+          AND f.membership_expires >= @month_start AND f.membership_expires < @next_month
+    """),
+    ('visits today range', 'IX_Visits_visit_datetime', """
+        DECLARE @day_start DATETIME = ?, @day_end DATETIME = ?;
+        SELECT name, last_name, visit_datetime
+        FROM Visits
+        WHERE visit_datetime >= @day_start AND visit_datetime < @day_end
+    """),
+]
+
+def check_plans(conn, today=None):
+    """
+    Compiles each PLAN_CHECKS query under SHOWPLAN_XML and confirms the optimizer
+    seeks on the expected index. Returns a list of failure messages (empty on success).
+    """
+    today = today or date.today()
+    params = {
+        'IX_family_expiry': month_bounds(today),
+        'IX_Visits_visit_datetime': (today, date.fromordinal(today.toordinal() + 1)),
+    }
+
+    failures = []
+    cursor = conn.cursor()
+    try:
+        for label, index_name, query in PLAN_CHECKS:
+            cursor.execute("SET SHOWPLAN_XML ON")
+            try:
+                cursor.execute(query, *params[index_name])
+                plan_xml = cursor.fetchone()[0]
+            finally:
+                cursor.execute("SET SHOWPLAN_XML OFF")
+
+            seeks = re.findall(r'PhysicalOp="Index Seek".*?</RelOp>', plan_xml, re.DOTALL)
+            if not any(f'Index="[{index_name}]"' in seek for seek in seeks):
+                failures.append(f"{label}: expected an Index Seek on {index_name}")
+            else:
+                logger.info(f"Plan check passed: {label} seeks on {index_name}.")
+    finally:
+        cursor.close()
+    return failures
+
+# --- Entry Points ---
+
+def handler(event, context):
+    """Lambda entry point. Pass {"dry_run": true} to list pending migrations only."""
+    event = event or {}
+    conn = get_db_connection()
+    if conn is None:
+        return {'statusCode': 500, 'body': json.dumps({'error': 'Database connection failed'})}
+    try:
+        applied = apply_migrations(conn, dry_run=bool(event.get('dry_run')))
+        failures = [] if event.get('dry_run') else check_plans(conn)
+        status = 500 if failures else 200
+        return {'statusCode': status, 'body': json.dumps({'applied': applied, 'plan_failures': failures})}
+    except Exception as e:
+        logger.error(f"Migration run failed: {e}")
+        return {'statusCode': 500, 'body': json.dumps({'error': str(e)})}
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    conn = get_db_connection()
+    if conn is None:
+        sys.exit("Database connection failed.")
+    try:
+        if '--check-plans' not in args or '--migrate' in args:
+            for filename in apply_migrations(conn, dry_run='--dry-run' in args):
+                print(filename)
+        if '--check-plans' in args:
+            problems = check_plans(conn)
+            for problem in problems:
+                print(f"PLAN CHECK FAILED: {problem}")
+            sys.exit(1 if problems else 0)
+    finally:
+        conn.close()
@@ -0,0 +1,38 @@
+-- 0001: Checkpoint tables for the monthly renewal run (renewal_trigger.py).
+
+IF OBJECT_ID('dbo.renewal_jobs', 'U') IS NULL
+CREATE TABLE dbo.renewal_jobs (
+    job_id INT IDENTITY(1,1) PRIMARY KEY,
+    run_month DATE NOT NULL,
+    stage VARCHAR(20) NULL,
+    member_offset INT NOT NULL DEFAULT 0,
+    queued_count INT NOT NULL DEFAULT 0,
+    status VARCHAR(20) NOT NULL DEFAULT 'running',
+    pdf VARBINARY(MAX) NULL,
+    last_error NVARCHAR(4000) NULL,
+    started_at DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME(),
+    updated_at DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME()
+);
+GO
+
+IF OBJECT_ID('dbo.renewal_job_members', 'U') IS NULL
+CREATE TABLE dbo.renewal_job_members (
+    job_id INT NOT NULL,
+    seq INT NOT NULL,
+    member_id VARCHAR(50) NOT NULL,
+    email VARCHAR(255) NULL,
+    name VARCHAR(100) NULL,
+    last_name VARCHAR(100) NULL,
+    membership_expires DATE NULL,
+    address VARCHAR(255) NULL,
+    city VARCHAR(100) NULL,
+    state VARCHAR(50) NULL,
+    zip_code VARCHAR(20) NULL,
+    renewal_email_sent BIT NULL,
+    CONSTRAINT PK_renewal_job_members PRIMARY KEY (job_id, seq)
+);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_renewal_jobs_run_month' AND object_id = OBJECT_ID('dbo.renewal_jobs'))
+CREATE INDEX IX_renewal_jobs_run_month ON dbo.renewal_jobs (run_month, job_id);
+GO
@@ -0,0 +1,22 @@
+-- 0002: Covering indexes for the expiry-window, visit-range and primary-member lookups.
+-- The month filters in app.py / renewal_trigger.py are written as half-open
+-- ranges (membership_expires >= first_of_month AND < first_of_next_month) so
+-- they can seek on these.
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_family_expiry' AND object_id = OBJECT_ID('dbo.family'))
+CREATE INDEX IX_family_expiry
+    ON dbo.family (founding_family, active_flag, membership_expires)
+    INCLUDE (member_id, email, renewal_email_sent, address, city, state, zip_code);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Visits_visit_datetime' AND object_id = OBJECT_ID('dbo.Visits'))
+CREATE INDEX IX_Visits_visit_datetime
+    ON dbo.Visits (visit_datetime)
+    INCLUDE (member_id, name, last_name);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_members_member_primary' AND object_id = OBJECT_ID('dbo.members'))
+CREATE INDEX IX_members_member_primary
+    ON dbo.members (member_id, primary_member)
+    INCLUDE (name, last_name);
+GO
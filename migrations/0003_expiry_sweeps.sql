@@ -0,0 +1,18 @@
+-- 0003: Run history for the incremental expiry sweeper (expiry_sweeper.py).
+-- MAX(swept_through) only marks the last day a sweep ran, so a second run that
+-- day can return early; each sweep still checks every active expired family.
+
+IF OBJECT_ID('dbo.expiry_sweeps', 'U') IS NULL
+CREATE TABLE dbo.expiry_sweeps (
+    sweep_id INT IDENTITY(1,1) PRIMARY KEY,
+    swept_from DATE NULL,
+    swept_through DATE NOT NULL,
+    rows_changed INT NOT NULL,
+    batches INT NOT NULL,
+    ran_at DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME()
+);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_expiry_sweeps_swept_through' AND object_id = OBJECT_ID('dbo.expiry_sweeps'))
+CREATE INDEX IX_expiry_sweeps_swept_through ON dbo.expiry_sweeps (swept_through);
+GO
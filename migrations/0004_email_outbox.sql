@@ -0,0 +1,22 @@
+-- 0004: Transactional email outbox. app.py writes a row in the same transaction
+-- as the family insert/renewal; outbox_drainer.py pushes pending rows to SQS.
+
+IF OBJECT_ID('dbo.email_outbox', 'U') IS NULL
+CREATE TABLE dbo.email_outbox (
+    outbox_id BIGINT IDENTITY(1,1) PRIMARY KEY,
+    email_type VARCHAR(50) NOT NULL,
+    payload NVARCHAR(MAX) NOT NULL,
+    created_at DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME(),
+    claimed_until DATETIME2 NULL,
+    attempts INT NOT NULL DEFAULT 0,
+    last_error NVARCHAR(1000) NULL,
+    sent_at DATETIME2 NULL
+);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_email_outbox_pending' AND object_id = OBJECT_ID('dbo.email_outbox'))
+CREATE INDEX IX_email_outbox_pending
+    ON dbo.email_outbox (outbox_id)
+    INCLUDE (claimed_until, attempts)
+    WHERE sent_at IS NULL;
+GO
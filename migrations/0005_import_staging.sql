@@ -0,0 +1,31 @@
+-- 0005: Staging table for bulk family/member CSV imports (bulk_import.py).
+-- Rows are keyed by (batch_id, row_num) and removed once the batch is merged.
+
+IF OBJECT_ID('dbo.import_staging', 'U') IS NULL
+CREATE TABLE dbo.import_staging (
+    batch_id UNIQUEIDENTIFIER NOT NULL,
+    row_num INT NOT NULL,
+    family_key NVARCHAR(100) NULL,
+    is_primary BIT NOT NULL,
+    name NVARCHAR(100) NULL,
+    last_name NVARCHAR(100) NULL,
+    phone NVARCHAR(50) NULL,
+    gender BIT NULL,
+    birth_month_day CHAR(5) NOT NULL,
+    birth_year INT NULL,
+    address NVARCHAR(255) NULL,
+    city NVARCHAR(100) NULL,
+    state NVARCHAR(50) NULL,
+    zip_code NVARCHAR(20) NULL,
+    email NVARCHAR(255) NULL,
+    founding_family BIT NOT NULL DEFAULT 0,
+    mem_start_date DATE NULL,
+    membership_expires DATE NULL,
+    renewal_email_sent BIT NOT NULL DEFAULT 1,
+    base_id VARCHAR(10) NULL,
+    member_id VARCHAR(20) NULL,
+    status VARCHAR(10) NOT NULL,
+    message NVARCHAR(400) NULL,
+    CONSTRAINT PK_import_staging PRIMARY KEY (batch_id, row_num)
+);
+GO
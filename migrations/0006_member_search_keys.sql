@@ -0,0 +1,29 @@
+-- 0006: Precomputed search keys on members for /api/search.
+-- Persisted computed columns, so SQL Server maintains them on every insert and
+-- update (add_record, add_secondary_member, update_record, bulk import) with no
+-- application code. *_key is lowercased under an accent-insensitive collation,
+-- *_sx is the SOUNDEX code.
+
+IF COL_LENGTH('dbo.members', 'last_name_key') IS NULL
+ALTER TABLE dbo.members ADD
+    last_name_key AS CAST(LOWER(LTRIM(RTRIM(last_name))) AS NVARCHAR(100)) COLLATE Latin1_General_100_CI_AI PERSISTED,
+    name_key AS CAST(LOWER(LTRIM(RTRIM(name))) AS NVARCHAR(100)) COLLATE Latin1_General_100_CI_AI PERSISTED,
+    last_name_sx AS CAST(SOUNDEX(last_name) AS CHAR(4)) PERSISTED,
+    name_sx AS CAST(SOUNDEX(name) AS CHAR(4)) PERSISTED;
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_members_last_name_key' AND object_id = OBJECT_ID('dbo.members'))
+CREATE INDEX IX_members_last_name_key ON dbo.members (last_name_key) INCLUDE (member_id, name, last_name, primary_member);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_members_name_key' AND object_id = OBJECT_ID('dbo.members'))
+CREATE INDEX IX_members_name_key ON dbo.members (name_key) INCLUDE (member_id, name, last_name, primary_member);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_members_last_name_sx' AND object_id = OBJECT_ID('dbo.members'))
+CREATE INDEX IX_members_last_name_sx ON dbo.members (last_name_sx) INCLUDE (member_id, name, last_name, primary_member);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_members_name_sx' AND object_id = OBJECT_ID('dbo.members'))
+CREATE INDEX IX_members_name_sx ON dbo.members (name_sx) INCLUDE (member_id, name, last_name, primary_member);
+GO
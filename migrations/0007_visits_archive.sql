@@ -0,0 +1,35 @@
+-- 0007: Cold tier for Visits. visit_archiver.py moves visits older than the
+-- archive horizon into Visits_archive in chunks and folds them into
+-- member_visit_summary, so hot queries only touch recent rows.
+
+IF OBJECT_ID('dbo.Visits_archive', 'U') IS NULL
+CREATE TABLE dbo.Visits_archive (
+    member_id VARCHAR(20) NOT NULL,
+    name NVARCHAR(100) NULL,
+    last_name NVARCHAR(100) NULL,
+    visit_datetime DATETIME NOT NULL,
+    archived_at DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME()
+);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'CIX_Visits_archive_member' AND object_id = OBJECT_ID('dbo.Visits_archive'))
+CREATE CLUSTERED INDEX CIX_Visits_archive_member
+    ON dbo.Visits_archive (member_id, name, last_name, visit_datetime);
+GO
+
+IF OBJECT_ID('dbo.member_visit_summary', 'U') IS NULL
+CREATE TABLE dbo.member_visit_summary (
+    member_id VARCHAR(20) NOT NULL,
+    name NVARCHAR(100) NOT NULL,
+    last_name NVARCHAR(100) NOT NULL,
+    archived_visits INT NOT NULL,
+    first_visit DATETIME NOT NULL,
+    last_archived_visit DATETIME NOT NULL,
+    CONSTRAINT PK_member_visit_summary PRIMARY KEY (member_id, name, last_name)
+);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Visits_member' AND object_id = OBJECT_ID('dbo.Visits'))
+CREATE INDEX IX_Visits_member
+    ON dbo.Visits (member_id, name, last_name, visit_datetime);
+GO
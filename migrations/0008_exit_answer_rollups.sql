@@ -0,0 +1,29 @@
+-- 0008: Daily rollups of exit survey answers. app.py folds each insert into
+-- exit_answer_daily in the same transaction; survey_rollups.py rebuilds days
+-- from exit_answers in chunks (the initial backfill, and a nightly reconcile).
+-- GET /api/exit/results reads only the rollup.
+
+IF OBJECT_ID('dbo.exit_answer_daily', 'U') IS NULL
+CREATE TABLE dbo.exit_answer_daily (
+    answer_date DATE NOT NULL,
+    [number] VARCHAR(5) NOT NULL,
+    [answer] VARCHAR(50) NOT NULL,
+    numeric_value FLOAT NULL,
+    responses INT NOT NULL,
+    CONSTRAINT PK_exit_answer_daily PRIMARY KEY (answer_date, [number], [answer])
+);
+GO
+
+IF OBJECT_ID('dbo.exit_rollup_state', 'U') IS NULL
+CREATE TABLE dbo.exit_rollup_state (
+    id TINYINT NOT NULL PRIMARY KEY CHECK (id = 1),
+    rebuilt_before DATE NOT NULL,  -- first day not yet rebuilt from exit_answers
+    updated_at DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME()
+);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_exit_answers_time' AND object_id = OBJECT_ID('dbo.exit_answers'))
+CREATE INDEX IX_exit_answers_time
+    ON dbo.exit_answers ([time])
+    INCLUDE ([number], [answer]);
+GO
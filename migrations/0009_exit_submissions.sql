@@ -0,0 +1,29 @@
+-- 0009: Whole exit survey submissions. Kiosks send a client-generated
+-- submission_id per survey; exit_submissions records each one once, so a
+-- buffered batch can be resent safely. Answers are staged with fast_executemany
+-- and moved set-based by app.py, the same way bulk_import.py uses import_staging.
+
+IF OBJECT_ID('dbo.exit_submissions', 'U') IS NULL
+CREATE TABLE dbo.exit_submissions (
+    submission_id VARCHAR(64) NOT NULL PRIMARY KEY,
+    submitted_at DATETIME NOT NULL,
+    answers INT NOT NULL,
+    received_at DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME()
+);
+GO
+
+IF COL_LENGTH('dbo.exit_answers', 'submission_id') IS NULL
+ALTER TABLE dbo.exit_answers ADD submission_id VARCHAR(64) NULL;
+GO
+
+IF OBJECT_ID('dbo.exit_answer_staging', 'U') IS NULL
+CREATE TABLE dbo.exit_answer_staging (
+    batch_id UNIQUEIDENTIFIER NOT NULL,
+    row_num INT NOT NULL,
+    submission_id VARCHAR(64) NOT NULL,
+    submitted_at DATETIME NOT NULL,
+    [number] VARCHAR(5) NOT NULL,
+    [answer] VARCHAR(50) NOT NULL,
+    CONSTRAINT PK_exit_answer_staging PRIMARY KEY (batch_id, row_num)
+);
+GO
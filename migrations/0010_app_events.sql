@@ -0,0 +1,30 @@
+-- 0010: Change feed for the front-desk screens. Check-ins and family writes add
+-- a row to app_events in the same transaction as the change; GET /api/events
+-- streams them (live_events.py). Readers order by row_version and stop below
+-- MIN_ACTIVE_ROWVERSION(), so an event whose transaction is still open is never
+-- passed over. visit_archiver.py prunes old events and records how far it went.
+
+IF OBJECT_ID('dbo.app_events', 'U') IS NULL
+CREATE TABLE dbo.app_events (
+    event_id BIGINT IDENTITY(1,1) PRIMARY KEY,
+    event_type VARCHAR(20) NOT NULL,
+    member_id VARCHAR(20) NULL,
+    payload NVARCHAR(MAX) NOT NULL,
+    created_at DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME(),
+    row_version ROWVERSION NOT NULL
+);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_app_events_row_version' AND object_id = OBJECT_ID('dbo.app_events'))
+CREATE UNIQUE INDEX IX_app_events_row_version
+    ON dbo.app_events (row_version)
+    INCLUDE (event_type, payload);
+GO
+
+IF OBJECT_ID('dbo.app_event_state', 'U') IS NULL
+CREATE TABLE dbo.app_event_state (
+    id TINYINT NOT NULL PRIMARY KEY CHECK (id = 1),
+    pruned_through BINARY(8) NOT NULL,  -- highest row_version deleted by pruning
+    updated_at DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME()
+);
+GO
@@ -0,0 +1,7 @@
+-- 0011: Per-member enqueue progress for the monthly renewal run. run_enqueue sets
+-- queued = 1 for each member SQS accepted, so a rerun after a partial batch
+-- failure sends only the members that are still unqueued.
+
+IF COL_LENGTH('dbo.renewal_job_members', 'queued') IS NULL
+ALTER TABLE dbo.renewal_job_members ADD queued BIT NOT NULL DEFAULT 0;
+GO
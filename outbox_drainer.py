@@ -0,0 +1,157 @@
+# outbox_drainer.py
+import json
+import logging
+import os
+import time
+
+import pyodbc
+from botocore.exceptions import ClientError
+
+from aws_clients import get_client
+from circuit_breaker import call_with_retry, db_breaker
+import sql_stats
+
+# --- Logging ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+AWS_REGION = "us-east-1"
+
+SQS_BATCH_SIZE = 10       # SQS SendMessageBatch limit
+CLAIM_SIZE = 200          # rows claimed per round
+CLAIM_SECONDS = 120       # lease before another drainer may retry a claimed row
+MAX_ATTEMPTS = 5          # rows that keep failing are left for inspection
+STOP_MARGIN_SECONDS = 10  # stop claiming when less than this is left of the invocation
+
+# Bounded SQS calls, so one slow send can't run past the invocation's deadline.
+SQS_CONFIG = {'connect_timeout': 2, 'read_timeout': 5, 'retries': {'max_attempts': 2}}
+
+def get_secret(secret_name):
+    client = get_client('secretsmanager', region_name=AWS_REGION)
+    try:
+        response = client.get_secret_value(SecretId=secret_name)
+        return json.loads(response['SecretString'])
+    except ClientError as e:
+        logger.error(f"Failed to retrieve secret '{secret_name}': {e}")
+        raise e
+
+def get_db_connection():
+    try:
+        secrets = get_secret("nelcm-db")
+        conn = call_with_retry(lambda: pyodbc.connect(
+            driver='/var/task/lib/libmsodbcsql-18.4.so.1.1',
+            server='nelcm.cy1ogm8uwbvo.us-east-1.rds.amazonaws.com,1433',
+            database='nelcm',
+            uid='nelcm',
+            pwd=secrets.get('password'),
+            Encrypt='yes',
+            TrustServerCertificate='yes'
+        ), db_breaker)
+        return sql_stats.track(conn)
+    except Exception as e:
+        logger.error(f"DATABASE CONNECTION FAILED: {e}")
+        return None
+
+def claim_pending(conn, limit=CLAIM_SIZE):
+    """
+    Leases up to `limit` unsent outbox rows. READPAST lets concurrent drainers
+    skip each other's rows instead of blocking. Returns [(outbox_id, payload)].
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            ;WITH pending AS (
+                SELECT TOP (?) outbox_id, payload, claimed_until
+                FROM dbo.email_outbox WITH (ROWLOCK, READPAST, UPDLOCK)
+                WHERE sent_at IS NULL AND attempts < ?
+                  AND (claimed_until IS NULL OR claimed_until < SYSUTCDATETIME())
+                ORDER BY outbox_id
+            )
+            UPDATE pending
+            SET claimed_until = DATEADD(SECOND, ?, SYSUTCDATETIME())
+            OUTPUT INSERTED.outbox_id, INSERTED.payload
+        """, limit, MAX_ATTEMPTS, CLAIM_SECONDS)
+        rows = [(row[0], row[1]) for row in cursor.fetchall()]
+        conn.commit()
+        return sorted(rows)
+    finally:
+        cursor.close()
+
+def mark_sent(cursor, outbox_ids):
+    cursor.executemany(
+        "UPDATE dbo.email_outbox SET sent_at = SYSUTCDATETIME(), claimed_until = NULL WHERE outbox_id = ?",
+        [(i,) for i in outbox_ids])
+
+def mark_failed(cursor, failures):
+    """Records the error and backs the row off for a minute per attempt."""
+    cursor.executemany("""
+        UPDATE dbo.email_outbox
+        SET attempts = attempts + 1, last_error = ?,
+            claimed_until = DATEADD(SECOND, 60 * (attempts + 1), SYSUTCDATETIME())
+        WHERE outbox_id = ?
+    """, [(str(error)[:1000], i) for i, error in failures])
+
+def drain_outbox(conn, sqs=None, queue_url=None, deadline=None):
+    """
+    Pushes every pending outbox row to SQS in 10-message batches. Returns (sent, failed).
+    With a `deadline` (time.monotonic() value) it stops claiming new rows near the end.
+    """
+    queue_url = queue_url or os.environ.get('SQS_QUEUE_URL')
+    if not queue_url:
+        raise EnvironmentError("SQS_QUEUE_URL environment variable not set.")
+    sqs = sqs or get_client('sqs', **SQS_CONFIG)
+
+    sent_total = 0
+    failed_total = 0
+    while True:
+        if deadline is not None and deadline - time.monotonic() < STOP_MARGIN_SECONDS:
+            logger.info("Stopping drain early to stay within the invocation's time limit.")
+            break
+        rows = claim_pending(conn)
+        if not rows:
+            break
+
+        cursor = conn.cursor()
+        cursor.fast_executemany = True
+        try:
+            for i in range(0, len(rows), SQS_BATCH_SIZE):
+                batch = rows[i:i + SQS_BATCH_SIZE]
+                entries = [{'Id': str(outbox_id), 'MessageBody': payload} for outbox_id, payload in batch]
+                try:
+                    response = sqs.send_message_batch(QueueUrl=queue_url, Entries=entries)
+                    sent = [int(s['Id']) for s in response.get('Successful', [])]
+                    failures = [(int(f['Id']), f.get('Message') or f.get('Code')) for f in response.get('Failed', [])]
+                except ClientError as e:
+                    logger.error(f"SQS batch send failed: {e}")
+                    sent, failures = [], [(outbox_id, e) for outbox_id, _ in batch]
+
+                if sent:
+                    mark_sent(cursor, sent)
+                if failures:
+                    mark_failed(cursor, failures)
+                conn.commit()
+                sent_total += len(sent)
+                failed_total += len(failures)
+        finally:
+            cursor.close()
+
+        if len(rows) < CLAIM_SIZE:
+            break
+
+    return sent_total, failed_total
+
+def handler(event, context):
+    """Scheduled drain of dbo.email_outbox into the renewal email queue."""
+    conn = get_db_connection()
+    if conn is None:
+        raise ConnectionError("Database connection failed.")
+    try:
+        deadline = None
+        if context is not None and hasattr(context, 'get_remaining_time_in_millis'):
+            deadline = time.monotonic() + context.get_remaining_time_in_millis() / 1000.0
+        sent, failed = drain_outbox(conn, deadline=deadline)
+        logger.info(f"Outbox drained: {sent} emails queued, {failed} failed.")
+        return {'statusCode': 200, 'body': json.dumps({'queued': sent, 'failed': failed})}
+    finally:
+        conn.close()
@@ -5,18 +5,21 @@ from datetime import date
 import logging
 import os
 import io
+import time
 
-import boto3
 from botocore.exceptions import ClientError
 
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.units import inch
-import smtplib
-import ssl
-from email.mime.application import MIMEApplication
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
+from aws_clients import get_client
+from date_ranges import month_bounds
+from circuit_breaker import call_with_retry, db_breaker
+import sql_stats
+from metrics import InvocationMetrics
+from row_mapping import map_rows
+
+from expiry_sweeper import sweep_expired_memberships
+
+# reportlab and the SMTP/email modules are imported where they are used: only the
+# render and mail stages need them, and a resumed or already-complete run skips both.
 
 # --- Logging ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -29,8 +32,7 @@ SES_SMTP_HOST = "email-smtp.us-east-1.amazonaws.com"
 SES_SMTP_PORT = 465
 
 def get_secret(secret_name):
-    session = boto3.session.Session()
-    client = session.client(service_name='secretsmanager', region_name=AWS_REGION)
+    client = get_client('secretsmanager', region_name=AWS_REGION)
     try:
         response = client.get_secret_value(SecretId=secret_name)
         return json.loads(response['SecretString'])
@@ -42,7 +44,7 @@ def get_db_connection():
     try:
         secrets = get_secret("nelcm-db")
         db_password = secrets.get('password')
-        conn = pyodbc.connect(
+        conn = call_with_retry(lambda: pyodbc.connect(
             driver='/var/task/lib/libmsodbcsql-18.4.so.1.1',
             server='nelcm.cy1ogm8uwbvo.us-east-1.rds.amazonaws.com,1433',
             database='nelcm',
@@ -50,13 +52,16 @@ def get_db_connection():
             pwd=db_password,
             Encrypt='yes',
             TrustServerCertificate='yes'
-        )
-        return conn
+        ), db_breaker)
+        return sql_stats.track(conn)
     except Exception as e:
         logger.error(f"DATABASE CONNECTION FAILED: {e}")
         return None
 
 def draw_letter_page(p, member_data):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.units import inch
+
     name = member_data.get('name', 'Valued')
     last_name = member_data.get('last_name', 'Member')
     address = member_data.get('address', '')
@@ -103,6 +108,12 @@ def draw_letter_page(p, member_data):
     p.showPage()
 
 def send_pdf_email(pdf_buffer, recipients):
+    import smtplib
+    import ssl
+    from email.mime.application import MIMEApplication
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+
     SENDER_EMAIL = "Northeast Louisiana Childrens Museum <nelcm98@gmail.com>"
     SUBJECT = f"Monthly Renewal Mailer PDF - {date.today().strftime('%B %Y')}"
     BODY_TEXT = "Attached is the generated PDF containing renewal letters for members expiring this month."
@@ -142,10 +153,250 @@ def send_pdf_email(pdf_buffer, recipients):
         return False
 
 
+# --- Renewal Job Checkpoints ---
+# A monthly run is recorded as a job so a failed run can be resumed. `stage` holds
+# the last stage that completed; a rerun skips everything up to and including it.
+# Tables are created by migrations/0001_renewal_jobs.sql.
+STAGES = ('deactivate', 'select', 'render', 'mail', 'enqueue')
+SQS_BATCH_SIZE = 10  # SQS SendMessageBatch limit
+SQS_SEND_ATTEMPTS = 3  # tries per batch; only entries SQS failed are resent
+PDF_RECIPIENTS = "kris@kedainsights.com, nelcmsarah@gmail.com"
+
+def get_or_create_job(cursor, run_month, restart=False):
+    """Returns the latest job for run_month, starting a new one if needed."""
+    cursor.execute("""
+        SELECT TOP 1 job_id, stage, member_offset, queued_count, status
+        FROM dbo.renewal_jobs
+        WHERE run_month = ?
+        ORDER BY job_id DESC
+    """, run_month)
+    row = cursor.fetchone()
+    if row and not restart:
+        return {'job_id': row[0], 'stage': row[1], 'member_offset': row[2],
+                'queued_count': row[3], 'status': row[4]}
+
+    cursor.execute("""
+        INSERT INTO dbo.renewal_jobs (run_month)
+        OUTPUT INSERTED.job_id
+        VALUES (?)
+    """, run_month)
+    job_id = cursor.fetchone()[0]
+    return {'job_id': job_id, 'stage': None, 'member_offset': 0, 'queued_count': 0, 'status': 'running'}
+
+def stage_done(job, stage):
+    """True if the job has already completed the given stage."""
+    if job['stage'] is None:
+        return False
+    return STAGES.index(job['stage']) >= STAGES.index(stage)
+
+def advance_job(cursor, job, stage, status='running'):
+    """Records stage as completed. Caller commits, so it lands with the stage's own writes."""
+    cursor.execute("""
+        UPDATE dbo.renewal_jobs
+        SET stage = ?, status = ?, last_error = NULL, updated_at = SYSUTCDATETIME()
+        WHERE job_id = ?
+    """, stage, status, job['job_id'])
+    job['stage'] = stage
+    job['status'] = status
+
+def record_job_failure(conn, job, error):
+    """Marks the job failed so the next run resumes it. Never raises."""
+    try:
+        conn.rollback()
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE dbo.renewal_jobs
+            SET status = 'failed', last_error = ?, updated_at = SYSUTCDATETIME()
+            WHERE job_id = ?
+        """, str(error)[:4000], job['job_id'])
+        conn.commit()
+        cursor.close()
+    except Exception as e:
+        logger.error(f"Could not record failure for renewal job {job['job_id']}: {e}")
+
+def load_job_members(cursor, job, after_seq=0):
+    cursor.execute("""
+        SELECT seq, member_id, email, name, last_name, membership_expires,
+               address, city, state, zip_code, renewal_email_sent, queued
+        FROM dbo.renewal_job_members
+        WHERE job_id = ? AND seq > ?
+        ORDER BY seq
+    """, job['job_id'], after_seq)
+    return map_rows(cursor)
+
+def wants_restart(event):
+    """Manual runs can pass {"restart": true} to start the month over."""
+    if not isinstance(event, dict):
+        return False
+    if event.get('restart'):
+        return True
+    body = event.get('body')
+    if isinstance(body, str) and body:
+        try:
+            body = json.loads(body)
+        except ValueError:
+            return False
+    return isinstance(body, dict) and bool(body.get('restart'))
+
+def run_deactivate(conn, cursor, job, today, metrics):
+    sweep = sweep_expired_memberships(conn, today)
+    logger.info(f"Deactivated {sweep['rows_changed']} expired memberships.")
+    metrics.count('MembershipsDeactivated', sweep['rows_changed'])
+    advance_job(cursor, job, 'deactivate')
+    conn.commit()
+
+def run_select(conn, cursor, job, today, metrics):
+    logger.info(f"Checking for memberships expiring in {today.month}/{today.year}...")
+
+    # ✅ Snapshot all expiring families this month, regardless of renewal flag, so
+    # later stages (and reruns) work from the same list.
+    cursor.execute("DELETE FROM dbo.renewal_job_members WHERE job_id = ?", job['job_id'])
+    cursor.execute("""
+        INSERT INTO dbo.renewal_job_members (
+            job_id, seq, member_id, email, name, last_name, membership_expires,
+            address, city, state, zip_code, renewal_email_sent
+        )
+        SELECT ?, ROW_NUMBER() OVER (ORDER BY f.member_id),
+               f.member_id, f.email, m.name, m.last_name, f.membership_expires,
+               f.address, f.city, f.state, f.zip_code, f.renewal_email_sent
+        FROM family as f
+        JOIN members as m ON f.member_id = m.member_id AND m.primary_member = 1
+        WHERE 
+            f.founding_family = 0 AND f.active_flag = 1
+            AND f.membership_expires >= ? AND f.membership_expires < ?
+    """, job['job_id'], *month_bounds(today))
+    selected = cursor.rowcount
+    metrics.count('MembersSelected', max(selected, 0))
+    advance_job(cursor, job, 'select')
+    conn.commit()
+    return selected
+
+def run_render(conn, cursor, job, members, metrics):
+    # ✅ Generate PDF for all expiring families
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    render_started = time.perf_counter()
+    buffer = io.BytesIO()
+    p = canvas.Canvas(buffer, pagesize=letter)
+    for member in members:
+        draw_letter_page(p, member)
+    p.save()
+    render_seconds = time.perf_counter() - render_started
+    metrics.count('PdfPagesRendered', len(members))
+    metrics.put('PdfRenderTime', render_seconds * 1000, 'Milliseconds')
+    metrics.put('PdfBytes', len(buffer.getvalue()), 'Bytes')
+    if render_seconds > 0:
+        metrics.put('PdfPagesPerSecond', len(members) / render_seconds, 'Count/Second')
+
+    cursor.execute("UPDATE dbo.renewal_jobs SET pdf = ? WHERE job_id = ?",
+                   pyodbc.Binary(buffer.getvalue()), job['job_id'])
+    advance_job(cursor, job, 'render')
+    conn.commit()
+
+def run_mail(conn, cursor, job, metrics):
+    cursor.execute("SELECT pdf FROM dbo.renewal_jobs WHERE job_id = ?", job['job_id'])
+    pdf_bytes = cursor.fetchone()[0]
+    with metrics.timer('MailerSendTime'):
+        mailed = send_pdf_email(io.BytesIO(pdf_bytes), PDF_RECIPIENTS)
+    if not mailed:
+        metrics.count('MailerFailed')
+        raise RuntimeError("Failed to send renewal mailer PDF.")
+    advance_job(cursor, job, 'mail')
+    conn.commit()
+
+def send_renewal_batch(sqs, sqs_queue_url, batch, metrics):
+    """
+    Sends one SendMessageBatch for `batch` and resends only the entries SQS reports
+    as failed, up to SQS_SEND_ATTEMPTS. Entries with SenderFault set are not retried.
+    Returns (seqs SQS accepted, failed entries from the last attempt).
+    """
+    entries = [{
+        'Id': str(member['seq']),
+        'MessageBody': json.dumps({
+            'email_type': 'renewal_reminder',
+            'member_id': member['member_id'],
+            'email': member['email'],
+            'name': member['name'],
+            'last_name': member['last_name'],
+            'expires': member['membership_expires'].isoformat()
+        })
+    } for member in batch]
+    sent = []
+    failed = []
+    for attempt in range(SQS_SEND_ATTEMPTS):
+        with metrics.timer('SqsSendLatency'):
+            response = sqs.send_message_batch(QueueUrl=sqs_queue_url, Entries=entries)
+        metrics.put('SqsBatchSize', len(entries))
+        sent.extend(int(s['Id']) for s in response.get('Successful', []))
+        retry = [f for f in response.get('Failed', []) if not f.get('SenderFault')]
+        failed.extend(f for f in response.get('Failed', []) if f.get('SenderFault'))
+        if not retry or attempt == SQS_SEND_ATTEMPTS - 1:
+            failed.extend(retry)
+            break
+        retry_ids = {f['Id'] for f in retry}
+        entries = [e for e in entries if e['Id'] in retry_ids]
+        time.sleep(0.1 * (2 ** attempt))
+    return sent, failed
+
+def run_enqueue(conn, cursor, job, metrics):
+    # ✅ Only queue emails for members who haven't received one
+    sqs_queue_url = os.environ.get('SQS_QUEUE_URL')
+    if not sqs_queue_url:
+        raise EnvironmentError("SQS_QUEUE_URL environment variable not set.")
+
+    # Members SQS has accepted are marked queued one batch at a time, so a rerun
+    # sends only the ones that are still unqueued, wherever they are in the list.
+    pending = [m for m in load_job_members(cursor, job)
+               if m.get('email') and not m.get('renewal_email_sent') and not m.get('queued')]
+    if job['queued_count']:
+        logger.info(f"Resuming enqueue: {job['queued_count']} already queued, {len(pending)} to go.")
+
+    sqs = get_client('sqs')
+    queued_count = 0
+    failed_count = 0
+    first_error = None
+    for i in range(0, len(pending), SQS_BATCH_SIZE):
+        batch = pending[i:i + SQS_BATCH_SIZE]
+        sent, failed = send_renewal_batch(sqs, sqs_queue_url, batch, metrics)
+
+        if sent:
+            placeholders = ', '.join('?' for _ in sent)
+            cursor.execute(f"""
+                UPDATE dbo.renewal_job_members SET queued = 1
+                WHERE job_id = ? AND seq IN ({placeholders})
+            """, job['job_id'], *sent)
+        cursor.execute("""
+            UPDATE dbo.renewal_jobs
+            SET member_offset = ?, queued_count = queued_count + ?, updated_at = SYSUTCDATETIME()
+            WHERE job_id = ?
+        """, batch[-1]['seq'], len(sent), job['job_id'])
+        conn.commit()
+        job['member_offset'] = batch[-1]['seq']
+        job['queued_count'] += len(sent)
+        queued_count += len(sent)
+        if failed:
+            failed_count += len(failed)
+            first_error = first_error or failed[0]
+
+    if failed_count:
+        # The job stays in the 'mail' stage; the next run resends only these members.
+        metrics.count('SqsEntriesFailed', failed_count)
+        metrics.count('RenewalEmailsQueued', queued_count)
+        raise RuntimeError(f"SQS rejected {failed_count} renewal email(s); first failed member "
+                           f"#{first_error['Id']}: {first_error.get('Code')} {first_error.get('Message', '')}".rstrip())
+
+    advance_job(cursor, job, 'enqueue', status='complete')
+    conn.commit()
+    metrics.count('RenewalEmailsQueued', queued_count)
+    return queued_count
+
 def handler(event, context):
     logger.info("Starting monthly renewal process...")
+    metrics = InvocationMetrics('renewal_trigger')
     conn = None
     cursor = None
+    job = None
 
     try:
         conn = get_db_connection()
@@ -153,85 +404,60 @@ def handler(event, context):
             raise ConnectionError("Failed to establish a database connection.")
 
         cursor = conn.cursor()
-        
+
         today = date.today()
-        cursor.execute("""
-            UPDATE family
-            SET active_flag = 0
-            WHERE membership_expires < ? AND founding_family = 0
-        """, today)
+        job = get_or_create_job(cursor, today.replace(day=1), restart=wants_restart(event))
         conn.commit()
 
-        today = date.today()
-        current_month = today.month
-        current_year = today.year
-
-        logger.info(f"Checking for memberships expiring in {current_month}/{current_year}...")
-
-        # ✅ Pull all expiring families this month, regardless of renewal flag
-        query = """
-            SELECT f.member_id, f.email, m.name, m.last_name, f.membership_expires,
-                   f.address, f.city, f.state, f.zip_code, f.renewal_email_sent
-            FROM family as f
-            JOIN members as m ON f.member_id = m.member_id AND m.primary_member = 1
-            WHERE 
-                f.founding_family = 0 AND f.active_flag = 1
-                AND MONTH(f.membership_expires) = ? AND YEAR(f.membership_expires) = ?
-        """
-        cursor.execute(query, current_month, current_year)
-
-        columns = [column[0] for column in cursor.description]
-        expiring_members = [dict(zip(columns, row)) for row in cursor.fetchall()]
-
-        if not expiring_members:
+        if job['status'] == 'complete':
+            logger.info(f"Renewal job {job['job_id']} for this month is already complete.")
+            return {'statusCode': 200, 'body': json.dumps({
+                'message': f"Renewal run already complete. {job['queued_count']} emails were queued.",
+                'job_id': job['job_id']})}
+        if job['stage']:
+            logger.info(f"Resuming renewal job {job['job_id']} after stage '{job['stage']}'.")
+
+        if not stage_done(job, 'deactivate'):
+            run_deactivate(conn, cursor, job, today, metrics)
+
+        if not stage_done(job, 'select'):
+            selected = run_select(conn, cursor, job, today, metrics)
+            logger.info(f"Found {selected} members expiring this month.")
+
+        members = load_job_members(cursor, job)
+        if not members:
+            advance_job(cursor, job, 'enqueue', status='complete')
+            conn.commit()
             logger.info("No members are expiring this month. Process complete.")
             return {'statusCode': 200, 'body': json.dumps({'message': 'No members expiring this month.'})}
 
-        logger.info(f"Found {len(expiring_members)} members expiring this month.")
-
-        # ✅ Generate PDF for all expiring families
-        buffer = io.BytesIO()
-        p = canvas.Canvas(buffer, pagesize=letter)
-        for member in expiring_members:
-            draw_letter_page(p, member)
-        p.save()
-        buffer.seek(0)
-
-        send_pdf_email(buffer, "kris@kedainsights.com, nelcmsarah@gmail.com")
+        if not stage_done(job, 'render'):
+            run_render(conn, cursor, job, members, metrics)
 
-        # ✅ Only queue emails for members who haven't received one
-        sqs_queue_url = os.environ.get('SQS_QUEUE_URL')
-        if not sqs_queue_url:
-            raise EnvironmentError("SQS_QUEUE_URL environment variable not set.")
+        if not stage_done(job, 'mail'):
+            run_mail(conn, cursor, job, metrics)
 
-        sqs = boto3.client('sqs')
         queued_count = 0
-        for member in expiring_members:
-            if member.get('email') and not member.get('renewal_email_sent'):
-                email_details = {
-                    'email_type': 'renewal_reminder',
-                    'member_id': member['member_id'],
-                    'email': member['email'],
-                    'name': member['name'],
-                    'last_name': member['last_name'],
-                    'expires': member['membership_expires'].isoformat()
-                }
-                sqs.send_message(
-                    QueueUrl=sqs_queue_url,
-                    MessageBody=json.dumps(email_details)
-                )
-                queued_count += 1
+        if not stage_done(job, 'enqueue'):
+            queued_count = run_enqueue(conn, cursor, job, metrics)
 
         logger.info(f"Queued {queued_count} renewal emails.")
 
         return {
             'statusCode': 200,
-            'body': json.dumps({'message': f"Mailer PDF sent. {queued_count} emails queued."})
+            'body': json.dumps({'message': f"Mailer PDF sent. {queued_count} emails queued.", 'job_id': job['job_id']})
         }
 
     except Exception as e:
         logger.error(f"An unexpected error occurred: {e}")
+        if conn and job:
+            record_job_failure(conn, job, e)
         return {'statusCode': 500, 'body': json.dumps({'error': str(e)})}
     finally:
         if cursor: cursor.close()
         if conn: conn.close()
+        if job:
+            metrics.set_property('job_id', job['job_id'])
+            metrics.set_property('stage', job['stage'])
+        metrics.rate('RenewalEmailsQueuedPerSecond', 'RenewalEmailsQueued')
+        metrics.flush()
@@ -0,0 +1,58 @@
+# row_mapping.py
+"""
+Maps cursor rows to dicts with an adapter compiled once per result shape.
+
+`[dict(zip(columns, row)) for row in rows]` builds a zip iterator and a tuple per
+column pair for every row, then callers patch fields afterwards. The adapter here
+is a generated function that unpacks the row and returns a dict display, e.g.
+
+    def adapt(row):
+        (c0, c1, c2) = row
+        return {'name': c0, 'last_name': c1, 'visit_datetime': c2}
+
+with any per-column converters applied inline (None passes through). Adapters are
+cached by (columns, converters), so each query shape is compiled once per process.
+Dates and datetimes need no converter for API responses: json_backend encodes them.
+"""
+from functools import lru_cache
+
+@lru_cache(maxsize=256)
+def _compile(columns, converters):
+    converter_for = dict(converters)
+    names = [f"c{i}" for i in range(len(columns))]
+    namespace = {}
+    fields = []
+    for i, (column, name) in enumerate(zip(columns, names)):
+        convert = converter_for.get(column)
+        if convert is None:
+            fields.append(f"{column!r}: {name}")
+        else:
+            namespace[f"convert{i}"] = convert
+            fields.append(f"{column!r}: None if {name} is None else convert{i}({name})")
+    unpack = f"({', '.join(names)},) = row\n    " if names else ""
+    source = f"def adapt(row):\n    {unpack}return {{{', '.join(fields)}}}\n"
+    exec(source, namespace)
+    return namespace['adapt']
+
+def columns_of(cursor):
+    return tuple(column[0] for column in cursor.description)
+
+def row_adapter(columns, converters=None):
+    """Returns adapt(row) -> dict for rows with these column names."""
+    return _compile(tuple(columns), tuple(sorted((converters or {}).items())))
+
+def map_rows(cursor, rows=None, converters=None):
+    """
+    Maps rows (default: cursor.fetchall()) from cursor's last query to dicts.
+    converters maps a column name to a function applied to its non-NULL values.
+    """
+    adapt = row_adapter(columns_of(cursor), converters)
+    if rows is None:
+        rows = cursor.fetchall()
+    return list(map(adapt, rows))
+
+def map_row(cursor, row, converters=None):
+    """Maps a single row, or returns None for None (as from fetchone())."""
+    if row is None:
+        return None
+    return row_adapter(columns_of(cursor), converters)(row)
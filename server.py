@@ -0,0 +1,172 @@
+# server.py
+"""
+Standalone server mode: app.py as a long-running, multi-threaded WSGI app for an
+on-prem box or a single container, instead of one request per Lambda container.
+
+create_app() adds two things to app.py for this mode:
+
+  - a bounded ConnectionPool for primary database connections (read-replica
+    connections, when configured, are still opened per request), and
+  - GET coalescing: concurrent requests for the same GET path and query string,
+    sent with the same Authorization and Accept headers, wait for the first one
+    and are answered with a copy of its response, so ten screens loading
+    /api/data at once cost one query. Nothing is cached; a GET that arrives after
+    the first has finished runs again.
+
+It also keeps /api/events streams open through a live_events.EventHub, rather than
+ending each response after the catch-up as under Lambda. Each open stream holds a
+worker thread, so at most LIVE_EVENT_STREAMS are kept open.
+
+Settings (environment):
+  SERVER_HOST, SERVER_PORT   listen address (default 0.0.0.0:8080)
+  SERVER_THREADS             worker threads per process (default 8)
+  DB_POOL_SIZE               pooled connections per process (default SERVER_THREADS)
+  DB_POOL_MAX_LIFETIME       seconds before a connection is replaced (default 1800)
+  COALESCE_GETS              0 to turn GET coalescing off (default on)
+  LIVE_EVENT_STREAMS         open /api/events streams per process (default SERVER_THREADS / 2)
+  API_TIMEOUT_SECONDS        per-request budget, as under Lambda (default 5)
+
+Run with waitress (pip install -r requirements-server.txt):
+
+  python server.py
+
+or multi-process under gunicorn, one pool per worker process:
+
+  gunicorn --workers 2 --threads 8 --bind 0.0.0.0:8080 'server:create_app()'
+"""
+import logging
+import os
+import threading
+import time
+
+from flask import Response, g, request
+
+import app as app_module
+from connection_pool import ConnectionPool
+from live_events import EventHub
+
+SERVER_HOST = os.environ.get('SERVER_HOST', '0.0.0.0')
+SERVER_PORT = int(os.environ.get('SERVER_PORT', '8080'))
+SERVER_THREADS = int(os.environ.get('SERVER_THREADS', '8'))
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', str(SERVER_THREADS)))
+DB_POOL_MAX_LIFETIME = float(os.environ.get('DB_POOL_MAX_LIFETIME', '1800'))
+COALESCE_GETS = os.environ.get('COALESCE_GETS', '1').lower() not in ('0', 'false', 'no')
+LIVE_EVENT_STREAMS = int(os.environ.get('LIVE_EVENT_STREAMS', str(max(1, SERVER_THREADS // 2))))
+
+# Per-caller or operational responses that must never be shared between requests.
+COALESCE_EXCLUDE = ('/api/_stats', '/api/health', '/api/events')
+# Response headers describing the leader's own request, not the shared body.
+PER_REQUEST_HEADERS = ('Server-Timing', 'Timing-Allow-Origin', 'Content-Length')
+# Request headers that can change a GET's response; they are part of the flight key.
+KEY_HEADERS = ('Authorization', 'Accept')
+
+class Flight:
+    """One in-progress GET that identical requests are waiting on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.status = None
+        self.headers = None
+        self.body = None
+
+class GetCoalescer:
+    """Shares the response of an in-flight GET with identical concurrent GETs."""
+
+    def __init__(self, exclude=COALESCE_EXCLUDE):
+        self.exclude = exclude
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.stats = {'leaders': 0, 'followers': 0, 'fallbacks': 0}
+
+    def install(self, app):
+        # before_request is registered after app.py's, so it runs once the request
+        # budget is set. after_request goes to the front of the list: Flask runs those
+        # hooks in reverse, so it sees the response after app.py's hooks (e.g. a 500
+        # turned into a budget 503), exactly as the leader's caller gets it.
+        app.before_request(self.before_request)
+        app.after_request_funcs.setdefault(None, []).insert(0, self.after_request)
+        app.teardown_request(self.teardown_request)
+
+    def key(self):
+        if request.method != 'GET' or request.path.startswith(self.exclude):
+            return None
+        return (request.full_path,) + tuple(request.headers.get(name, '') for name in KEY_HEADERS)
+
+    def before_request(self):
+        key = self.key()
+        if key is None:
+            return None
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                self._flights[key] = flight = Flight()
+                self.stats['leaders'] += 1
+                g.coalesce_flight = (key, flight)
+                return None
+
+        waited_from = time.perf_counter()
+        remaining = app_module.remaining_budget()
+        if not flight.done.wait(max(0.0, remaining) if remaining is not None else None):
+            raise app_module.DeadlineExceeded('coalesced wait')
+        app_module.record_span('coalesced', (time.perf_counter() - waited_from) * 1000)
+        with self._lock:
+            self.stats['followers' if flight.body is not None else 'fallbacks'] += 1
+        if flight.body is None:
+            # The first request failed without a response or streamed it; run this one itself.
+            return None
+        return Response(flight.body, status=flight.status, headers=flight.headers)
+
+    def after_request(self, response):
+        entry = g.pop('coalesce_flight', None)
+        if entry is not None:
+            key, flight = entry
+            if not response.is_streamed and not response.direct_passthrough:
+                flight.status = response.status_code
+                flight.headers = [(name, value) for name, value in response.headers
+                                  if name not in PER_REQUEST_HEADERS]
+                flight.body = response.get_data()
+            self._land(key, flight)
+        return response
+
+    def teardown_request(self, exc):
+        # after_request did not run (an unhandled error); release the waiters.
+        entry = g.pop('coalesce_flight', None)
+        if entry is not None:
+            self._land(*entry)
+
+    def _land(self, key, flight):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.done.set()
+
+_configured = None
+
+def create_app():
+    """Configures app.py for server mode (once per process) and returns the Flask app."""
+    global _configured
+    if _configured is None:
+        app_module.db_pool = ConnectionPool(max_size=DB_POOL_SIZE, max_lifetime=DB_POOL_MAX_LIFETIME)
+        app_module.event_hub = EventHub(app_module.poll_live_events, max_streams=LIVE_EVENT_STREAMS)
+        if COALESCE_GETS:
+            GetCoalescer().install(app_module.app)
+        _configured = app_module.app
+        logging.info(f"Server mode: pool of {DB_POOL_SIZE} connection(s), GET coalescing {'on' if COALESCE_GETS else 'off'}, "
+                     f"up to {LIVE_EVENT_STREAMS} live event stream(s).")
+    return _configured
+
+def main():
+    application = create_app()
+    try:
+        from waitress import serve
+    except ImportError:
+        logging.warning("waitress is not installed (pip install -r requirements-server.txt); "
+                        "falling back to Werkzeug's threaded development server.")
+        from werkzeug.serving import run_simple
+        run_simple(SERVER_HOST, SERVER_PORT, application, threaded=True)
+        return
+    logging.info(f"Serving on http://{SERVER_HOST}:{SERVER_PORT} with {SERVER_THREADS} threads.")
+    serve(application, host=SERVER_HOST, port=SERVER_PORT, threads=SERVER_THREADS)
+
+if __name__ == '__main__':
+    main()
@@ -2,9 +2,13 @@
 import json
 import logging
 import pyodbc
-import boto3
 from botocore.exceptions import ClientError
 
+from aws_clients import get_client
+from circuit_breaker import CircuitOpenError, call_with_retry, db_breaker
+import sql_stats
+from metrics import InvocationMetrics
+
 # --- Configuration & Helper Functions (Copied from app.py) ---
 
 # Configure logging
@@ -15,8 +19,7 @@ def get_database_password():
     """Retrieves the database password from AWS Secrets Manager."""
     secret_name = "nelcm-db"
     region_name = "us-east-1"
-    session = boto3.session.Session()
-    client = session.client(service_name='secretsmanager', region_name=region_name)
+    client = get_client('secretsmanager', region_name=region_name)
     try:
         get_secret_value_response = client.get_secret_value(SecretId=secret_name)
     except ClientError as e:
@@ -30,7 +33,7 @@ def get_db_connection():
     """Establishes a connection to the SQL Server database."""
     try:
         db_password = get_database_password()
-        conn = pyodbc.connect(
+        conn = call_with_retry(lambda: pyodbc.connect(
             driver='/var/task/lib/libmsodbcsql-18.4.so.1.1',
             server='nelcm.cy1ogm8uwbvo.us-east-1.rds.amazonaws.com,1433',
             database='nelcm',
@@ -38,17 +41,21 @@ def get_db_connection():
             pwd=db_password,
             Encrypt='yes',
             TrustServerCertificate='yes'
-        )
-        return conn
-    except pyodbc.Error as ex:
+        ), db_breaker)
+        return sql_stats.track(conn)
+    except (pyodbc.Error, CircuitOpenError) as ex:
         logger.error(f"DATABASE CONNECTION FAILED: {ex}")
         return None
 
 def remove_email_from_database(email):
-    """Connects to the DB and sets the email field to NULL for the given address."""
+    """
+    Connects to the DB and sets the email field to NULL for the given address.
+    Returns the number of records updated, or None if the removal failed.
+    """
     logger.info(f"Attempting to remove email: {email}")
     conn = None
     cursor = None
+    updated_rows = None
     try:
         conn = get_db_connection()
         if conn is None:
@@ -69,6 +76,7 @@ def remove_email_from_database(email):
             
     except Exception as e:
         logger.error(f"An error occurred while removing email {email}: {e}")
+        updated_rows = None
         if conn:
             conn.rollback()
     finally:
@@ -76,6 +84,7 @@ def remove_email_from_database(email):
             cursor.close()
         if conn:
             conn.close()
+    return updated_rows
 
 # --- Lambda Handler ---
 
@@ -84,31 +93,46 @@ def handler(event, context):
     Lambda handler for processing SES bounce and complaint notifications from SNS.
     """
     logger.info("Received event from SNS")
-    
-    for record in event['Records']:
-        sns_message_str = record['Sns']['Message']
-        message = json.loads(sns_message_str)
-        notification_type = message.get('notificationType')
-        
-        emails_to_remove = []
+    metrics = InvocationMetrics('ses_handler')
+    metrics.put('NotificationBatchSize', len(event['Records']))
+    for name in ('PermanentBounces', 'TransientBounces', 'Complaints', 'EmailsRemoved', 'RemovalFailures'):
+        metrics.count(name, 0)
 
-        if notification_type == 'Bounce':
-            bounce = message.get('bounce', {})
-            # Process only permanent (hard) bounces
-            if bounce.get('bounceType') == 'Permanent':
-                for recipient in bounce.get('bouncedRecipients', []):
-                    emails_to_remove.append(recipient.get('emailAddress'))
-                logger.info(f"Processing permanent bounce for: {emails_to_remove}")
+    try:
+        for record in event['Records']:
+            sns_message_str = record['Sns']['Message']
+            message = json.loads(sns_message_str)
+            notification_type = message.get('notificationType')
+
+            emails_to_remove = []
 
-        elif notification_type == 'Complaint':
-            for recipient in message.get('complaint', {}).get('complainedRecipients', []):
-                emails_to_remove.append(recipient.get('emailAddress'))
-            logger.info(f"Processing complaint (unsubscribe) for: {emails_to_remove}")
+            if notification_type == 'Bounce':
+                bounce = message.get('bounce', {})
+                # Process only permanent (hard) bounces
+                if bounce.get('bounceType') == 'Permanent':
+                    metrics.count('PermanentBounces')
+                    for recipient in bounce.get('bouncedRecipients', []):
+                        emails_to_remove.append(recipient.get('emailAddress'))
+                    logger.info(f"Processing permanent bounce for: {emails_to_remove}")
+                else:
+                    metrics.count('TransientBounces')
 
-        # For each collected email, call the function to remove it from the DB
-        for email in emails_to_remove:
-            if email:
-                remove_email_from_database(email)
+            elif notification_type == 'Complaint':
+                metrics.count('Complaints')
+                for recipient in message.get('complaint', {}).get('complainedRecipients', []):
+                    emails_to_remove.append(recipient.get('emailAddress'))
+                logger.info(f"Processing complaint (unsubscribe) for: {emails_to_remove}")
+
+            # For each collected email, call the function to remove it from the DB
+            for email in emails_to_remove:
+                if email:
+                    removed = remove_email_from_database(email)
+                    if removed is None:
+                        metrics.count('RemovalFailures')
+                    else:
+                        metrics.count('EmailsRemoved', removed)
+    finally:
+        metrics.flush()
 
     return {
         'statusCode': 200,
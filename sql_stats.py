@@ -0,0 +1,262 @@
+# sql_stats.py
+"""
+Per-statement latency and row statistics.
+
+track(conn) wraps a pyodbc connection so every cursor it hands out times each
+execute/executemany. Statements are grouped by fingerprint: the SQL with comments
+stripped, literals replaced by ? and whitespace collapsed, so the same query with
+different values lands in one bucket. Each bucket keeps call count, total and p95
+latency and rows affected (rowcount) or returned (rows fetched). Statements slower
+than SQL_SLOW_MS are logged as they happen.
+
+Aggregates live in this process (one Lambda container or server process) and are
+read with snapshot(); app.py serves them from /api/_stats.
+
+track(conn, statement_timeout) also re-derives the query timeout before every
+statement, so a request's later statements get what is left of its budget rather
+than the timeout set when the connection was opened.
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+
+SLOW_STATEMENT_MS = float(os.environ.get('SQL_SLOW_MS', '500'))
+LATENCY_SAMPLES = 512  # most recent durations kept per fingerprint for the p95
+
+COMMENT_RE = re.compile(r'--[^\n]*|/\*.*?\*/', re.DOTALL)
+STRING_RE = re.compile(r"N?'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'(?<![\w@#])-?\d+(?:\.\d+)?\b')
+IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+VALUES_LIST_RE = re.compile(r'\(\?(?:, \?)*\)(?:\s*,\s*\(\?(?:, \?)*\))+')
+WHITESPACE_RE = re.compile(r'\s+')
+
+_fingerprints = {}
+
+def fingerprint(sql):
+    """Normalized statement text: literals become ?, lists of them collapse to (?+)."""
+    cached = _fingerprints.get(sql)
+    if cached is not None:
+        return cached
+    text = COMMENT_RE.sub(' ', sql)
+    text = STRING_RE.sub('?', text)
+    text = NUMBER_RE.sub('?', text)
+    text = WHITESPACE_RE.sub(' ', text).strip().rstrip(';').strip()
+    text = VALUES_LIST_RE.sub('(?+)', text)
+    text = IN_LIST_RE.sub('(?+)', text)
+    if len(_fingerprints) < 4096:
+        _fingerprints[sql] = text
+    return text
+
+def fingerprint_id(text):
+    return hashlib.md5(text.encode('utf-8')).hexdigest()[:12]
+
+class StatementStats:
+    __slots__ = ('text', 'calls', 'errors', 'total_ms', 'max_ms', 'rows', 'samples')
+
+    def __init__(self, text):
+        self.text = text
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.samples = deque(maxlen=LATENCY_SAMPLES)
+
+    def p95_ms(self):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def as_dict(self):
+        return {
+            'id': fingerprint_id(self.text),
+            'statement': self.text,
+            'calls': self.calls,
+            'errors': self.errors,
+            'rows': self.rows,
+            'total_ms': round(self.total_ms, 1),
+            'mean_ms': round(self.total_ms / self.calls, 2) if self.calls else 0.0,
+            'p95_ms': round(self.p95_ms(), 2),
+            'max_ms': round(self.max_ms, 1),
+        }
+
+_stats = {}
+_lock = threading.Lock()
+_started = time.time()
+
+def record(text, duration_ms, rows=0, error=False):
+    with _lock:
+        stats = _stats.get(text)
+        if stats is None:
+            stats = _stats[text] = StatementStats(text)
+        stats.calls += 1
+        stats.errors += bool(error)
+        stats.total_ms += duration_ms
+        stats.max_ms = max(stats.max_ms, duration_ms)
+        stats.rows += max(rows, 0)
+        stats.samples.append(duration_ms)
+    if duration_ms >= SLOW_STATEMENT_MS:
+        logging.warning(f"[slow-sql] {duration_ms:.0f}ms rows={rows} {text[:500]}")
+
+def add_rows(text, rows):
+    with _lock:
+        stats = _stats.get(text)
+        if stats is not None:
+            stats.rows += rows
+
+def snapshot(order_by='total_ms', limit=None):
+    """Aggregates for every fingerprint, most expensive first."""
+    with _lock:
+        entries = [stats.as_dict() for stats in _stats.values()]
+    entries.sort(key=lambda entry: entry[order_by], reverse=True)
+    return {
+        'since': _started,
+        'statements': entries[:limit] if limit else entries,
+        'total_calls': sum(entry['calls'] for entry in entries),
+        'total_ms': round(sum(entry['total_ms'] for entry in entries), 1),
+    }
+
+def total_ms():
+    """Time spent in statements so far; callers diff two readings for a span of work."""
+    with _lock:
+        return sum(stats.total_ms for stats in _stats.values())
+
+def reset():
+    global _started
+    with _lock:
+        _stats.clear()
+        _started = time.time()
+
+class TrackedCursor:
+    """Delegates to a pyodbc cursor, recording each statement and the rows it fetches."""
+
+    def __init__(self, cursor, conn=None, statement_timeout=None):
+        object.__setattr__(self, '_cursor', cursor)
+        object.__setattr__(self, '_current', None)
+        object.__setattr__(self, '_conn', conn)
+        object.__setattr__(self, '_statement_timeout', statement_timeout)
+        object.__setattr__(self, '_timeout', getattr(conn, 'timeout', 0))
+        object.__setattr__(self, '_attrs', {})
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        # e.g. cursor.fast_executemany = True
+        self._attrs[name] = value
+        setattr(self._cursor, name, value)
+
+    def _refresh_timeout(self):
+        """
+        Applies statement_timeout() before a statement. pyodbc copies conn.timeout into
+        a cursor when the cursor is created, so a changed value means a new underlying
+        cursor (with the same attributes); the old one has nothing pending between
+        statements.
+        """
+        seconds = self._statement_timeout()
+        if seconds is None or seconds == self._timeout:
+            return
+        self._conn.timeout = seconds
+        cursor = self._conn.cursor()
+        for name, value in self._attrs.items():
+            setattr(cursor, name, value)
+        self._cursor.close()
+        object.__setattr__(self, '_cursor', cursor)
+        object.__setattr__(self, '_timeout', seconds)
+
+    def _run(self, method_name, sql, args):
+        if self._statement_timeout is not None:
+            self._refresh_timeout()
+        text = fingerprint(sql)
+        object.__setattr__(self, '_current', text)
+        started = time.perf_counter()
+        try:
+            getattr(self._cursor, method_name)(sql, *args)
+        except Exception:
+            record(text, (time.perf_counter() - started) * 1000, error=True)
+            raise
+        record(text, (time.perf_counter() - started) * 1000, self._cursor.rowcount)
+        return self
+
+    def execute(self, sql, *args):
+        return self._run('execute', sql, args)
+
+    def executemany(self, sql, *args):
+        return self._run('executemany', sql, args)
+
+    def _count(self, rows):
+        if self._current is not None and rows:
+            add_rows(self._current, rows)
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        self._count(row is not None)
+        return row
+
+    def fetchmany(self, *args):
+        rows = self._cursor.fetchmany(*args)
+        self._count(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._count(len(rows))
+        return rows
+
+    def fetchval(self):
+        row = self.fetchone()
+        return row[0] if row is not None else None
+
+    def __iter__(self):
+        for row in self._cursor:
+            self._count(1)
+            yield row
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return self._cursor.__exit__(*exc)
+
+class TrackedConnection:
+    """Delegates to a pyodbc connection; cursor() returns a TrackedCursor."""
+
+    def __init__(self, conn, statement_timeout=None):
+        object.__setattr__(self, '_conn', conn)
+        object.__setattr__(self, '_statement_timeout', statement_timeout)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        # e.g. conn.timeout = 4
+        setattr(self._conn, name, value)
+
+    def cursor(self):
+        if self._statement_timeout is None:
+            return TrackedCursor(self._conn.cursor())
+        return TrackedCursor(self._conn.cursor(), self._conn, self._statement_timeout)
+
+    def execute(self, sql, *args):
+        return self.cursor().execute(sql, *args)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+def track(conn, statement_timeout=None):
+    """
+    Wraps conn for statement statistics; None and already-tracked connections pass
+    through. statement_timeout, if given, is called before each statement and returns
+    the query timeout in seconds to run it with (None leaves the current one).
+    """
+    if conn is None or isinstance(conn, TrackedConnection):
+        return conn
+    return TrackedConnection(conn, statement_timeout)
@@ -0,0 +1,308 @@
+# survey_rollups.py
+import json
+import logging
+import math
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+import pyodbc
+from botocore.exceptions import ClientError
+
+from aws_clients import get_client
+from circuit_breaker import call_with_retry, db_breaker
+import sql_stats
+
+# --- Logging ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+AWS_REGION = "us-east-1"
+
+# exit_answers.time is UTC, so rollup days are UTC days.
+REBUILD_CHUNK_DAYS = 7
+MAX_CHUNKS_PER_RUN = 150  # keeps one invocation well inside its timeout
+RECONCILE_DAYS = 1        # the nightly run always rebuilds at least this many past days
+MERGE_CHUNK_ROWS = 400    # 5 parameters per row, under SQL Server's 2100 limit
+
+RESULT_INTERVALS = ('day', 'week')
+MAX_RESULT_DAYS = 1096
+
+def get_secret(secret_name):
+    client = get_client('secretsmanager', region_name=AWS_REGION)
+    try:
+        response = client.get_secret_value(SecretId=secret_name)
+        return json.loads(response['SecretString'])
+    except ClientError as e:
+        logger.error(f"Failed to retrieve secret '{secret_name}': {e}")
+        raise e
+
+def get_db_connection():
+    try:
+        secrets = get_secret("nelcm-db")
+        conn = call_with_retry(lambda: pyodbc.connect(
+            driver='/var/task/lib/libmsodbcsql-18.4.so.1.1',
+            server='nelcm.cy1ogm8uwbvo.us-east-1.rds.amazonaws.com,1433',
+            database='nelcm',
+            uid='nelcm',
+            pwd=secrets.get('password'),
+            Encrypt='yes',
+            TrustServerCertificate='yes'
+        ), db_breaker)
+        return sql_stats.track(conn)
+    except Exception as e:
+        logger.error(f"DATABASE CONNECTION FAILED: {e}")
+        return None
+
+# --- Incremental Maintenance ---
+
+def numeric_value(answer):
+    """The answer as a number for averaging, or None; mirrors TRY_CAST(answer AS FLOAT)."""
+    try:
+        value = float(answer)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+def rollup_key(answered_at, number, answer):
+    """
+    The exit_answer_daily key as SQL Server compares it: [number] and [answer] are
+    VARCHAR under the database's case-insensitive collation, which also ignores
+    trailing spaces. "Yes" and "yes" are one rollup row, as they are in REBUILD_SQL.
+    """
+    return answered_at.date(), number.rstrip(' ').lower(), answer.rstrip(' ').lower()
+
+def rollup_rows(rows):
+    """
+    (number, answer, time) rows -> [(answer_date, number, answer, numeric_value, responses)],
+    one per rollup key, spelled as the first row with that key.
+    """
+    counts = Counter()
+    spelling = {}
+    for number, answer, answered_at in rows:
+        key = rollup_key(answered_at, number, answer)
+        counts[key] += 1
+        spelling.setdefault(key, (answered_at.date(), number, answer))
+    return [spelling[key] + (numeric_value(spelling[key][2]), responses) for key, responses in counts.items()]
+
+def record_answers(cursor, rows):
+    """
+    Folds rows just inserted into exit_answers into the daily rollup. The caller
+    commits, so the rollup lands in the same transaction as the answers.
+    """
+    rollups = rollup_rows(rows)
+    for i in range(0, len(rollups), MERGE_CHUNK_ROWS):
+        chunk = rollups[i:i + MERGE_CHUNK_ROWS]
+        cursor.execute(f"""
+            MERGE dbo.exit_answer_daily WITH (HOLDLOCK) AS d
+            USING (VALUES {', '.join(['(?, ?, ?, ?, ?)'] * len(chunk))})
+                AS s (answer_date, [number], [answer], numeric_value, responses)
+            ON d.answer_date = s.answer_date AND d.[number] = s.[number] AND d.[answer] = s.[answer]
+            WHEN MATCHED THEN UPDATE SET responses = d.responses + s.responses
+            WHEN NOT MATCHED THEN
+                INSERT (answer_date, [number], [answer], numeric_value, responses)
+                VALUES (s.answer_date, s.[number], s.[answer], s.numeric_value, s.responses);
+        """, [value for row in chunk for value in row])
+    return len(rollups)
+
+# --- Chunked Rebuild ---
+
+# Rebuilds the rollup for [day_start, day_end) from exit_answers in one transaction.
+# The TABLOCK, HOLDLOCK read keeps a shared lock on exit_answers until commit, so a
+# kiosk insert (which folds itself into the rollup) either committed before the
+# read or waits until the rebuilt days are in place; no answer is counted twice.
+REBUILD_SQL = """
+    SET NOCOUNT ON;
+    DECLARE @days TABLE (
+        answer_date DATE, [number] VARCHAR(5), [answer] VARCHAR(50), numeric_value FLOAT, responses INT
+    );
+
+    INSERT INTO @days (answer_date, [number], [answer], numeric_value, responses)
+    SELECT CAST([time] AS DATE), [number], [answer], TRY_CAST([answer] AS FLOAT), COUNT(*)
+    FROM dbo.exit_answers WITH (TABLOCK, HOLDLOCK)
+    WHERE [time] >= ? AND [time] < ?
+    GROUP BY CAST([time] AS DATE), [number], [answer];
+
+    DELETE FROM dbo.exit_answer_daily WHERE answer_date >= ? AND answer_date < ?;
+
+    INSERT INTO dbo.exit_answer_daily (answer_date, [number], [answer], numeric_value, responses)
+    SELECT answer_date, [number], [answer], numeric_value, responses FROM @days;
+
+    -- The watermark only moves forward; rebuilding an old range leaves it alone.
+    MERGE dbo.exit_rollup_state AS s
+    USING (SELECT 1 AS id) AS k ON s.id = k.id
+    WHEN MATCHED AND s.rebuilt_before < ? THEN UPDATE SET rebuilt_before = ?, updated_at = SYSUTCDATETIME()
+    WHEN NOT MATCHED THEN INSERT (id, rebuilt_before) VALUES (1, ?);
+
+    SELECT COUNT(*) FROM @days;
+"""
+
+def rebuilt_before(cursor):
+    """First day not yet rebuilt, or None if no rebuild has run."""
+    cursor.execute("SELECT rebuilt_before FROM dbo.exit_rollup_state WHERE id = 1")
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+def first_answer_day(cursor):
+    cursor.execute("SELECT CAST(MIN([time]) AS DATE) FROM dbo.exit_answers")
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+def rebuild_rollups(conn, start, end, chunk_days=REBUILD_CHUNK_DAYS, max_chunks=MAX_CHUNKS_PER_RUN):
+    """
+    Rebuilds days [start, end) in chunks of chunk_days, each committed with the
+    watermark. Returns (days_rebuilt, rollup_rows, chunks, next_day).
+    """
+    cursor = conn.cursor()
+    day = start
+    rows = 0
+    chunks = 0
+    try:
+        while day < end and chunks < max_chunks:
+            chunk_end = min(day + timedelta(days=chunk_days), end)
+            cursor.execute(REBUILD_SQL,
+                           datetime.combine(day, datetime.min.time()), datetime.combine(chunk_end, datetime.min.time()),
+                           day, chunk_end, chunk_end, chunk_end, chunk_end)
+            rows += cursor.fetchone()[0]
+            conn.commit()
+            chunks += 1
+            day = chunk_end
+        return (day - start).days, rows, chunks, day
+    except pyodbc.Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+def plan_rebuild(conn, event):
+    """
+    The [start, end) range for this run: event "from"/"through" (YYYY-MM-DD,
+    inclusive) when given, otherwise from the watermark (or the first answer)
+    through today, always including the last RECONCILE_DAYS days.
+    """
+    today = datetime.utcnow().date()
+    end = date.fromisoformat(event['through']) + timedelta(days=1) if event.get('through') else today + timedelta(days=1)
+    if event.get('from'):
+        return date.fromisoformat(event['from']), end
+
+    cursor = conn.cursor()
+    try:
+        start = rebuilt_before(cursor)
+        if start is None:
+            start = first_answer_day(cursor)
+            if start is None:
+                return None, end
+        return min(start, today - timedelta(days=RECONCILE_DAYS)), end
+    finally:
+        cursor.close()
+
+# --- Results ---
+
+def period_start(day, interval):
+    return day - timedelta(days=day.weekday()) if interval == 'week' else day
+
+def survey_results(cursor, start, end, interval='day'):
+    """
+    Per-question answer counts, averages of numeric answers and a trend by day or
+    week (weeks start Monday) for answers dated start..end inclusive, read from the
+    rollup only.
+    """
+    cursor.execute("""
+        SELECT [number], [question]
+        FROM dbo.exit_questions
+        ORDER BY TRY_CAST([number] AS INT), [number]
+    """)
+    questions = {str(number): {'number': str(number), 'question': question, 'responses': 0, 'answers': [],
+                               'average': None, 'numeric_responses': 0, 'trend': {}}
+                 for number, question in cursor.fetchall()}
+
+    def question(number):
+        number = str(number)
+        if number not in questions:
+            questions[number] = {'number': number, 'question': None, 'responses': 0, 'answers': [],
+                                 'average': None, 'numeric_responses': 0, 'trend': {}}
+        return questions[number]
+
+    cursor.execute("""
+        SELECT [number], [answer], MAX(numeric_value), SUM(responses)
+        FROM dbo.exit_answer_daily
+        WHERE answer_date >= ? AND answer_date <= ?
+        GROUP BY [number], [answer]
+    """, start, end)
+    for number, answer, value, responses in cursor.fetchall():
+        q = question(number)
+        q['responses'] += responses
+        q['answers'].append({'answer': answer, 'count': responses})
+        if value is not None:
+            q['numeric_responses'] += responses
+            q['average'] = (q['average'] or 0.0) + value * responses
+
+    cursor.execute("""
+        SELECT answer_date, [number], SUM(responses),
+               SUM(CASE WHEN numeric_value IS NOT NULL THEN responses ELSE 0 END),
+               SUM(numeric_value * responses)
+        FROM dbo.exit_answer_daily
+        WHERE answer_date >= ? AND answer_date <= ?
+        GROUP BY answer_date, [number]
+    """, start, end)
+    for answer_date, number, responses, numeric_responses, numeric_total in cursor.fetchall():
+        bucket = question(number)['trend'].setdefault(period_start(answer_date, interval), [0, 0, 0.0])
+        bucket[0] += responses
+        bucket[1] += numeric_responses or 0
+        bucket[2] += numeric_total or 0.0
+
+    step = timedelta(days=7 if interval == 'week' else 1)
+    periods = []
+    period = period_start(start, interval)
+    while period <= end:
+        periods.append(period)
+        period += step
+
+    for q in questions.values():
+        for entry in q['answers']:
+            entry['share'] = round(entry['count'] / q['responses'], 4) if q['responses'] else 0.0
+        q['answers'].sort(key=lambda entry: (-entry['count'], entry['answer']))
+        if q['numeric_responses']:
+            q['average'] = round(q['average'] / q['numeric_responses'], 3)
+        trend = q['trend']
+        q['trend'] = []
+        for period in periods:
+            responses, numeric_responses, numeric_total = trend.get(period, (0, 0, 0.0))
+            q['trend'].append({'period': period.isoformat(), 'responses': responses,
+                               'average': round(numeric_total / numeric_responses, 3) if numeric_responses else None})
+
+    return {
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'interval': interval,
+        'responses': sum(q['responses'] for q in questions.values()),
+        'questions': list(questions.values()),
+    }
+
+# --- Entry Point ---
+
+def handler(event, context):
+    """
+    Nightly reconcile and initial backfill. Pass {"from": "YYYY-MM-DD"} (and
+    optionally "through") to rebuild a specific range; rerun until "complete".
+    """
+    event = event or {}
+    conn = get_db_connection()
+    if conn is None:
+        return {'statusCode': 500, 'body': json.dumps({'error': 'Database connection failed'})}
+    try:
+        start, end = plan_rebuild(conn, event)
+        if start is None:
+            return {'statusCode': 200, 'body': json.dumps({'message': 'No exit answers to roll up.', 'complete': True})}
+        days, rows, chunks, next_day = rebuild_rollups(conn, start, end)
+        logger.info(f"Rebuilt exit survey rollups for {days} day(s) from {start} ({rows} rows, {chunks} chunk(s)).")
+        return {'statusCode': 200, 'body': json.dumps({
+            'from': start.isoformat(), 'rebuilt_before': next_day.isoformat(), 'days': days,
+            'rollup_rows': rows, 'chunks': chunks, 'complete': next_day >= end})}
+    except ValueError as e:
+        return {'statusCode': 400, 'body': json.dumps({'error': f"Invalid date: {e}"})}
+    except Exception as e:
+        logger.error(f"Exit survey rollup failed: {e}")
+        return {'statusCode': 500, 'body': json.dumps({'error': str(e)})}
+    finally:
+        conn.close()
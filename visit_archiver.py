@@ -0,0 +1,137 @@
+# visit_archiver.py
+import json
+import logging
+import os
+from datetime import date, datetime, timedelta
+
+import pyodbc
+from botocore.exceptions import ClientError
+
+from aws_clients import get_client
+from circuit_breaker import call_with_retry, db_breaker
+from live_events import RETENTION_HOURS, prune_events
+import sql_stats
+
+# --- Logging ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+AWS_REGION = "us-east-1"
+
+# Visits older than this many days move to the cold tier.
+ARCHIVE_HORIZON_DAYS = int(os.environ.get('VISIT_ARCHIVE_DAYS', '400'))
+ARCHIVE_BATCH_SIZE = 2000
+MAX_BATCHES_PER_RUN = 200  # keeps one invocation well inside its timeout
+
+def get_secret(secret_name):
+    client = get_client('secretsmanager', region_name=AWS_REGION)
+    try:
+        response = client.get_secret_value(SecretId=secret_name)
+        return json.loads(response['SecretString'])
+    except ClientError as e:
+        logger.error(f"Failed to retrieve secret '{secret_name}': {e}")
+        raise e
+
+def get_db_connection():
+    try:
+        secrets = get_secret("nelcm-db")
+        conn = call_with_retry(lambda: pyodbc.connect(
+            driver='/var/task/lib/libmsodbcsql-18.4.so.1.1',
+            server='nelcm.cy1ogm8uwbvo.us-east-1.rds.amazonaws.com,1433',
+            database='nelcm',
+            uid='nelcm',
+            pwd=secrets.get('password'),
+            Encrypt='yes',
+            TrustServerCertificate='yes'
+        ), db_breaker)
+        return sql_stats.track(conn)
+    except Exception as e:
+        logger.error(f"DATABASE CONNECTION FAILED: {e}")
+        return None
+
+def archive_cutoff(today=None, horizon_days=None):
+    """Start of the first day that stays hot."""
+    today = today or date.today()
+    horizon_days = ARCHIVE_HORIZON_DAYS if horizon_days is None else horizon_days
+    return datetime.combine(today - timedelta(days=horizon_days), datetime.min.time())
+
+# Moves one chunk: delete from the hot table, copy to the archive and fold the
+# chunk into the per-member summary, all in one short transaction.
+ARCHIVE_BATCH_SQL = """
+    SET NOCOUNT ON;
+    DECLARE @moved TABLE (
+        member_id VARCHAR(20), name NVARCHAR(100), last_name NVARCHAR(100), visit_datetime DATETIME
+    );
+
+    DELETE TOP (?) FROM Visits
+    OUTPUT DELETED.member_id, DELETED.name, DELETED.last_name, DELETED.visit_datetime INTO @moved
+    WHERE visit_datetime < ?;
+
+    INSERT INTO dbo.Visits_archive (member_id, name, last_name, visit_datetime)
+    SELECT member_id, name, last_name, visit_datetime FROM @moved;
+
+    MERGE dbo.member_visit_summary AS s
+    USING (
+        SELECT member_id, ISNULL(name, '') AS name, ISNULL(last_name, '') AS last_name,
+               COUNT(*) AS visits, MIN(visit_datetime) AS first_visit, MAX(visit_datetime) AS last_visit
+        FROM @moved
+        GROUP BY member_id, ISNULL(name, ''), ISNULL(last_name, '')
+    ) AS m
+    ON s.member_id = m.member_id AND s.name = m.name AND s.last_name = m.last_name
+    WHEN MATCHED THEN UPDATE SET
+        archived_visits = s.archived_visits + m.visits,
+        first_visit = CASE WHEN m.first_visit < s.first_visit THEN m.first_visit ELSE s.first_visit END,
+        last_archived_visit = CASE WHEN m.last_visit > s.last_archived_visit THEN m.last_visit ELSE s.last_archived_visit END
+    WHEN NOT MATCHED THEN
+        INSERT (member_id, name, last_name, archived_visits, first_visit, last_archived_visit)
+        VALUES (m.member_id, m.name, m.last_name, m.visits, m.first_visit, m.last_visit);
+
+    SELECT COUNT(*) FROM @moved;
+"""
+
+def archive_visits(conn, cutoff=None, batch_size=ARCHIVE_BATCH_SIZE, max_batches=MAX_BATCHES_PER_RUN):
+    """Archives visits before `cutoff` in chunks. Returns (rows_moved, batches)."""
+    cutoff = cutoff or archive_cutoff()
+    cursor = conn.cursor()
+    moved = 0
+    batches = 0
+    try:
+        while batches < max_batches:
+            cursor.execute(ARCHIVE_BATCH_SQL, batch_size, cutoff)
+            count = cursor.fetchone()[0]
+            conn.commit()
+            batches += 1
+            moved += count
+            if count < batch_size:
+                break
+        return moved, batches
+    except pyodbc.Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+def handler(event, context):
+    """
+    Scheduled nightly archive. Pass {"horizon_days": N} to override the horizon.
+    Also prunes live events (app_events) older than EVENT_RETENTION_HOURS.
+    """
+    event = event or {}
+    conn = get_db_connection()
+    if conn is None:
+        return {'statusCode': 500, 'body': json.dumps({'error': 'Database connection failed'})}
+    try:
+        cutoff = archive_cutoff(horizon_days=event.get('horizon_days'))
+        moved, batches = archive_visits(conn, cutoff)
+        logger.info(f"Archived {moved} visits before {cutoff:%Y-%m-%d} in {batches} batch(es).")
+        events_cutoff = datetime.utcnow() - timedelta(hours=RETENTION_HOURS)
+        pruned, _ = prune_events(conn, events_cutoff)
+        logger.info(f"Pruned {pruned} live events created before {events_cutoff:%Y-%m-%d %H:%M} UTC.")
+        return {'statusCode': 200, 'body': json.dumps({'archived': moved, 'batches': batches, 'cutoff': cutoff.isoformat(),
+                                                       'events_pruned': pruned})}
+    except Exception as e:
+        logger.error(f"Visit archive failed: {e}")
+        return {'statusCode': 500, 'body': json.dumps({'error': str(e)})}
+    finally:
+        conn.close()